@@ -1,10 +1,12 @@
-from dash import Dash, dcc, Output, Input, html, dash_table
+from dash import Dash, dcc, Output, Input, State, html, dash_table
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 from datetime import datetime
 
 from utils.hdf5_file_output import *
 from utils.crawl_setup import *
 from utils.app_data_processing import *
+from utils.app_data_access import AppDataAccess
 
 # ----------------------------------------------------------------------------------------------------------------------
 
@@ -24,25 +26,13 @@ h5_file = main_files['hdf5_file']
 
 # ----------------------------------------------------------------------------------------------------------------------
 
-# LOAD DATA FROM HDF5 FILE
-df_air_quality = read_air_quality_data(h5_file)
-
-df_traffic = read_traffic_data(h5_file)
-df_traffic_sensors = read_traffic_sensors(h5_file, 'traffic')
-
-df_constructions = read_construction_data(h5_file)
-df_constructions['Coordinates'] = df_constructions.apply(lambda row:
-                                                         row['Coordinates'] if isinstance(row['Coordinates'], list)
-                                                         else (row['Geometries'][0]['coordinates']
-                                                               if isinstance(row['Geometries'], list) else np.NaN),
-                                                         axis=1)
-
-df_car_registrations = read_car_registration_data(h5_file)
-df_car_registrations.insert(1, 'Month', pd.NA)
-
-df_new_car_registrations = read_new_car_registration_data(h5_file)
-
-df_weather = read_weather_data(h5_file)
+# DATA ACCESS TO HDF5 FILE
+# the file is only opened while data is read, so the crawler can write it while the app is running
+# station data is read on first selection and kept for the recently selected stations (lazy mode),
+# global tables are read on first use
+data = AppDataAccess(h5_file, store_options=config['hdf5_store'], lazy=config['app']['lazy_loading'],
+                     cache_size=config['app']['station_cache_size'], workers=config['app']['workers'],
+                     view_cache_size=config['app']['view_cache_size'])
 
 # ----------------------------------------------------------------------------------------------------------------------
 
@@ -68,6 +58,11 @@ app.layout = dbc.Container(
                 width=12),
             id='00_header'),
 
+        # periodic refresh of the data (new rows of the crawler) and current data version
+        dcc.Interval(id='refresh_interval', interval=config['app']['refresh_interval'] * 1000,
+                     disabled=not config['app']['refresh_interval']),
+        dcc.Store(id='data_version', data=data.refresh()),
+
         # 01.4 FIGURE WORLD HEATMAP (GLOBAL TEMPERATURE ANOMALIES)
         dbc.Row([
             dbc.Col(
@@ -76,8 +71,8 @@ app.layout = dbc.Container(
                     html.H5('Select an air quality station'),
                     dcc.Dropdown(
                         id='air_quality_station_code',
-                        options=df_air_quality.columns.get_level_values(0).unique(),
-                        value=df_air_quality.columns.get_level_values(0).unique()[0],
+                        options=data.station_codes(),
+                        value=data.station_codes()[0],
                         placeholder='Select a station'
                     ),
                     html.Hr(style={'height': 5}),
@@ -105,15 +100,15 @@ app.layout = dbc.Container(
                     html.H6('Car Registrations (annual count)'),
                     dash_table.DataTable(
                         id='car_registrations_table',
-                        columns=[{"name": i, "id": i} for i in df_car_registrations.columns],
-                        data=df_car_registrations.to_dict('records'),
+                        columns=[{"name": i, "id": i} for i in data.car_registrations().columns],
+                        data=data.car_registrations().to_dict('records'),
                     ),
                     html.Br(),
                     html.H6('New Car Registrations (monthly count)'),
                     dash_table.DataTable(
                         id='new_car_registrations_table',
-                        columns=[{"name": i, "id": i} for i in df_new_car_registrations.columns],
-                        data=df_new_car_registrations.to_dict('records'),
+                        columns=[{"name": i, "id": i} for i in data.new_car_registrations().columns],
+                        data=data.new_car_registrations().to_dict('records'),
                     )
                 ]),
                 width=6
@@ -142,53 +137,59 @@ app.layout = dbc.Container(
 # ----------------------------------------------------------------------------------------------------------------------
 
 
+@app.callback(
+    Output('data_version', 'data'),
+    [Input('refresh_interval', 'n_intervals')],
+    [State('data_version', 'data')],
+)
+def refresh_data(n_intervals, current_version):
+    # read rows added since the last refresh, the figures are only updated if the data changed
+    version = data.refresh()
+
+    if version == current_version:
+        raise PreventUpdate
+
+    return version
+
+
 @app.callback(
     Output('air_quality_data', 'figure'),
     Output('air_quality_station_info', 'children'),
     Output('berlin_map', 'figure'),
     Output('number_constructions', 'children'),
     Output('number_sensors', 'children'),
-    [Input('air_quality_station_code', 'value')],
+    [Input('air_quality_station_code', 'value'), Input('data_version', 'data')],
 )
-def air_quality_data(station):
-    # initialize marker list
-    coordinates_marker = []
-
-    # filter air quality data from specified station
-    df_air_quality_data = df_air_quality[station]
-
-    # extract geographical data of air quality station
-    station_address, station_lat, station_lng = read_air_quality_station_data(h5_file, station)
-
-    station_info = 'Code: ' + station + ' - Address: ' + station_address
-
-    # add air quality station coordinates as station type
-    coordinates_marker.append((station_lat, station_lng, 'station'))
+def air_quality_data(station, version=None):
+    # figures, station info and counts from the cache (built again after the data changed)
+    return data.view(station, lambda: station_view(station))
 
-    # count constructions and add construction coordinates to marker list which are nearby the station
-    construction_count, coordinates_marker = constructions_nearby_station(df_constructions, station_lat,
-                                                                          station_lng, coordinates_marker)
 
-    # extract sensor IDs and add construction coordinates to marker list which are nearby the station
-    sensors, coordinates_marker = traffic_nearby_station(df_traffic_sensors, df_traffic,
-                                                         station_lat, station_lng, coordinates_marker)
+def station_view(station):
+    """
+    Builds figures (serialized), station info and counts of a station
 
-    # extract traffic data from sensors nearby station
-    df_traffic_data = df_traffic.loc[(sensors, slice(None)), :]
+    :param station: code of the station
+    :return: outputs of the callback air_quality_data
+    """
+    # data of the station: air quality, traffic of the nearby sensors, constructions and markers
+    station_data = data.station_data(station)
 
-    # restructure the DataFrame to get one column per sensor
-    df_traffic_reshaped = df_traffic_data.unstack(level=0)
+    station_info = 'Code: ' + station + ' - Address: ' + station_data['address']
 
     # extract sensor IDs with valid (not NA) values
-    sensor_codes = df_traffic_reshaped.columns.get_level_values(1)
+    sensor_codes = station_data['traffic'].columns.get_level_values(1)
 
     # creating air quality + traffic figure
-    fig_station = create_air_quality_traffic_figure(df_air_quality_data, df_traffic_reshaped, df_weather, sensor_codes)
+    fig_station = create_air_quality_traffic_figure(station_data['air_quality'], station_data['traffic'],
+                                                    data.weather(), sensor_codes)
 
-    fig_berlin = create_map_figure(coordinates_marker)
+    fig_berlin = create_map_figure(station_data['markers'])
 
-    return fig_station, station_info, fig_berlin, construction_count, len(sensors)
+    return fig_station.to_dict(), station_info, fig_berlin.to_dict(), station_data['construction_count'], \
+        len(station_data['sensors'])
 
 
-app.run_server(port=8051, debug=True)
-# app.run_server(port=8051)
+if __name__ == '__main__':
+    app.run_server(port=8051, debug=True)
+    # app.run_server(port=8051)
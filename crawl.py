@@ -4,6 +4,12 @@ from utils.crawl_initialization import *
 from utils.crawl_data_preprocessing import *
 from utils.hdf5_file_input import *
 from utils.hdf5_file_output import *
+from utils.parquet_export import *
+from utils.staging_log import *
+from utils.feature_table import *
+from utils.data_validation import *
+from utils.gap_detection import *
+from utils.neighborhoods import *
 
 from utils.crawl_data_extraction import *
 
@@ -20,6 +26,9 @@ config = read_config_file()
 # determine current datetime
 current_datetime = datetime.now()
 
+# identifier of this run for the segments of the staging log
+run_id = current_datetime.strftime('%Y%m%dT%H%M%S')
+
 # read list of essential files
 main_files = config['main_files']
 # check if main files do exist
@@ -154,10 +163,10 @@ for subject, status in status_logging_files.items():
                 logger['general'].error(f'Subject {subject}: Process ended with ERROR --> see log file')
                 continue
 
-        # add data to HDF5 File
-        logger[subject].info('Saving collected data to H5-File')
-        add_air_quality_data(h5_file, data_air_quality)
-        logger[subject].info('Successfully saved data to H5-File')
+        # add data to staging log (merged into HDF5 File by compaction)
+        logger[subject].info('Saving collected data to staging log')
+        stage_air_quality_data(data_paths['staging'], run_id, data_air_quality)
+        logger[subject].info('Successfully saved data to staging log')
 
         logger[subject].info(f'Process COMPLETED for {api_date}')
         logger['general'].info(f'Subject {subject}: Process COMPLETED for {api_date}')
@@ -187,6 +196,9 @@ for subject, status in status_logging_files.items():
             logger['general'].error(f'Subject {subject}: Process ended with ERROR --> see log file')
             continue
 
+        # create empty data containers
+        sensor_names, timestamps, results = [], [], []
+
         for name, row in df_sensors.iterrows():
             logger[subject].info(f'Crawling data for {api_date}')
 
@@ -205,10 +217,11 @@ for subject, status in status_logging_files.items():
 
                     # extract needed data from sensor data
                     timestamp, result = preprocess_traffic_data(sensor_data)
-                    logger[subject].info(f'{name}: Saving data to H5-File')
 
-                    # add data to HDF5 File
-                    add_traffic_data(h5_file, name, timestamp, result)
+                    # collect data for staging log
+                    sensor_names.append(name)
+                    timestamps.append(timestamp)
+                    results.append(result)
                 else:
                     logger[subject].error(f'{name}: No data found')
             else:
@@ -216,7 +229,10 @@ for subject, status in status_logging_files.items():
                 logger['general'].error(f'{subject}: ERROR occurred crawling data for {name}')
                 continue
 
-        logger[subject].info('Successfully saved data to H5-File')
+        # add data to staging log (merged into HDF5 File by compaction)
+        logger[subject].info('Saving collected data to staging log')
+        stage_traffic_data(data_paths['staging'], run_id, sensor_names, timestamps, results)
+        logger[subject].info('Successfully saved data to staging log')
 
         logger[subject].info(f'Process COMPLETED for {api_date}')
         logger['general'].info(f'Subject {subject}: Process COMPLETED for {api_date}')
@@ -364,11 +380,11 @@ for subject, status in status_logging_files.items():
             logger['general'].error(f'Subject {subject}: Process ended with ERROR --> see log file')
             continue
 
-        logger[subject].info('Start saving data to H5-File')
+        logger[subject].info('Start saving data to staging log')
 
-        # add data to HDF5 File
-        add_weather_data(h5_file, temperature, precipitation, wind_speed)
-        logger[subject].info('Successfully saved data to H5-File')
+        # add data to staging log (merged into HDF5 File by compaction)
+        stage_weather_data(data_paths['staging'], run_id, temperature, precipitation, wind_speed)
+        logger[subject].info('Successfully saved data to staging log')
 
         logger[subject].info(f'Process COMPLETED for {crawl_date}')
         logger['general'].info(f'Subject {subject}: Process COMPLETED for {crawl_date}')
@@ -432,3 +448,126 @@ for subject, status in status_logging_files.items():
 
         logger[subject].info(f'Process COMPLETED for {download_date}')
         logger['general'].info(f'Subject {subject}: Process COMPLETED for {download_date}')
+
+# compute rollups and quantile sketches of datasets which don't have any yet
+# (H5-Files created before rollups / sketches were introduced)
+try:
+    number_of_rollups = build_rollups(h5_file)
+    if number_of_rollups > 0:
+        logger['general'].info(f'Subject rollups: Computed rollups of {number_of_rollups} datasets')
+except Exception as error:
+    logger['general'].error(f'Subject rollups: Process ended with ERROR ({error})')
+
+try:
+    number_of_sketches = build_sketches(h5_file)
+    if number_of_sketches > 0:
+        logger['general'].info(f'Subject sketches: Computed quantile sketches of {number_of_sketches} datasets')
+except Exception as error:
+    logger['general'].error(f'Subject sketches: Process ended with ERROR ({error})')
+
+# merge staging log into HDF5 File (including segments of previous runs which weren't compacted)
+logger['general'].info('Subject staging log: Process started for compaction')
+try:
+    compacted_segments = compact_staging_log(h5_file, data_paths['staging'], config['staging']['batch_size'])
+    logger['general'].info(f'Subject staging log: Process COMPLETED ({compacted_segments} segments compacted)')
+except Exception as error:
+    logger['general'].error(f'Subject staging log: Process ended with ERROR ({error})')
+
+# re-crawl missing hours of air quality and traffic data within the last days (utils.gap_detection)
+if config['gaps']['repair']:
+    logger['general'].info('Subject gaps: Process started for re-crawling missing hours')
+    try:
+        # AIR QUALITY: one request per station and range of missing hours (of all components)
+        jobs = gap_jobs(h5_file, 'air_quality', current_datetime, config['gaps']['days'],
+                        config['gaps']['merge_hours'], config['gaps']['max_hours'],
+                        Path(data_paths['staging']) / 'gap_attempts_air_quality.json', config['gaps']['max_attempts'])
+        logger['air_quality'].info(f'Re-crawling {len(jobs)} ranges of missing hours')
+
+        data_air_quality = []
+        for station_code, start, end, hours in jobs.itertuples(index=False):
+            url_station = config['url']['air_quality_data_range'].format(
+                station_code, format_gap_hour(start, '%Y-%m-%d %H:%M'), format_gap_hour(end, '%Y-%m-%d %H:%M'))
+            logger['air_quality'].info(f'{station_code}: Re-crawling {hours} hours with url {url_station}')
+
+            station_data, status_code_crawl = extract_station_data(url_station)
+
+            if station_data is not None:
+                data_air_quality.extend(station_data)
+            else:
+                logger['air_quality'].error(f'{station_code}: ERROR re-crawling data ({status_code_crawl})')
+
+        if len(data_air_quality) > 0:
+            stage_air_quality_data(data_paths['staging'], f'{run_id}_gaps', data_air_quality)
+
+        # TRAFFIC: one request per sensor and range of missing hours
+        jobs = gap_jobs(h5_file, 'traffic', current_datetime, config['gaps']['days'], config['gaps']['merge_hours'],
+                        config['gaps']['max_hours'], Path(data_paths['staging']) / 'gap_attempts_traffic.json',
+                        config['gaps']['max_attempts'])
+        logger['traffic'].info(f'Re-crawling {len(jobs)} ranges of missing hours')
+
+        df_sensors = read_traffic_sensors(h5_file, 'traffic')
+
+        sensor_names, timestamps, results = [], [], []
+        for name, start, end, hours in jobs.itertuples(index=False):
+            if name not in df_sensors.index:
+                continue
+
+            # observation periods ending within the range
+            url_sensor = df_sensors.loc[name, 'observation_url'] + config['url']['traffic_data_range'].format(
+                format_gap_hour(start - 3600, '%Y-%m-%dT%H:%M:%SZ'), format_gap_hour(end, '%Y-%m-%dT%H:%M:%SZ'))
+            logger['traffic'].info(f'{name}: Re-crawling {hours} hours with url {url_sensor}')
+
+            sensor_data, status_code_crawl = extract_traffic_data(url_sensor)
+
+            if status_code_crawl == 200 and not sensor_data.empty:
+                sensor_timestamps, sensor_results = preprocess_traffic_range_data(sensor_data)
+                sensor_names.extend([name] * len(sensor_timestamps))
+                timestamps.extend(sensor_timestamps)
+                results.extend(sensor_results)
+            else:
+                logger['traffic'].error(f'{name}: ERROR re-crawling data ({status_code_crawl})')
+
+        if len(sensor_names) > 0:
+            stage_traffic_data(data_paths['staging'], f'{run_id}_gaps', sensor_names, timestamps, results)
+
+        # merge re-crawled data into HDF5 File
+        compacted_segments = compact_staging_log(h5_file, data_paths['staging'], config['staging']['batch_size'])
+        logger['general'].info(f'Subject gaps: Process COMPLETED ({compacted_segments} segments compacted)')
+    except Exception as error:
+        logger['general'].error(f'Subject gaps: Process ended with ERROR ({error})')
+
+# update neighborhoods of the stations (sensors and constructions within the radii) if locations changed
+try:
+    number_of_pairs = update_neighborhoods(h5_file, config['neighborhoods']['radii'])
+    if number_of_pairs > 0:
+        logger['general'].info(f'Subject neighborhoods: Process COMPLETED ({number_of_pairs} neighbors stored)')
+except Exception as error:
+    logger['general'].error(f'Subject neighborhoods: Process ended with ERROR ({error})')
+
+# update hourly feature table of the stations from the first changed hour on
+logger['general'].info('Subject features: Process started for updating feature table')
+try:
+    number_of_rows = update_feature_table(h5_file, config['features']['radius'])
+    logger['general'].info(f'Subject features: Process COMPLETED ({number_of_rows} rows updated)')
+except Exception as error:
+    logger['general'].error(f'Subject features: Process ended with ERROR ({error})')
+
+# validate the data of the active window and save the quality report of this run
+logger['general'].info('Subject validation: Process started')
+try:
+    quality_report = validate_data(h5_file, config['validation']['days'], config['validation']['flatline_length'],
+                                   config['validation']['spike_threshold'])
+    write_quality_report(h5_file, run_id, quality_report, config['validation']['keep_reports'])
+    logger['general'].info(f'Subject validation: Process COMPLETED ({count_findings(quality_report)} of '
+                           f'{len(quality_report)} series with findings)')
+except Exception as error:
+    logger['general'].error(f'Subject validation: Process ended with ERROR ({error})')
+
+# export new data to Parquet files after the crawl (utils.parquet_export)
+if config['export']['incremental_after_crawl']:
+    logger['general'].info('Subject Parquet export: Process started')
+    try:
+        exported_rows = export_parquet(h5_file, data_paths['parquet'], incremental=True)
+        logger['general'].info(f'Subject Parquet export: Process COMPLETED ({exported_rows})')
+    except Exception as error:
+        logger['general'].error(f'Subject Parquet export: Process ended with ERROR ({error})')
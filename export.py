@@ -0,0 +1,33 @@
+from utils.crawl_setup import *
+from utils.parquet_export import *
+
+import argparse
+import os
+from pathlib import Path
+
+# determine script directory for scheduled execution and change working directory
+script_directory = Path(__file__).parent.absolute()
+os.chdir(script_directory)
+
+
+def main():
+    # parse arguments (complete export by default)
+    parser = argparse.ArgumentParser(description='Export the HDF5 File to date partitioned Parquet files')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only export data added since the last export')
+    arguments = parser.parse_args()
+
+    # read config file (utils.setup)
+    config = read_config_file()
+
+    h5_file = config['main_files']['hdf5_file']
+    export_directory = config['data_paths']['parquet']
+
+    exported_rows = export_parquet(h5_file, export_directory, incremental=arguments.incremental)
+
+    for subject, rows in exported_rows.items():
+        print(f'{subject}: {rows} rows exported')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from utils.crawl_setup import initialize_h5_file
+
+
+STATIONS = [
+    {'code': '010', 'name': 'Station A', 'codeEu': 'DEBE010', 'address': 'Address A', 'lat': '52.52', 'lng': '13.40',
+     'stationgroups': ['traffic'], 'information': 'A', 'activeComponents': ['no2_1h', 'pm10_1h']},
+    {'code': '020', 'name': 'Station B', 'codeEu': 'DEBE020', 'address': 'Address B', 'lat': '52.50', 'lng': '13.30',
+     'stationgroups': ['suburb'], 'information': 'B', 'activeComponents': ['no2_1h']},
+]
+
+
+def traffic_sensors(number_of_sensors=3):
+    """
+    Creates traffic sensors like the ones of the sensor API (coordinates are swapped there)
+
+    :param number_of_sensors: number of sensors
+    :return: dataframe with traffic sensors
+    """
+    return pd.DataFrame([{'@iot.selfLink': 'link', '@iot.id': number, 'name': f'TEU{number:05d}',
+                          'description': 'sensor', 'HistoricalLocations@iot.navigationLink': 'link',
+                          'Locations@iot.navigationLink': 'link', 'Datastreams@iot.navigationLink': 'link',
+                          'location_latitude': 13.40 + 0.001 * number, 'location_longitude': 52.52 + 0.001 * number,
+                          'observation_url': 'url'} for number in range(number_of_sensors)])
+
+
+@pytest.fixture
+def h5_file(tmp_path):
+    """
+    Empty HDF5 File with two air quality stations and three traffic sensors
+    """
+    path = tmp_path / 'analysis.h5'
+    initialize_h5_file(path, STATIONS, traffic_sensors())
+
+    return path
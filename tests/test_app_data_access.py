@@ -0,0 +1,106 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from utils.app_data_access import AppDataAccess, LRUCache, merge_tail
+from utils.hdf5_file_input import add_time_series_data
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+
+    # 'a' is used, so 'b' is the least recently used entry
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+
+    assert 'b' not in cache
+    assert [key for key, _ in cache.items()] == ['a', 'c']
+    assert cache.get('b', 'missing') == 'missing'
+
+
+def test_lru_cache_from_several_threads():
+    cache = LRUCache(8)
+
+    def use(number):
+        cache.put(number % 16, number)
+        cache.get_or_compute((number + 1) % 16, lambda: number)
+        return len(cache.items())
+
+    with ThreadPoolExecutor(8) as executor:
+        sizes = list(executor.map(use, range(2000)))
+
+    assert max(sizes) <= 8 and len(cache) == 8
+
+
+def test_lru_cache_get_or_compute():
+    cache = LRUCache(1)
+    computed = []
+
+    def compute():
+        computed.append(True)
+        return len(computed)
+
+    assert cache.get_or_compute('a', compute) == 1
+    assert cache.get_or_compute('a', compute) == 1
+    assert cache.get_or_compute('b', compute) == 2
+    assert len(cache) == 1
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_merge_tail_twice():
+    index = pd.date_range('2024-01-01', periods=4, freq='h', name='Timestamp')
+    df = pd.DataFrame({'no2': [1.0, 2.0, 3.0, None]}, index=index)
+    df_tail = pd.DataFrame({'no2': [4.0, 5.0]}, index=index[3:].append(pd.DatetimeIndex(['2024-01-01 04:00'])))
+
+    merged = merge_tail(df, df_tail)
+
+    assert merged['no2'].tolist() == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert merge_tail(merged, df_tail).equals(merged)
+
+
+def hourly_rows(start, hours, value):
+    timestamps = pd.Timestamp(start).timestamp() + 3600.0 * np.arange(hours)
+
+    return np.column_stack([timestamps, np.full(hours, value)])
+
+
+def test_file_is_writable_while_app_is_running(h5_file):
+    add_time_series_data(h5_file, {'air_quality/010/no2_1h': hourly_rows('2024-01-01', 24, 10.0),
+                                   'air_quality/010/pm10_1h': hourly_rows('2024-01-01', 24, 20.0)})
+
+    data = AppDataAccess(h5_file)
+    version = data.refresh()
+    assert len(data.station_data('010')['air_quality']) == 24
+
+    # the app keeps no handle of the file open, so the crawler can add rows
+    add_time_series_data(h5_file, {'air_quality/010/no2_1h': hourly_rows('2024-01-02', 2, 11.0)})
+
+    assert data.refresh() > version
+    assert data.station_data('010')['air_quality']['no2_1h'].tolist()[-3:] == [10.0, 11.0, 11.0]
+
+
+def test_station_data_from_several_threads(h5_file):
+    add_time_series_data(h5_file, {'air_quality/010/no2_1h': hourly_rows('2024-01-01', 24, 10.0),
+                                   'air_quality/020/no2_1h': hourly_rows('2024-01-01', 24, 20.0)})
+    data = AppDataAccess(h5_file, cache_size=1)
+
+    def use(number):
+        station = ['010', '020'][number % 2]
+        if number % 5 == 0:
+            data.refresh()
+        view = data.view(station, lambda: data.station_data(station)['air_quality']['no2_1h'].tolist())
+        return station, view
+
+    for day in range(2, 5):
+        with ThreadPoolExecutor(8) as executor:
+            views = list(executor.map(use, range(200)))
+
+        # all threads see the complete data of the station
+        assert all(view == [10.0 if station == '010' else 20.0] * (24 + 2 * (day - 2)) for station, view in views)
+
+        add_time_series_data(h5_file, {'air_quality/010/no2_1h': hourly_rows(f'2024-01-0{day}', 2, 10.0),
+                                       'air_quality/020/no2_1h': hourly_rows(f'2024-01-0{day}', 2, 20.0)})
@@ -0,0 +1,68 @@
+import h5py
+import numpy as np
+import pandas as pd
+
+from utils.hdf5_file_input import add_construction_data
+from utils.hdf5_file_output import HDF5Store
+
+
+def constructions(ids, rng):
+    # random validity periods in February 2024 (some missing and some ending before they start)
+    days = rng.integers(1, 29, size=(len(ids), 2))
+    valid_from = [f'{day:02d}.02.2024 08:00' for day in days[:, 0]]
+    valid_to = [f'{day:02d}.02.2024 18:00' for day in days[:, 1]]
+    for position in np.flatnonzero(rng.random(len(ids)) < 0.1):
+        valid_from[position] = None
+    for position in np.flatnonzero(rng.random(len(ids)) < 0.1):
+        valid_to[position] = None
+
+    return pd.DataFrame({'properties.id': ids, 'properties.tstore': '2024-02-01 10:00',
+                         'properties.subtype': 'Baustelle', 'properties.severity': 'weak',
+                         'properties.validity.from': valid_from, 'properties.validity.to': valid_to,
+                         'properties.direction': 'beidseitig', 'geometry.type': 'Point',
+                         'geometry.coordinates': [[13.4, 52.5]] * len(ids), 'geometry.geometries': np.nan})
+
+
+def add_versions(h5_file, batches=6, seed=7):
+    rng = np.random.default_rng(seed)
+
+    for _ in range(batches):
+        ids = np.unique(rng.integers(0, 60, size=25))
+        add_construction_data(h5_file, constructions(ids, rng))
+
+
+def test_interval_index_contains_current_versions(h5_file):
+    add_versions(h5_file)
+
+    with h5py.File(h5_file, 'r') as hdf5_file:
+        group = hdf5_file['constructions']
+        current_rows = np.sort(group['construction_index'][:, 1])
+        valid_from = group['valid_from'][:][current_rows]
+        valid_to = group['valid_to'][:][current_rows]
+        valid_to = np.maximum(np.where(valid_to == np.iinfo('int64').min, np.iinfo('int64').max, valid_to),
+                              valid_from)
+
+        for name, dates in [('valid_from_index', valid_from), ('valid_to_index', valid_to)]:
+            entries = group[name][:]
+
+            assert np.all(entries[1:, 0] >= entries[:-1, 0])
+            assert sorted(map(tuple, entries)) == sorted(zip(dates, current_rows))
+
+
+def test_query_matches_brute_force(h5_file):
+    add_versions(h5_file)
+
+    with HDF5Store(h5_file) as store:
+        df = store.read_construction_data(with_geometries=False)
+        starts = df['Valid from'].fillna(pd.Timestamp.min)
+        ends = np.maximum(df['Valid to'].fillna(pd.Timestamp.max), starts)
+
+        for start, end in [('2024-02-10', None), ('2024-02-01', '2024-02-03'), ('2024-02-15 12:00', '2024-03-01'),
+                           ('2024-01-01', None), ('2024-04-01', None)]:
+            start = pd.Timestamp(start)
+            end = start if end is None else pd.Timestamp(end)
+
+            expected = df.loc[(starts <= end) & (ends >= start), 'ID']
+            result = store.query_active_constructions(start, end)
+
+            assert sorted(result['ID']) == sorted(expected)
@@ -0,0 +1,56 @@
+import h5py
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.hdf5_file_input import add_construction_data, add_geometry_locations
+from utils.hdf5_file_output import HDF5Store
+
+
+# representative location (latitude, longitude) and bounding box computed by hand
+EXPECTED = {1: (52.5, 13.4, [13.4, 52.5, 13.4, 52.5]),
+            2: (52.5, 13.5, [13.3, 52.4, 13.7, 52.6]),
+            3: (52.3, 13.2, [13.0, 52.1, 13.2, 52.3])}
+
+
+def constructions():
+    # point, line (mean of its coordinates) and geometry collection (its first point)
+    collection = [{'type': 'LineString', 'coordinates': [[13.1, 52.2], [13.0, 52.1]]},
+                  {'type': 'Point', 'coordinates': [13.2, 52.3]}]
+
+    return pd.DataFrame({'properties.id': [1, 2, 3], 'properties.tstore': '2024-02-01 10:00',
+                         'properties.subtype': 'Baustelle', 'properties.severity': 'weak',
+                         'properties.validity.from': '01.02.2024 08:00', 'properties.validity.to': None,
+                         'properties.direction': 'beidseitig',
+                         'geometry.type': ['Point', 'LineString', 'GeometryCollection'],
+                         'geometry.coordinates': [[13.4, 52.5], [[13.3, 52.4], [13.5, 52.6], [13.7, 52.5]], np.nan],
+                         'geometry.geometries': [np.nan, np.nan, collection]})
+
+
+def assert_locations(h5_file):
+    with HDF5Store(h5_file) as store:
+        df = store.read_construction_data(with_geometries=False, with_bounding_boxes=True).set_index('ID')
+        bbox_columns = store.columns('constructions/bbox')
+
+    for construction_id, (lat, lng, bbox) in EXPECTED.items():
+        assert df.loc[construction_id, 'Latitude'] == pytest.approx(lat)
+        assert df.loc[construction_id, 'Longitude'] == pytest.approx(lng)
+        assert df.loc[construction_id, bbox_columns].tolist() == pytest.approx(bbox)
+
+
+def test_locations_on_write(h5_file):
+    add_construction_data(h5_file, constructions())
+
+    assert_locations(h5_file)
+
+
+def test_add_geometry_locations(h5_file):
+    add_construction_data(h5_file, constructions())
+
+    # HDF5 File before the locations were stored on write
+    with h5py.File(h5_file, 'a') as hdf5_file:
+        for name in ['lat', 'lng', 'bbox']:
+            del hdf5_file[f'constructions/{name}']
+        add_geometry_locations(hdf5_file['constructions'])
+
+    assert_locations(h5_file)
@@ -0,0 +1,76 @@
+import json
+
+import h5py
+import numpy as np
+import pandas as pd
+
+from utils.hdf5_file_input import migrate_construction_data
+from utils.hdf5_file_output import HDF5Store
+
+
+LEGACY_COLUMNS = ['ID', 'Timestamp', 'Subtype', 'Severity', 'Valid from', 'Valid to', 'Direction', 'Geo type',
+                  'Coordinates', 'Geometries']
+
+
+def constructions():
+    collection = [{'type': 'Point', 'coordinates': [13.2, 52.3]},
+                  {'type': 'LineString', 'coordinates': [[13.1, 52.2], [13.0, 52.1]]}]
+
+    return pd.DataFrame({'properties.id': [3, 1, 2],
+                         'properties.tstore': ['2024-02-01 10:00', '2024-02-02 11:30', '2024-02-03 12:00'],
+                         'properties.subtype': ['Baustelle', 'Sperrung', 'Baustelle'],
+                         'properties.severity': ['weak', 'strong', 'weak'],
+                         'properties.validity.from': ['01.02.2024 08:00', '05.02.2024 08:00', None],
+                         'properties.validity.to': ['10.02.2024 18:00', None, '20.02.2024 18:00'],
+                         'properties.direction': ['beidseitig', 'Richtung Norden', 'beidseitig'],
+                         'geometry.type': ['Point', 'LineString', 'GeometryCollection'],
+                         'geometry.coordinates': [[13.4, 52.5], [[13.3, 52.4], [13.5, 52.6]], np.nan],
+                         'geometry.geometries': [np.nan, np.nan, collection]})
+
+
+def write_legacy_constructions(h5_file, data):
+    # former string matrix: lists and dictionaries as JSON, all other cells as strings
+    cells = [[json.dumps(cell) if isinstance(cell, (list, dict)) else str(cell) for cell in row]
+             for row in data.itertuples(index=False)]
+
+    with h5py.File(h5_file, 'a') as hdf5_file:
+        del hdf5_file['constructions']
+        constructions_group = hdf5_file.create_group('constructions')
+        dataset = constructions_group.create_dataset('construction_data', data=np.array(cells, dtype=object),
+                                                     maxshape=(None, 10), dtype=h5py.string_dtype())
+        dataset.attrs['columns'] = np.array(LEGACY_COLUMNS, dtype='S')
+
+
+def test_migration_keeps_constructions(h5_file):
+    write_legacy_constructions(h5_file, constructions())
+
+    with HDF5Store(h5_file) as store:
+        legacy = store.read_construction_data().sort_values('ID', ignore_index=True)
+
+    with h5py.File(h5_file, 'a') as hdf5_file:
+        migrate_construction_data(hdf5_file)
+        assert 'construction_data_legacy' in hdf5_file['constructions']
+
+    with HDF5Store(h5_file) as store:
+        migrated = store.read_construction_data().sort_values('ID', ignore_index=True)
+
+    assert migrated['ID'].tolist() == legacy['ID'].tolist() == [1, 2, 3]
+
+    # dates (missing validity dates were stored as 'None')
+    assert migrated['Timestamp'].equals(pd.to_datetime(legacy['Timestamp']))
+    for column in ['Valid from', 'Valid to']:
+        assert migrated[column].equals(pd.to_datetime(legacy[column].replace('None', None), dayfirst=True))
+
+    # categories
+    for column in ['Subtype', 'Severity', 'Direction', 'Geo type']:
+        assert migrated[column].astype(str).tolist() == legacy[column].tolist()
+
+    # geometries and representative locations of points and geometry collections
+    for column in ['Coordinates', 'Geometries']:
+        has_geometry = legacy[column].apply(lambda cell: isinstance(cell, list))
+        assert migrated[column][has_geometry].tolist() == legacy[column][has_geometry].tolist()
+        assert migrated[column][~has_geometry].isna().all()
+
+    points = legacy['Geo type'] != 'LineString'
+    assert migrated['Longitude'][points].tolist() == legacy['Longitude'][points].tolist()
+    assert migrated['Latitude'][points].tolist() == legacy['Latitude'][points].tolist()
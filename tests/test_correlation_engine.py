@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from utils.correlation_engine import column_correlations, rolling_column_correlations
+
+
+def random_pairs(rows=500, columns=4, seed=3):
+    rng = np.random.default_rng(seed)
+    a = rng.normal(size=(rows, columns))
+    b = 0.6 * a + rng.normal(size=(rows, columns))
+    a[rng.random((rows, columns)) < 0.1] = np.nan
+    b[rng.random((rows, columns)) < 0.1] = np.nan
+
+    return a, b
+
+
+def test_column_correlations_match_pandas():
+    a, b = random_pairs()
+
+    expected = [pd.Series(a[:, column]).corr(pd.Series(b[:, column])) for column in range(a.shape[1])]
+
+    assert np.allclose(column_correlations(a, b), expected)
+
+
+def test_rolling_correlations_match_pandas():
+    a, b = random_pairs()
+    window, min_periods = 48, 24
+
+    result = rolling_column_correlations(a, b, window, min_periods)
+
+    for column in range(a.shape[1]):
+        # pandas only uses rows where both values are available
+        valid = ~np.isnan(a[:, column]) & ~np.isnan(b[:, column])
+        series_a = pd.Series(np.where(valid, a[:, column], np.nan))
+        series_b = pd.Series(np.where(valid, b[:, column], np.nan))
+        expected = series_a.rolling(window, min_periods=min_periods).corr(series_b).to_numpy()
+
+        assert np.allclose(result[:, column], expected, equal_nan=True, atol=1e-6)
+
+
+def test_constant_columns_have_no_correlation():
+    a = np.ones((100, 1))
+    b = np.arange(100.0).reshape(-1, 1)
+
+    assert np.isnan(column_correlations(a, b)).all()
+    assert np.isnan(rolling_column_correlations(a, b, 24)).all()
@@ -0,0 +1,55 @@
+import numpy as np
+
+from utils.data_validation import check_series, flatline_counts, spike_counts
+
+
+def flatline_counts_loop(column, flatline_length):
+    # values which are part of a run of at least flatline_length equal values
+    count, run = 0, 1
+    for position in range(1, len(column) + 1):
+        if position < len(column) and column[position] == column[position - 1]:
+            run += 1
+            continue
+        if run >= flatline_length:
+            count += run
+        run = 1
+
+    return count
+
+
+def test_flatline_counts_match_loop():
+    rng = np.random.default_rng(5)
+    matrix = rng.integers(0, 3, size=(300, 6)).astype('float64')
+    matrix[rng.random(matrix.shape) < 0.05] = np.nan
+
+    for flatline_length in [2, 3, 4]:
+        expected = [flatline_counts_loop(matrix[:, column], flatline_length) for column in range(matrix.shape[1])]
+        assert list(flatline_counts(matrix, flatline_length)) == expected
+
+
+def test_flatline_counts_short_window():
+    assert list(flatline_counts(np.ones((3, 2)), 6)) == [0, 0]
+
+
+def test_spike_counts():
+    values = np.sin(np.arange(200) / 10.0)
+    matrix = np.column_stack([values, values, values])
+    matrix[50, 1] += 5.0   # spike up
+    matrix[120, 1] -= 5.0  # spike down
+    matrix[80:, 2] += 5.0  # level shift, no spike
+
+    assert list(spike_counts(matrix, 6.0)) == [0, 2, 0]
+
+
+def test_check_series():
+    series = np.array([0, 0, 0, 0, 1, 1, 1])
+    positions = np.array([0, 1, 1, 3, 0, 2, 7])
+    values = np.array([1.0, 2.0, 2.5, 99.0, 1.0, np.nan, 1.0])
+
+    report = check_series(series, positions, values, 2, 4, lower=np.array([0.0, 0.0]), upper=np.array([10.0, 10.0]),
+                          flatline_length=None, spike_threshold=None)
+
+    # expected, values, missing, duplicates, out of range
+    assert report[0, :5].tolist() == [4, 3, 1, 1, 1]
+    assert report[1, :5].tolist() == [4, 1, 3, 0, 0]
+    assert np.isnan(report[:, 5:]).all()
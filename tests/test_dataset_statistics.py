@@ -0,0 +1,41 @@
+import h5py
+import numpy as np
+
+from utils.hdf5_file_input import append_rows, reset_dataset_statistics
+from utils.hdf5_file_output import dataset_statistics
+
+
+def test_statistics_of_batches_match_statistics_of_all_rows(h5_file):
+    rows = np.column_stack([np.arange(100) * 3600.0, np.random.default_rng(1).normal(40, 10, 100)])
+    rows[[5, 50], 1] = np.nan
+
+    with h5py.File(h5_file, 'a') as hdf5_file:
+        dataset = hdf5_file['air_quality/010/no2_1h']
+        for batch in np.array_split(rows, [1, 30, 31, 80]):
+            append_rows(dataset, batch)
+
+        statistics = dataset_statistics(dataset)
+
+    values = rows[~np.isnan(rows[:, 1]), 1]
+
+    assert statistics['count'] == 100
+    assert statistics['values'].loc['Value', 'count'] == 98
+    assert np.isclose(statistics['values'].loc['Value', 'mean'], values.mean())
+    assert np.isclose(statistics['values'].loc['Value', 'variance'], values.var(ddof=1))
+    assert np.isclose(statistics['values'].loc['Value', 'min'], values.min())
+    assert np.isclose(statistics['values'].loc['Value', 'max'], values.max())
+
+
+def test_reset_statistics_matches_fallback_evaluation(h5_file):
+    rows = np.column_stack([np.arange(10) * 3600.0, np.arange(10.0)])
+
+    with h5py.File(h5_file, 'a') as hdf5_file:
+        dataset = hdf5_file['air_quality/010/no2_1h']
+        append_rows(dataset, rows)
+        dataset[3, 1] = 100.0
+        reset_dataset_statistics(dataset)
+
+        statistics = dataset_statistics(dataset)
+
+    assert statistics['values'].loc['Value', 'max'] == 100.0
+    assert np.isclose(statistics['values'].loc['Value', 'mean'], (45.0 - 3.0 + 100.0) / 10)
@@ -0,0 +1,83 @@
+import h5py
+import numpy as np
+
+from utils.feature_table import update_feature_table
+from utils.hdf5_file_input import add_time_series_data
+
+
+# 2023-11-14 22:00 UTC
+FIRST_HOUR = 1699999200.0
+
+
+def hourly_rows(first_hour, hours, values):
+    return np.column_stack([FIRST_HOUR + 3600.0 * np.arange(first_hour, first_hour + hours),
+                            np.broadcast_to(values, hours)])
+
+
+def add_data(h5_file, first_hour, hours, offset=0.0, overwrite=False):
+    # pollutants of both stations and traffic of all sensors (within 500 m of station 010)
+    values = np.arange(first_hour, first_hour + hours, dtype='float64') + offset
+    add_time_series_data(h5_file, {'air_quality/010/no2_1h': hourly_rows(first_hour, hours, values),
+                                   'air_quality/010/pm10_1h': hourly_rows(first_hour, hours, values / 2),
+                                   'air_quality/020/no2_1h': hourly_rows(first_hour, hours, values * 2),
+                                   'traffic/TEU00000': hourly_rows(first_hour, hours, values * 10),
+                                   'traffic/TEU00001': hourly_rows(first_hour, hours, values * 20),
+                                   'traffic/TEU00002': hourly_rows(first_hour, hours, values * 30)}, overwrite)
+
+
+def read_features(h5_file):
+    with h5py.File(h5_file, 'r') as hdf5_file:
+        return {station: hdf5_file[f'features/{station}'][:] for station in ['010', '020']}
+
+
+def rebuild_features(h5_file, radius):
+    with h5py.File(h5_file, 'a') as hdf5_file:
+        del hdf5_file['features']
+    update_feature_table(h5_file, radius)
+
+    return read_features(h5_file)
+
+
+def assert_features_equal(features, expected):
+    for station in expected:
+        assert np.array_equal(features[station], expected[station], equal_nan=True)
+
+
+def test_update_within_window_matches_rebuild(h5_file):
+    add_data(h5_file, 0, 48)
+    assert update_feature_table(h5_file) == 2 * 48
+    assert update_feature_table(h5_file) == 0
+
+    # overwrite hours within the existing table and append some hours
+    add_data(h5_file, 20, 10, offset=100.0, overwrite=True)
+    add_data(h5_file, 48, 5)
+    assert 0 < update_feature_table(h5_file) < 2 * 53
+    features = read_features(h5_file)
+
+    expected = rebuild_features(h5_file, 500)
+    assert_features_equal(features, expected)
+
+    table = features['010']
+    assert table.shape[0] == 53
+    assert np.array_equal(table[20:30, 1], np.arange(20, 30) + 100.0)
+    # all three sensors within the radius (columns Timestamp, no2_1h, pm10_1h, Traffic sum, Traffic mean, ...)
+    assert np.all(table[:, 5] == 3)
+
+
+def test_changed_radius_rebuilds_table(h5_file):
+    add_data(h5_file, 0, 48)
+    update_feature_table(h5_file, radius=500)
+
+    # nothing changed but the radius: everything is recomputed
+    assert update_feature_table(h5_file, radius=200) == 2 * 48
+    features = read_features(h5_file)
+
+    with h5py.File(h5_file, 'r') as hdf5_file:
+        assert hdf5_file['features'].attrs['radius'] == 200
+        columns = [column.decode('utf-8') for column in hdf5_file['features/010'].attrs['columns']]
+
+    # two sensors within 200 m of station 010
+    assert np.all(features['010'][:, columns.index('Traffic sensors')] == 2)
+
+    expected = rebuild_features(h5_file, 200)
+    assert_features_equal(features, expected)
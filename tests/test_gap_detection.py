@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from utils.gap_detection import find_gaps, merge_gaps
+
+HOUR = 3600
+START = 1_700_000_000 // HOUR * HOUR
+
+
+def gaps_frame(rows):
+    return pd.DataFrame(rows, columns=['Source', 'Start', 'End']).assign(
+        Start=lambda df: START + df['Start'] * HOUR, End=lambda df: START + df['End'] * HOUR)
+
+
+def test_find_gaps():
+    hours = np.array([2, 3, 4, 7, 9, 10])
+    # float32 like the stored timestamps
+    timestamps = (START + hours * HOUR).astype('float32')
+
+    gaps = find_gaps(timestamps, START, START + 12 * HOUR)
+
+    assert ((gaps - START) / HOUR).tolist() == [[0, 1], [5, 6], [8, 8], [11, 12]]
+
+
+def test_find_gaps_complete_series():
+    timestamps = START + np.arange(24) * HOUR
+
+    assert len(find_gaps(timestamps, START, START + 23 * HOUR)) == 0
+
+
+def test_merge_gaps():
+    gaps = gaps_frame([('010', 0, 1), ('010', 3, 3), ('010', 2, 2), ('010', 10, 12), ('020', 0, 0),
+                       ('010', 5, 5)])
+
+    jobs = merge_gaps(gaps, merge_hours=1)
+
+    # overlapping and adjacent gaps and gaps with at most one hour in between are merged per source
+    assert jobs['Source'].tolist() == ['010', '010', '020']
+    assert ((jobs['Start'] - START) / HOUR).tolist() == [0, 10, 0]
+    assert ((jobs['End'] - START) / HOUR).tolist() == [5, 12, 0]
+    assert jobs['Hours'].tolist() == [6, 3, 1]
+
+
+def test_merge_gaps_splits_long_jobs():
+    jobs = merge_gaps(gaps_frame([('010', 0, 9)]), max_hours=4)
+
+    assert ((jobs['Start'] - START) / HOUR).tolist() == [0, 4, 8]
+    assert ((jobs['End'] - START) / HOUR).tolist() == [3, 7, 9]
+    assert jobs['Hours'].tolist() == [4, 4, 2]
+
+
+def test_merge_gaps_empty():
+    assert merge_gaps(pd.DataFrame(columns=['Source', 'Start', 'End'])).empty
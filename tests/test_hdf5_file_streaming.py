@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.hdf5_file_input import add_time_series_data
+from utils.hdf5_file_streaming import aggregate_dataset, iter_dataset_chunks
+
+
+# 2023-11-14 22:00 UTC, stored as float32 about half of the following hours are a few seconds too early
+FIRST_HOUR = 1699999200.0
+
+
+@pytest.fixture
+def traffic_file(h5_file):
+    values = np.arange(72, dtype='float64')
+    values[[5, 30, 31]] = np.nan
+    add_time_series_data(h5_file, {'traffic/TEU00000': np.column_stack([FIRST_HOUR + 3600.0 * np.arange(72),
+                                                                         values])})
+
+    # in-memory series with the exact hours
+    series = pd.Series(values, index=pd.to_datetime(FIRST_HOUR + 3600.0 * np.arange(72), unit='s'))
+
+    return h5_file, series
+
+
+def test_iter_dataset_chunks(traffic_file):
+    h5_file, series = traffic_file
+
+    chunks = list(iter_dataset_chunks(h5_file, 'traffic/TEU00000', chunk_rows=25))
+    assert [len(chunk) for chunk in chunks] == [25, 25, 22]
+    assert np.array_equal(pd.concat(chunks).iloc[:, 0].to_numpy(), series.to_numpy(), equal_nan=True)
+
+
+@pytest.mark.parametrize('frequency', ['h', 'D'])
+def test_aggregate_dataset(traffic_file, frequency):
+    h5_file, series = traffic_file
+
+    # chunks of 25 rows: the borders lie within the second and the third day
+    aggregated = aggregate_dataset(h5_file, 'traffic/TEU00000', frequency, chunk_rows=25)['Traffic']
+
+    grouped = series.groupby(series.index.to_period(frequency).start_time)
+    assert aggregated.index.tolist() == grouped.count().index.tolist()
+    assert aggregated['count'].tolist() == grouped.count().tolist()
+    for statistic in ['sum', 'min', 'max', 'mean']:
+        assert np.allclose(aggregated[statistic], grouped.agg(statistic), equal_nan=True)
@@ -0,0 +1,96 @@
+import h5py
+import numpy as np
+
+import utils.hdf5_file_input
+from utils.hdf5_file_input import add_time_series_data, merge_rows
+from utils.hdf5_file_output import HDF5Store
+from utils.staging_log import compact_staging_log, stage_traffic_data
+
+
+def hourly_rows(first_hour, hours, value):
+    return np.column_stack([1.7e9 + 3600.0 * np.arange(first_hour, first_hour + hours), np.full(hours, value)])
+
+
+def test_merge_rows_is_idempotent(h5_file):
+    rows = hourly_rows(0, 48, 1.0)
+
+    with h5py.File(h5_file, 'a') as hdf5_file:
+        dataset = hdf5_file['air_quality/010/no2_1h']
+
+        assert merge_rows(dataset, rows[24:]) == 24
+        # backfill with rows partly existing already
+        assert merge_rows(dataset, rows[:30]) == 24
+        data = dataset[:]
+
+        # merging the same rows again doesn't change anything
+        version = hdf5_file.attrs['data_version']
+        assert merge_rows(dataset, rows) == 0
+        assert np.array_equal(dataset[:], data)
+        assert hdf5_file.attrs['data_version'] == version
+
+    assert np.array_equal(data, rows.astype(data.dtype))
+
+
+def test_merge_rows_overwrite(h5_file):
+    with h5py.File(h5_file, 'a') as hdf5_file:
+        dataset = hdf5_file['air_quality/010/no2_1h']
+        merge_rows(dataset, hourly_rows(0, 24, 1.0))
+
+        # existing timestamps are dropped or overwritten
+        assert merge_rows(dataset, hourly_rows(10, 20, 2.0)) == 6
+        assert dataset[:, 1].tolist() == [1.0] * 24 + [2.0] * 6
+        merge_rows(dataset, hourly_rows(10, 20, 2.0), overwrite=True)
+        assert dataset[:, 1].tolist() == [1.0] * 10 + [2.0] * 20
+
+        assert hdf5_file['air_quality'].attrs['rewritten_version'] == hdf5_file.attrs['data_version']
+
+
+def test_one_data_version_per_batch(h5_file, tmp_path):
+    with h5py.File(h5_file, 'r') as hdf5_file:
+        version = hdf5_file.attrs.get('data_version', 0)
+
+    add_time_series_data(h5_file, {'air_quality/010/no2_1h': hourly_rows(0, 24, 1.0),
+                                   'air_quality/020/no2_1h': hourly_rows(0, 24, 2.0),
+                                   'traffic/TEU00000': hourly_rows(0, 24, 3.0)})
+
+    for run in range(3):
+        stage_traffic_data(tmp_path / 'staging', f'run{run}', ['TEU00000', 'TEU00001'],
+                           [1.7e9 + 3600.0 * (24 + run)] * 2, [4.0, 5.0])
+    compact_staging_log(h5_file, tmp_path / 'staging', batch_size=2)
+
+    with h5py.File(h5_file, 'r') as hdf5_file:
+        assert hdf5_file.attrs['data_version'] == version + 2
+        assert hdf5_file['air_quality'].attrs['data_version'] == version + 1
+        assert hdf5_file['traffic'].attrs['data_version'] == version + 2
+
+        # rollups of all merged rows
+        assert hdf5_file['rollups/traffic/TEU00000/hourly'].shape[0] == 27
+
+
+def test_rewrite_journal(h5_file, monkeypatch):
+    monkeypatch.setattr(utils.hdf5_file_input, 'REWRITE_JOURNAL_SIZE', 2)
+
+    add_time_series_data(h5_file, {'traffic/TEU00000': hourly_rows(0, 24, 1.0)})
+    with HDF5Store(h5_file) as store:
+        first_version = store.data_version()
+        assert store.rewritten_since('traffic', 0) is None
+
+    # backfills of hours 20 and 10 and an appended row (timestamps are stored as float32)
+    for hour in [20, 10]:
+        add_time_series_data(h5_file, {'traffic/TEU00000': np.vstack([hourly_rows(hour, 1, 2.0),
+                                                                      hourly_rows(30 + hour, 1, 2.0)])},
+                             overwrite=True)
+    add_time_series_data(h5_file, {'traffic/TEU00000': hourly_rows(60, 1, 3.0)})
+
+    with HDF5Store(h5_file) as store:
+        assert store.rewritten_since('traffic', first_version) == np.float32(1.7e9 + 10 * 3600)
+        assert store.rewritten_since('traffic', first_version + 1) == np.float32(1.7e9 + 10 * 3600)
+        assert store.rewritten_since('traffic', first_version + 2) is None
+        assert store.rewritten_since('air_quality', 0) is None
+
+    # the first rewrite is removed from the journal
+    add_time_series_data(h5_file, {'traffic/TEU00000': hourly_rows(5, 1, 4.0)}, overwrite=True)
+
+    with HDF5Store(h5_file) as store:
+        assert store.rewritten_since('traffic', first_version) == -np.inf
+        assert store.rewritten_since('traffic', first_version + 1) == np.float32(1.7e9 + 5 * 3600)
@@ -0,0 +1,40 @@
+import numpy as np
+
+from utils.hdf5_file_output import HDF5Store
+from utils.neighborhoods import station_neighbors, update_neighborhoods
+from utils.spatial_index import haversine_distances
+
+
+def test_station_neighbors_match_brute_force():
+    rng = np.random.default_rng(21)
+    station_lats, station_lngs = rng.uniform(52.4, 52.6, 10), rng.uniform(13.2, 13.6, 10)
+    lats, lngs = rng.uniform(52.4, 52.6, 500), rng.uniform(13.2, 13.6, 500)
+    lats[::50] = np.nan
+
+    stations, neighbors, distances = station_neighbors(station_lats, station_lngs, lats, lngs, 2000)
+
+    for station in range(10):
+        all_distances = haversine_distances(station_lats[station], station_lngs[station], lats, lngs)
+        expected = np.flatnonzero(all_distances <= 2000)
+
+        assert neighbors[stations == station].tolist() == expected.tolist()
+        assert np.allclose(distances[stations == station], all_distances[expected])
+
+
+def test_update_neighborhoods(h5_file):
+    # the sensors are about 0, 130 and 260 meters away from station 010 and far away from station 020
+    assert update_neighborhoods(h5_file, radii=(100, 500)) == 3
+
+    with HDF5Store(h5_file) as store:
+        _, df_sensors, df_constructions = store.read_neighborhood('010', radius=500)
+        assert df_sensors.index.tolist() == ['TEU00000', 'TEU00001', 'TEU00002']
+        assert df_constructions.empty
+
+        assert store.read_neighborhood('010', radius=100)[1].index.tolist() == ['TEU00000']
+        assert store.read_neighborhood('020', radius=500)[1].empty
+
+        # radius larger than the table
+        assert store.read_neighborhood('010', radius=1000) is None
+
+    # up to date
+    assert update_neighborhoods(h5_file, radii=(100, 500)) == 0
@@ -0,0 +1,58 @@
+import h5py
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+from utils.hdf5_file_input import add_time_series_data
+from utils.parquet_export import export_parquet
+
+
+def hourly_rows(start, hours, value):
+    timestamps = pd.Timestamp(start).timestamp() + 3600.0 * np.arange(hours)
+
+    return np.column_stack([timestamps, np.full(hours, value)])
+
+
+def read_export(export_directory, subject):
+    df = ds.dataset(export_directory / subject, format='parquet', partitioning='hive').to_table().to_pandas()
+    df = df.drop(columns='date').astype({column: str for column in ['station', 'component'] if column in df})
+
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def test_incremental_export_with_backfill_and_overwrite(h5_file, tmp_path):
+    add_time_series_data(h5_file, {'air_quality/010/no2_1h': hourly_rows('2024-01-01', 48, 1.0),
+                                   'air_quality/020/no2_1h': np.vstack([hourly_rows('2024-01-01', 24, 2.0),
+                                                                        hourly_rows('2024-01-03', 24, 2.0)]),
+                                   'traffic/TEU00000': hourly_rows('2024-01-01', 48, 3.0)})
+    export_parquet(h5_file, tmp_path / 'incremental', incremental=True)
+
+    # appended rows, backfilled gap of an older day and overwritten values
+    add_time_series_data(h5_file, {'air_quality/010/no2_1h': hourly_rows('2024-01-03', 24, 4.0),
+                                   'traffic/TEU00000': hourly_rows('2024-01-03', 2, 5.0)})
+    add_time_series_data(h5_file, {'air_quality/020/no2_1h': hourly_rows('2024-01-02', 24, 6.0)})
+    add_time_series_data(h5_file, {'traffic/TEU00000': hourly_rows('2024-01-01 12:00', 2, 7.0)}, overwrite=True)
+
+    exported_rows = export_parquet(h5_file, tmp_path / 'incremental', incremental=True)
+    export_parquet(h5_file, tmp_path / 'complete')
+
+    # only the partitions from the backfilled / overwritten day on are written again
+    assert exported_rows['air_quality'] == 2 * 48
+    assert exported_rows['traffic'] == 48 + 2
+
+    for subject in ['air_quality', 'traffic']:
+        pd.testing.assert_frame_equal(read_export(tmp_path / 'incremental', subject),
+                                      read_export(tmp_path / 'complete', subject))
+
+    # nothing changed
+    assert export_parquet(h5_file, tmp_path / 'incremental', incremental=True)['air_quality'] == 0
+
+
+def test_export_without_subjects(tmp_path):
+    path = tmp_path / 'empty.h5'
+    with h5py.File(path, 'w'):
+        pass
+
+    exported_rows = export_parquet(path, tmp_path / 'export', incremental=True)
+
+    assert all(rows == 0 for rows in exported_rows.values())
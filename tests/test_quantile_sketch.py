@@ -0,0 +1,39 @@
+import numpy as np
+
+from utils.quantile_sketch import sketch_counts, sketch_quantiles, sketch_exceedances, RELATIVE_ACCURACY
+
+
+def exact_quantiles(values, quantiles):
+    # value with rank quantile * (n - 1) like the sketch
+    values = np.sort(values)
+    return values[np.floor(np.asarray(quantiles) * (len(values) - 1)).astype('int64')]
+
+
+def test_quantiles_within_relative_accuracy():
+    rng = np.random.default_rng(7)
+    quantiles = [0, 0.1, 0.5, 0.9, 0.95, 0.99, 1]
+
+    for values in [rng.lognormal(3, 1, 10000), rng.uniform(0.5, 500, 5000), rng.exponential(20, 3000) + 0.1]:
+        estimated = sketch_quantiles(sketch_counts(values), quantiles)
+        exact = exact_quantiles(values, quantiles)
+
+        assert np.all(np.abs(estimated - exact) <= RELATIVE_ACCURACY * exact + 1e-12)
+
+
+def test_merged_sketches_equal_sketch_of_all_values():
+    rng = np.random.default_rng(8)
+    months = [rng.lognormal(2, 0.5, 700), rng.lognormal(3, 0.5, 300)]
+
+    merged = sketch_counts(months[0]) + sketch_counts(months[1])
+
+    assert np.array_equal(merged, sketch_counts(np.concatenate(months)))
+    assert np.allclose(sketch_quantiles(merged, [0.5, 0.99]),
+                       sketch_quantiles(sketch_counts(np.concatenate(months)), [0.5, 0.99]))
+
+
+def test_missing_values_and_empty_sketch():
+    counts = sketch_counts([np.nan, 10.0, np.nan, 30.0])
+
+    assert counts.sum() == 2
+    assert sketch_exceedances(counts, 20) == 1
+    assert np.isnan(sketch_quantiles(sketch_counts([]), [0.5])).all()
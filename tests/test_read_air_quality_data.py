@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from utils.hdf5_file_input import add_time_series_data
+from utils.hdf5_file_output import HDF5Store
+
+
+def hourly_rows(start, hours, values):
+    timestamps = pd.Timestamp(start).timestamp() + 3600.0 * np.arange(hours)
+
+    return np.column_stack([timestamps, np.broadcast_to(values, hours)])
+
+
+def test_columns_without_values_are_dropped(h5_file):
+    add_time_series_data(h5_file, {'air_quality/010/no2_1h': hourly_rows('2024-01-01', 48, 10.0),
+                                   'air_quality/010/pm10_1h': hourly_rows('2024-01-01', 48, np.nan),
+                                   'air_quality/020/no2_1h': np.vstack([hourly_rows('2024-01-01', 24, 20.0),
+                                                                        hourly_rows('2024-01-02', 24, np.nan)])})
+
+    with HDF5Store(h5_file) as store:
+        df = store.read_air_quality_data()
+        assert df.columns.tolist() == [('010', 'no2_1h'), ('020', 'no2_1h')]
+        assert len(df) == 48
+
+        # station 020 has no values on the second day
+        df = store.read_air_quality_data(start=pd.Timestamp('2024-01-02'))
+        assert df.columns.tolist() == [('010', 'no2_1h')]
+        assert len(df) == 24
+
+        pd.testing.assert_frame_equal(store.read_air_quality_data(start=pd.Timestamp('2024-01-02'), workers=2), df)
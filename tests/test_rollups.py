@@ -0,0 +1,58 @@
+import h5py
+import numpy as np
+
+from utils.hdf5_file_input import add_time_series_data, rollup_rows, update_rollups
+from utils.crawl_setup import ROLLUP_LEVELS
+
+
+# 2023-11-14 22:00 UTC, stored as float32 about half of the following hours are a few seconds too early
+FIRST_HOUR = 1699999200.0
+
+
+def hourly_rows(hours):
+    timestamps = FIRST_HOUR + 3600.0 * np.arange(hours)
+    return np.column_stack([timestamps, np.arange(hours, dtype='float64')])
+
+
+def test_rollup_rows_of_float32_timestamps():
+    rows = hourly_rows(48)
+    stored_rows = rows.astype('float32')
+    assert np.any(stored_rows[:, 0].astype('float64') < rows[:, 0])
+
+    rollup = rollup_rows(stored_rows, ['Timestamp', 'value'], 'h')
+
+    # one period per hour: timestamp, count, mean, min, max
+    assert np.array_equal(rollup[:, 0], rows[:, 0])
+    assert np.all(rollup[:, 1] == 1)
+    assert np.array_equal(rollup[:, 2], rows[:, 1])
+
+    # daily periods: 2 hours of the first day, then full days
+    daily = rollup_rows(stored_rows, ['Timestamp', 'value'], 'D')
+    assert daily[:, 1].tolist() == [2, 24, 22]
+
+
+def test_update_rollups_from_timestamp(h5_file):
+    add_time_series_data(h5_file, {'traffic/TEU00000': hourly_rows(72)})
+
+    with h5py.File(h5_file, 'a') as hdf5_file:
+        dataset = hdf5_file['traffic/TEU00000']
+        rollup_group = hdf5_file['rollups/traffic/TEU00000']
+        assert rollup_group['hourly'].shape[0] == 72
+
+        # change the values from an hour stored slightly too early on and update the rollups from there
+        assert float(dataset[36, 0]) < FIRST_HOUR + 36 * 3600
+        dataset[36:, 1] = dataset[36:, 1] * 2 + 1
+        update_rollups(dataset, dataset[36, 0])
+        rollups = {level: rollup_group[level][:] for level in ROLLUP_LEVELS}
+
+        # full recompute
+        del hdf5_file['rollups/traffic/TEU00000']
+        update_rollups(dataset)
+
+        for level in ROLLUP_LEVELS:
+            assert np.array_equal(rollups[level], hdf5_file[f'rollups/traffic/TEU00000/{level}'][:], equal_nan=True)
+
+        hourly = rollups['hourly']
+        assert hourly.shape[0] == 72
+        assert np.all(hourly[:, 1] == 1)
+        assert np.array_equal(hourly[36:, 2], np.arange(36, 72) * 2 + 1)
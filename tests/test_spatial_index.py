@@ -0,0 +1,41 @@
+import numpy as np
+
+from utils.spatial_index import SpatialIndex, haversine_distances
+
+
+def random_coordinates(number, seed=11):
+    # coordinates around Berlin with a few missing values
+    rng = np.random.default_rng(seed)
+    lats = rng.uniform(52.35, 52.65, number)
+    lngs = rng.uniform(13.1, 13.75, number)
+    lats[rng.random(number) < 0.02] = np.nan
+
+    return lats, lngs
+
+
+def test_haversine_distance():
+    # Brandenburger Tor to Alexanderplatz (about 2.5 km)
+    assert abs(haversine_distances(52.5163, 13.3777, 52.5219, 13.4132) - 2470) < 50
+
+
+def test_query_matches_brute_force():
+    lats, lngs = random_coordinates(5000)
+    index = SpatialIndex(lats, lngs, cell_size=400)
+    rng = np.random.default_rng(12)
+
+    for lat, lng, radius in zip(rng.uniform(52.35, 52.65, 50), rng.uniform(13.1, 13.75, 50),
+                                rng.choice([100, 500, 1500], 50)):
+        positions, distances = index.query(lat, lng, radius)
+
+        all_distances = haversine_distances(lat, lng, lats, lngs)
+        expected = np.flatnonzero(all_distances <= radius)
+
+        assert positions.tolist() == expected.tolist()
+        assert np.allclose(distances, all_distances[expected])
+
+
+def test_query_missing_location_and_empty_index():
+    lats, lngs = random_coordinates(100)
+
+    assert len(SpatialIndex(lats, lngs).query(np.nan, 13.4)[0]) == 0
+    assert len(SpatialIndex([], []).query(52.5, 13.4)[0]) == 0
@@ -0,0 +1,58 @@
+import h5py
+import numpy as np
+import pytest
+
+import utils.staging_log
+from utils.staging_log import compact_staging_log, list_segments, stage_air_quality_data, stage_traffic_data
+
+
+def air_quality_entries(day, value):
+    return [{'datetime': f'2024-01-{day:02d}T{hour:02d}:00:00+00:00', 'station': station, 'component': 'no2_1h',
+             'value': value + hour} for station in ['010', '020'] for hour in range(24)]
+
+
+def stage_runs(staging_directory, days):
+    for day in days:
+        stage_air_quality_data(staging_directory, f'run{day:02d}', air_quality_entries(day, 10.0 * day))
+        stage_traffic_data(staging_directory, f'run{day:02d}', ['TEU00000', 'TEU00001'],
+                           [1.7e9 + day * 3600] * 2, [100.0 + day, 200.0 + day])
+
+
+def test_compaction(h5_file, tmp_path):
+    staging_directory = tmp_path / 'staging'
+    stage_runs(staging_directory, [3, 1, 2])
+
+    assert compact_staging_log(h5_file, staging_directory, batch_size=2) == {'air_quality': 3, 'traffic': 3}
+    assert list_segments(staging_directory) == {'air_quality': [], 'traffic': []}
+
+    with h5py.File(h5_file, 'r') as hdf5_file:
+        data = hdf5_file['air_quality/010/no2_1h'][:]
+        assert len(data) == 72 and np.all(np.diff(data[:, 0]) > 0)
+        assert hdf5_file['traffic/TEU00001'][:, 1].tolist() == [201.0, 202.0, 203.0]
+
+
+def test_interrupted_compaction_is_not_merged_again(h5_file, tmp_path, monkeypatch):
+    staging_directory = tmp_path / 'staging'
+    stage_runs(staging_directory, [1, 2])
+
+    # compaction is interrupted after the rows of the first batch were written
+    def interrupt(path):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(utils.staging_log.os, 'remove', interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        compact_staging_log(h5_file, staging_directory, batch_size=1)
+    monkeypatch.undo()
+
+    with h5py.File(h5_file, 'r') as hdf5_file:
+        assert len(hdf5_file['air_quality/010/no2_1h']) == 24
+        assert hdf5_file.attrs['compacted_segments'].astype('U').tolist() == ['air_quality/run01.npz']
+
+    # the left over segment is only removed, the other segments are merged
+    assert compact_staging_log(h5_file, staging_directory, batch_size=1) == {'air_quality': 1, 'traffic': 2}
+    assert list_segments(staging_directory) == {'air_quality': [], 'traffic': []}
+
+    with h5py.File(h5_file, 'r') as hdf5_file:
+        assert len(hdf5_file['air_quality/010/no2_1h']) == 48
+        assert len(hdf5_file['traffic/TEU00000']) == 2
+        assert len(hdf5_file.attrs['compacted_segments']) == 0
@@ -0,0 +1,36 @@
+import h5py
+import numpy as np
+import pandas as pd
+
+from utils.hdf5_file_input import append_rows
+from utils.hdf5_file_output import timestamp_slice
+
+
+def test_slice_matches_linear_filter(h5_file):
+    # hourly timestamps with a gap, stored as float32 like the crawled data
+    timestamps = np.concatenate([np.arange(0, 48), np.arange(60, 100)]) * 3600.0 + 1.7e9
+
+    with h5py.File(h5_file, 'a') as hdf5_file:
+        dataset = hdf5_file['air_quality/010/no2_1h']
+        append_rows(dataset, np.column_stack([timestamps, np.arange(len(timestamps))]))
+        stored = dataset[:, 0].astype('float64')
+
+        for start, end in [(None, None), (1.7e9 + 10 * 3600, None), (None, 1.7e9 + 50 * 3600),
+                           (1.7e9 + 47 * 3600, 1.7e9 + 61 * 3600), (1.7e9 + 200 * 3600, None), (0, 1.0)]:
+            start_date = None if start is None else pd.to_datetime(start, unit='s')
+            end_date = None if end is None else pd.to_datetime(end, unit='s')
+
+            expected = np.ones(len(stored), dtype=bool)
+            if start is not None:
+                expected &= stored >= np.float32(start)
+            if end is not None:
+                expected &= stored <= np.float32(end)
+
+            rows = timestamp_slice(dataset, start_date, end_date)
+
+            assert np.array_equal(np.arange(len(stored))[rows], np.flatnonzero(expected))
+
+
+def test_slice_of_empty_dataset(h5_file):
+    with h5py.File(h5_file, 'a') as hdf5_file:
+        assert timestamp_slice(hdf5_file['air_quality/010/no2_1h'], '2024-01-01', '2024-02-01') == slice(0, 0)
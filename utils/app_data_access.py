@@ -0,0 +1,537 @@
+import os
+import time
+import threading
+from pathlib import Path
+from collections import OrderedDict
+import pandas as pd
+
+from utils.hdf5_file_output import HDF5Store, sensor_coordinates
+from utils.spatial_index import SpatialIndex
+from utils.app_data_processing import constructions_nearby_station, traffic_nearby_station, nearby_from_neighborhood
+
+# subjects with time series (rows are appended by the crawler)
+TIME_SERIES_SUBJECTS = ['air_quality', 'traffic', 'weather']
+
+# subjects of the global tables (default: name of the table)
+TABLE_SUBJECTS = {'traffic_sensors': 'traffic', 'sensor_index': 'traffic', 'construction_index': 'constructions'}
+
+# subjects the data of a station depends on
+STATION_SUBJECTS = ['air_quality', 'traffic', 'constructions', 'neighborhoods']
+
+# marker of keys missing in a cache
+_MISSING = object()
+
+
+def merge_tail(df, df_tail):
+    """
+    Adds the rows of a tail (e.g. rows appended since the last read) to a dataframe with timestamps as index.
+    New timestamps are added, values of existing timestamps are overwritten, so merging a tail twice doesn't
+    change the dataframe.
+
+    :param df: dataframe with timestamps as index
+    :param df_tail: dataframe with (a subset of) the columns of df
+    :return: merged dataframe
+    """
+    if df_tail.empty:
+        return df
+
+    df = df.reindex(df.index.union(df_tail.index))
+    df.update(df_tail)
+
+    return df
+
+
+def merge_traffic_tail(df_traffic, df_tail):
+    """
+    Adds the rows of a tail to traffic data with (name, Timestamp) as index, see merge_tail
+
+    :param df_traffic: dataframe with traffic data
+    :param df_tail: dataframe with traffic data of (a subset of) the sensors of df_traffic
+    :return: merged dataframe sorted by sensor (order of df_traffic) and timestamp
+    """
+    if df_tail.empty:
+        return df_traffic
+
+    # sensor names of the tail as categories of the traffic data (keeps the categorical index and order)
+    df_tail = df_tail.copy()
+    df_tail.index = df_tail.index.set_levels(
+        pd.CategoricalIndex(df_tail.index.levels[0], categories=df_traffic.index.levels[0].categories), level='name')
+
+    df_traffic = pd.concat([df_traffic, df_tail])
+    df_traffic = df_traffic[~df_traffic.index.duplicated(keep='last')]
+
+    return df_traffic.sort_index(level=['name', 'Timestamp'])
+
+
+def reshape_traffic(df_traffic, sensors):
+    """
+    Reshapes the traffic data of sensors to one column per sensor
+
+    :param df_traffic: dataframe with traffic data with (name, Timestamp) as index
+    :param sensors: names of the sensors
+    :return: dataframe with timestamps as index
+    """
+    return df_traffic.loc[(sensors, slice(None)), :].unstack(level=0)
+
+
+class LRUCache:
+    """
+    Size-bounded cache which removes the least recently used entry when it is full.
+    The entries can be used and changed by several threads (e.g. callbacks of the dashboard).
+    """
+
+    def __init__(self, max_size):
+        """
+        :param max_size: maximum number of entries
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def items(self):
+        """
+        Returns all entries (without changing their order of use)
+
+        :return: list of keys and entries
+        """
+        with self._lock:
+            return list(self._entries.items())
+
+    def get(self, key, default=None):
+        """
+        Returns the entry of a key and marks it as most recently used
+
+        :param key: key
+        :param default: value if the key isn't cached
+        :return: entry
+        """
+        with self._lock:
+            if key not in self._entries:
+                return default
+
+            self._entries.move_to_end(key)
+
+            return self._entries[key]
+
+    def put(self, key, value):
+        """
+        Adds an entry and removes the least recently used entries beyond the maximum size
+
+        :param key: key
+        :param value: entry
+        :return:
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the entry of a key or computes and adds it (computed without holding the lock, so other threads
+        aren't blocked by the computation)
+
+        :param key: key
+        :param compute: function computing the entry
+        :return: entry
+        """
+        entry = self.get(key, _MISSING)
+
+        if entry is _MISSING:
+            entry = compute()
+            self.put(key, entry)
+
+        return entry
+
+    def clear(self):
+        """
+        Removes all entries
+
+        :return:
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+class AppDataAccess:
+    """
+    Data access of the dashboard. In lazy mode nothing is read at start: global tables (sensors, constructions,
+    weather, registrations) are read on first use and the station specific data (air quality of the station and
+    traffic of its nearby sensors) on first selection of a station, kept in an LRU cache of a few stations.
+    Otherwise air quality and traffic data of all stations and sensors are read at start.
+    The HDF5 File is only open while data is read (one read handle per request or refresh), so the crawler can
+    write it while the app is running. Changes of the HDF5 File are picked up by refresh: rows appended to the
+    time series are read and added to the data in memory, other changed data is read again on next use.
+    The data in memory is shared by the threads of the dashboard, reads and changes of it hold one lock.
+    """
+
+    def __init__(self, path, store_options=None, lazy=True, cache_size=8, workers=1, radius=500, view_cache_size=32,
+                 open_attempts=10):
+        """
+        :param path: path to HDF5 File
+        :param store_options: options of the HDF5Store (e.g. chunk cache size)
+        :param lazy: read data on first use
+        :param cache_size: number of stations kept in the cache
+        :param workers: number of worker processes for reading all air quality data (not lazy)
+        :param radius: radius around the stations for traffic sensors and constructions in meters
+        :param view_cache_size: number of station views (figures, station info and counts) kept in the cache
+        :param open_attempts: number of attempts to open the HDF5 File while the crawler is writing it
+        """
+        self.path = Path(path)
+        self.store_options = store_options if store_options is not None else {}
+        self.lazy = lazy
+        self.workers = workers
+        self.radius = radius
+        self.open_attempts = open_attempts
+
+        self._lock = threading.RLock()
+        self._tables = {}
+        self._stations = LRUCache(cache_size)
+        self._views = LRUCache(view_cache_size)
+
+        # modification time, data versions (of the file and every subject) and lengths of the time series datasets
+        # of the HDF5 File when it was read
+        self._modified = os.stat(self.path).st_mtime_ns
+
+        with self._open() as store:
+            self._version = store.data_version()
+            self._subject_versions = self._read_subject_versions(store)
+            self._lengths = {subject: store.dataset_lengths(subject) for subject in TIME_SERIES_SUBJECTS}
+
+        if not lazy:
+            self.air_quality_data()
+            self.traffic_data()
+
+    def _open(self):
+        """
+        Opens the HDF5 File for reading. The file is locked while it is open, so it has to be closed after the
+        read (use as context manager). While the crawler writes the file, opening is retried for a few seconds.
+
+        :return: HDF5Store
+        """
+        for attempt in range(self.open_attempts):
+            try:
+                return HDF5Store(self.path, **self.store_options)
+            except BlockingIOError:
+                # file is locked by the crawler
+                if attempt == self.open_attempts - 1:
+                    raise
+                time.sleep(0.5)
+
+    def _read_subject_versions(self, store):
+        """
+        Reads the data versions of all subjects of the dashboard
+
+        :param store: opened HDF5Store
+        :return: dictionary with data version by subject
+        """
+        subjects = set(TIME_SERIES_SUBJECTS + STATION_SUBJECTS + list(TABLE_SUBJECTS.values()) +
+                       ['car_registrations', 'new_car_registrations'])
+
+        return {subject: store.data_version(subject) for subject in subjects}
+
+    def _appended_rows(self, store, subject):
+        """
+        Determines the rows appended to the time series datasets of a subject since the last refresh
+
+        :param store: opened HDF5Store
+        :param subject: subject (air_quality, traffic, weather)
+        :return: slices of the new rows by dataset path or None if the data has to be read again
+                 (rows were changed or datasets were added, removed or got their first rows)
+        """
+        lengths = store.dataset_lengths(subject)
+        previous_lengths = self._lengths[subject]
+        self._lengths[subject] = lengths
+
+        if store.rewritten_version(subject) > self._version or lengths.keys() != previous_lengths.keys() or \
+                any(lengths[path] < length or length == 0 < lengths[path] for path, length in previous_lengths.items()):
+            return None
+
+        return {path: slice(previous_lengths[path], length) for path, length in lengths.items()
+                if length > previous_lengths[path]}
+
+    def refresh(self):
+        """
+        Picks up changes of the HDF5 File (e.g. by the crawler). After the file was modified rows appended to the
+        time series since the last refresh are read and added to the data in memory (global tables and cached
+        stations), other changed data is discarded and read again on next use.
+        While the crawler writes the file the data isn't changed, the changes are picked up by the next refresh.
+
+        :return: data version
+        """
+        with self._lock:
+            modified = os.stat(self.path).st_mtime_ns
+
+            if modified == self._modified:
+                return self._version
+
+            try:
+                store = self._open()
+            except BlockingIOError:
+                return self._version
+
+            with store:
+                self._modified = modified
+
+                version = store.data_version()
+                if version == self._version:
+                    return version
+
+                subject_versions = self._read_subject_versions(store)
+                changed = [subject for subject, subject_version in subject_versions.items()
+                           if subject_version != self._subject_versions[subject]]
+
+                # rows appended to the time series (None: read again)
+                appended = {subject: self._appended_rows(store, subject) for subject in TIME_SERIES_SUBJECTS
+                            if subject in changed}
+                reload = [subject for subject in changed if appended.get(subject) is None]
+
+                # global tables: add the appended rows or discard
+                for name in list(self._tables):
+                    subject = TABLE_SUBJECTS.get(name, name)
+
+                    if subject in reload:
+                        del self._tables[name]
+                    elif name == 'air_quality' and subject in changed:
+                        self._tables[name] = merge_tail(self._tables[name],
+                                                        store.read_air_quality_data(rows=appended[subject]))
+                    elif name == 'traffic' and subject in changed:
+                        self._tables[name] = merge_traffic_tail(self._tables[name],
+                                                                store.read_traffic_data(rows=appended[subject]))
+                    elif name == 'weather' and subject in changed:
+                        self._tables[name] = merge_tail(self._tables[name],
+                                                        store.read_weather_data(rows=appended[subject]))
+
+                # cached stations: add the appended rows of the station and its sensors or discard
+                # (without lazy loading the data of the stations is taken from the updated tables in memory again)
+                # the data of a station is replaced by an updated copy, so threads using it aren't affected
+                if any(subject in reload for subject in STATION_SUBJECTS) or not self.lazy:
+                    self._stations.clear()
+                elif 'air_quality' in changed or 'traffic' in changed:
+                    for station, station_data in self._stations.items():
+                        station_data = dict(station_data)
+
+                        if 'air_quality' in changed:
+                            df_tail = store.read_air_quality_data(stations=[station], rows=appended['air_quality'])
+                            if station in df_tail:
+                                station_data['air_quality'] = merge_tail(station_data['air_quality'], df_tail[station])
+
+                        if 'traffic' in changed:
+                            df_tail = store.read_traffic_data(sensors=station_data['sensors'], rows=appended['traffic'])
+                            if not df_tail.empty:
+                                station_data['traffic'] = merge_tail(station_data['traffic'], df_tail.unstack(level=0))
+
+                        self._stations.put(station, station_data)
+
+            self._views.clear()
+
+            self._version = version
+            self._subject_versions = subject_versions
+
+            return version
+
+    def view(self, station, build):
+        """
+        Returns the view of a station (e.g. serialized figures, station info and counts) from the cache,
+        which is built again for a new data version only
+
+        :param station: code of the station
+        :param build: function building the view
+        :return: view
+        """
+        return self._views.get_or_compute((station, self.refresh()), build)
+
+    def _table(self, name, read):
+        """
+        Returns a global table, which is read on first use
+
+        :param name: name of the table
+        :param read: function reading the table from an opened HDF5Store
+        :return: table
+        """
+        with self._lock:
+            if name not in self._tables:
+                with self._open() as store:
+                    self._tables[name] = read(store)
+
+            return self._tables[name]
+
+    def station_codes(self):
+        """
+        Returns the codes of all air quality stations (without reading data)
+
+        :return: list of station codes
+        """
+        with self._open() as store:
+            return list(store.file['air_quality'])
+
+    def air_quality_data(self):
+        """
+        Returns the air quality data of all stations
+
+        :return: dataframe with (station, component) as columns
+        """
+        return self._table('air_quality', lambda store: store.read_air_quality_data(workers=self.workers))
+
+    def traffic_data(self):
+        """
+        Returns the traffic data of all sensors
+
+        :return: dataframe with (name, Timestamp) as index
+        """
+        return self._table('traffic', lambda store: store.read_traffic_data())
+
+    def traffic_sensors(self):
+        """
+        Returns the traffic sensors
+
+        :return: dataframe with traffic sensors
+        """
+        return self._table('traffic_sensors', lambda store: store.read_traffic_sensors('traffic'))
+
+    def constructions(self):
+        """
+        Returns the current constructions (without geometries)
+
+        :return: dataframe with construction data
+        """
+        return self._table('constructions', lambda store: store.read_construction_data(with_geometries=False))
+
+    def weather(self):
+        """
+        Returns the weather data
+
+        :return: dataframe with weather data
+        """
+        return self._table('weather', lambda store: store.read_weather_data())
+
+    def car_registrations(self):
+        """
+        Returns the car registrations (with an empty column Month like the new car registrations)
+
+        :return: dataframe with car registrations data
+        """
+        def read(store):
+            df_car_registrations = store.read_car_registration_data()
+            df_car_registrations.insert(1, 'Month', pd.NA)
+
+            return df_car_registrations
+
+        return self._table('car_registrations', read)
+
+    def new_car_registrations(self):
+        """
+        Returns the new car registrations
+
+        :return: dataframe with new car registrations data
+        """
+        return self._table('new_car_registrations', lambda store: store.read_new_car_registration_data())
+
+    def construction_index(self):
+        """
+        Returns the spatial index of the construction locations
+
+        :return: SpatialIndex
+        """
+        with self._lock:
+            if 'construction_index' not in self._tables:
+                constructions = self.constructions()
+                self._tables['construction_index'] = SpatialIndex(constructions['Latitude'], constructions['Longitude'])
+
+            return self._tables['construction_index']
+
+    def sensor_index(self):
+        """
+        Returns the spatial index of the sensor coordinates
+
+        :return: SpatialIndex
+        """
+        with self._lock:
+            if 'sensor_index' not in self._tables:
+                coordinates = sensor_coordinates(self.traffic_sensors())
+                self._tables['sensor_index'] = SpatialIndex(coordinates['lat'], coordinates['lng'])
+
+            return self._tables['sensor_index']
+
+    def station_data(self, station):
+        """
+        Returns the data of a station: address, air quality data, traffic data of the nearby sensors,
+        number of nearby constructions and markers of the map (cached for the recently selected stations)
+
+        :param station: code of the station
+        :return: dictionary
+        """
+        with self._lock:
+            # changes of the HDF5 File are picked up first
+            self.refresh()
+
+            def read():
+                with self._open() as store:
+                    return self._read_station_data(store, station)
+
+            return self._stations.get_or_compute(station, read)
+
+    def _read_station_data(self, store, station):
+        """
+        Reads the data of a station for station_data (not cached)
+
+        :param store: opened HDF5Store
+        :param station: code of the station
+        :return: see station_data
+        """
+        # initialize marker list
+        coordinates_marker = []
+
+        # neighborhood of the station precomputed by the crawler (one lookup)
+        neighborhood = store.read_neighborhood(station, self.radius)
+
+        if neighborhood is not None:
+            (station_address, station_lat, station_lng), df_nearby_sensors, df_nearby_constructions = neighborhood
+            candidates = list(df_nearby_sensors.index)
+        else:
+            # extract geographical data of air quality station
+            station_address, station_lat, station_lng = store.read_air_quality_station_data(station)
+
+            positions, _ = self.sensor_index().query(station_lat, station_lng, self.radius)
+            candidates = list(self.traffic_sensors().index[positions])
+
+        # traffic data of the sensors within the radius (all sensors if not lazy)
+        df_traffic = store.read_traffic_data(sensors=candidates) if self.lazy else self.traffic_data()
+
+        # add air quality station coordinates as station type
+        coordinates_marker.append((station_lat, station_lng, 'station'))
+
+        if neighborhood is not None:
+            # count constructions, extract sensor IDs and add their coordinates to marker list
+            construction_count, sensors, coordinates_marker = nearby_from_neighborhood(
+                df_nearby_sensors, df_nearby_constructions, df_traffic, coordinates_marker)
+        else:
+            # count constructions and add construction coordinates to marker list which are nearby the station
+            construction_count, coordinates_marker = constructions_nearby_station(
+                self.constructions(), station_lat, station_lng, coordinates_marker, self.construction_index())
+
+            # extract sensor IDs and add construction coordinates to marker list which are nearby the station
+            sensors, coordinates_marker = traffic_nearby_station(self.traffic_sensors(), df_traffic, station_lat,
+                                                                 station_lng, coordinates_marker, self.sensor_index())
+
+        # air quality data of the station
+        if self.lazy:
+            df_air_quality = store.read_air_quality_data(stations=[station])[station]
+        else:
+            df_air_quality = self.air_quality_data()[station]
+
+        # traffic data of the sensors nearby the station with one column per sensor
+        df_traffic_reshaped = reshape_traffic(df_traffic, sensors)
+
+        return {'address': station_address, 'air_quality': df_air_quality, 'traffic': df_traffic_reshaped,
+                'sensors': sensors, 'construction_count': construction_count, 'markers': coordinates_marker}
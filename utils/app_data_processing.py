@@ -1,51 +1,13 @@
 import pandas as pd
 import numpy as np
-from math import radians, cos, sin, sqrt, atan2
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
-
-def haversine(lat1, lng1, lat2, lng2):
-    """
-    Haversine function to determine distance between to coordinates on earth
-
-    :param lat1: latitude of coordinates 1
-    :param lng1: longitude of coordinates 1
-    :param lat2: latitude of coordinates 2
-    :param lng2: longitude of coordinates 2
-    :return: distance in meters
-    """
-    # radius of the earth in kilometers
-    R = 6371.0
-
-    # conversion from degree to radian
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lng2 - lng1)
-
-    a = sin(dlat / 2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-
-    distance = R * c
-
-    # conversion from kilometers to meters
-    return distance * 1000
+from utils.hdf5_file_output import sensor_coordinates
+from utils.spatial_index import haversine_distances, SpatialIndex
 
 
-def temp_to_color(temperature):
-    """
-    Assigns a color to temperature
-
-    :param temperature: temperature (between -20 and 60)
-    :return: RGB color
-    """
-    # linear color transition from -20°C (dark blue) to +40°C (dark red)
-    norm_temp = (temperature + 20) / 60  # Normalisierung zwischen 0 und 1
-    color = np.array([255, 0, 0]) * norm_temp + np.array([0, 0, 255]) * (1 - norm_temp)  # Rot zu Blau
-
-    return f'rgb({color[0]}, {color[1]}, {color[2]})'
-
-
-def constructions_nearby_station(data_constructions, station_lat, station_lng, marker_list):
+def constructions_nearby_station(data_constructions, station_lat, station_lng, marker_list, spatial_index=None):
     """
     Counts constructions which are within a 500m radius to the air quality station
 
@@ -53,24 +15,23 @@ def constructions_nearby_station(data_constructions, station_lat, station_lng, m
     :param station_lat: latitude of station
     :param station_lng: longitude of station
     :param marker_list: list of markers to be edited
+    :param spatial_index: spatial index of the construction locations (optional, built if not given)
     :return: number of constructions and updated marker list
     """
-    # initialize construction count
-    construction_count = 0
+    if spatial_index is None:
+        spatial_index = SpatialIndex(data_constructions['Latitude'], data_constructions['Longitude'])
 
-    for index, row in data_constructions.iterrows():
-        # extract coordinates
-        construction_lng, construction_lat = row['Coordinates']
+    # positions of the constructions within the radius (representative location)
+    positions, _ = spatial_index.query(station_lat, station_lng, 500)
 
-        # calculation and condition check
-        if haversine(station_lat, station_lng, construction_lat, construction_lng) <= 500:
-            marker_list.append((construction_lat, construction_lng, 'construction'))
-            construction_count += 1
+    for construction_lat, construction_lng in zip(data_constructions['Latitude'].to_numpy()[positions],
+                                                  data_constructions['Longitude'].to_numpy()[positions]):
+        marker_list.append((construction_lat, construction_lng, 'construction'))
 
-    return construction_count, marker_list
+    return len(positions), marker_list
 
 
-def traffic_nearby_station(data_sensors, data_traffic, station_lat, station_lng, marker_list):
+def traffic_nearby_station(data_sensors, data_traffic, station_lat, station_lng, marker_list, spatial_index=None):
     """
     Extract traffic sensor codes which are within a 500m radius to the air quality station
 
@@ -79,57 +40,98 @@ def traffic_nearby_station(data_sensors, data_traffic, station_lat, station_lng,
     :param station_lat: latitude of station
     :param station_lng: longitude of station
     :param marker_list: list of markers to be edited
+    :param spatial_index: spatial index of the sensor coordinates (optional, built if not given)
     :return: list of traffic sensors and updated marker list
     """
-    sensors = []
+    # !!! coordinates of the sensors (see sensor_coordinates for the swapped assignment)
+    coordinates = sensor_coordinates(data_sensors)
+
+    if spatial_index is None:
+        spatial_index = SpatialIndex(coordinates['lat'], coordinates['lng'])
+
+    # sensors within the radius which have traffic data
+    positions, _ = spatial_index.query(station_lat, station_lng, 500)
+    nearby = coordinates.iloc[positions]
+    nearby = nearby[nearby.index.isin(data_traffic.index.unique(level=0))]
+
+    for sensor_lat, sensor_lng in zip(nearby['lat'], nearby['lng']):
+        marker_list.append((sensor_lat, sensor_lng, 'sensor'))
+
+    return list(nearby.index), marker_list
+
+
+def nearby_from_neighborhood(df_nearby_sensors, df_nearby_constructions, data_traffic, marker_list):
+    """
+    Determines nearby traffic sensors (with traffic data) and constructions of an air quality station from its
+    precomputed neighborhood (see read_neighborhood)
 
-    for index, row in data_sensors.iterrows():
-        if index in data_traffic.index.get_level_values(0):
+    :param df_nearby_sensors: sensors within the radius (index: sensor, columns lat and lng)
+    :param df_nearby_constructions: constructions within the radius (columns Latitude and Longitude)
+    :param data_traffic: traffic data dataframe
+    :param marker_list: list of markers to be edited
+    :return: number of constructions, list of traffic sensors and updated marker list
+    """
+    for construction_lat, construction_lng in zip(df_nearby_constructions['Latitude'],
+                                                  df_nearby_constructions['Longitude']):
+        marker_list.append((construction_lat, construction_lng, 'construction'))
 
-            # !!! BE AWARE OF THE FOLLOWING COMMENTS
+    # sensors with traffic data
+    df_nearby_sensors = df_nearby_sensors[df_nearby_sensors.index.isin(data_traffic.index.unique(level=0))]
 
-            # THIS (SWAPPED) FALSE ASSIGNMENT IS JUST DUE TO A MISTAKE
-            sensor_lng = row['location_latitude']
-            sensor_lat = row['location_longitude']
+    for sensor_lat, sensor_lng in zip(df_nearby_sensors['lat'], df_nearby_sensors['lng']):
+        marker_list.append((sensor_lat, sensor_lng, 'sensor'))
 
-            # CHANGE IT TO THAT IF YOU RE-INITIALIZE EVERYTHING!
-            # sensor_lng = row['location_longitude']
-            # sensor_lat = row['location_latitude']
+    return len(df_nearby_constructions), list(df_nearby_sensors.index), marker_list
 
-            distanz = haversine(station_lat, station_lng, sensor_lat, sensor_lng)
 
-            if distanz <= 500:
-                marker_list.append((sensor_lat, sensor_lng, 'sensor'))
-                sensors.append(index)
+def stations_sensors_membership(data_stations, data_sensors, radius=500):
+    """
+    Determines for all air quality stations at once which traffic sensors are within the radius
+    (same rule as traffic_nearby_station)
 
-    return sensors, marker_list
+    :param data_stations: air quality stations dataframe (columns lat and lng)
+    :param data_sensors: traffic sensor dataframe
+    :param radius: radius around the stations in meters
+    :return: boolean dataframe with stations as index and sensors as columns
+    """
+    coordinates = sensor_coordinates(data_sensors)
+
+    # distances between every station (rows) and every sensor (columns)
+    distances = haversine_distances(data_stations['lat'].to_numpy(dtype='float64')[:, np.newaxis],
+                                    data_stations['lng'].to_numpy(dtype='float64')[:, np.newaxis],
+                                    coordinates['lat'].to_numpy()[np.newaxis, :],
+                                    coordinates['lng'].to_numpy()[np.newaxis, :])
+
+    return pd.DataFrame(distances <= radius, index=data_stations.index, columns=coordinates.index)
 
 
 def create_air_quality_traffic_figure(air_quality_data, traffic_data, weather_data, sensors, group_size=6):
     """
-    Creates a line figure visualizing both air quality and traffic data as well as the temperature (as background color)
+    Creates a line figure visualizing both air quality and traffic data as well as the temperature (as color strip
+    below the lines)
 
     :param air_quality_data: air quality data dataframe
     :param traffic_data: traffic data dataframe
     :param weather_data: weather data dataframe
     :param sensors: list of traffic sensor IDs within 500m range to air quality station
-    :param group_size: number of summarized (mean value calculation) hours for faster calculation of the weather
+    :param group_size: number of summarized (mean value calculation) hours per cell of the temperature strip
     :return:
     """
-    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.92, 0.08], vertical_spacing=0.02,
+                        specs=[[{"secondary_y": True}], [{}]])
 
     # add air quality data to figure
     for col in air_quality_data.columns:
         fig.add_trace(
             go.Scatter(x=air_quality_data.index, y=air_quality_data[col], name=col.split('_')[0]),
-            secondary_y=False,
+            row=1, col=1, secondary_y=False,
         )
 
     # add a line for each sensor actually present in the restructured Traffic DataFrame
     for sensor in sensors:
         fig.add_trace(
             go.Scatter(x=traffic_data.index, y=traffic_data['Traffic'][sensor], name=f'Traffic {sensor}'),
-            secondary_y=True,
+            row=1, col=1, secondary_y=True,
         )
 
     # update of the layout for the plot
@@ -138,32 +140,27 @@ def create_air_quality_traffic_figure(air_quality_data, traffic_data, weather_da
     )
 
     # set X-axis and Y-axis titles
-    fig.update_xaxes(title_text="Timestamp")
-    fig.update_yaxes(title_text="Air Quality Measurements in µg / m³", secondary_y=False)
-    fig.update_yaxes(title_text="Traffic (vehicles / h)", secondary_y=True)
-
-    # prepare weather data according to group size
-    group_weather_ids = np.arange(len(weather_data)) // group_size
-    # grouping the DataFrame and calculating the mean value for the temperature
-    grouped_weather_data = weather_data.groupby(group_weather_ids).agg({'Temperature': 'mean'})
-
-    for group_id, group_data in grouped_weather_data.iterrows():
-        # selection of the corresponding index for the group
-        start_index = group_id * group_size
-        end_index = start_index + group_size - 1
-        start_timestamp = weather_data.index[start_index]
-        end_timestamp = weather_data.index[min(end_index, len(weather_data)-1)]
-
-        temp_color = temp_to_color(group_data['Temperature'])
-        fig.add_shape(
-            type="rect",
-            x0=start_timestamp, x1=end_timestamp + pd.Timedelta(minutes=60),
-            y0=0, y1=1,
-            xref="x", yref="paper",
-            fillcolor=temp_color,
-            opacity=0.4,
-            layer="below",
-            line_width=0,
+    fig.update_xaxes(title_text="Timestamp", row=2, col=1)
+    fig.update_yaxes(title_text="Air Quality Measurements in µg / m³", row=1, col=1, secondary_y=False)
+    fig.update_yaxes(title_text="Traffic (vehicles / h)", row=1, col=1, secondary_y=True)
+    fig.update_yaxes(showticklabels=False, row=2, col=1)
+
+    if 'Temperature' in weather_data and not weather_data.empty:
+        # mean temperature of every group of hours
+        group_weather_ids = np.arange(len(weather_data)) // group_size
+        temperatures = weather_data['Temperature'].groupby(group_weather_ids).mean().to_numpy()
+
+        # boundaries of the groups: first hour of every group and end of the last hour
+        boundaries = weather_data.index[::group_size].append(
+            pd.DatetimeIndex([weather_data.index[-1] + pd.Timedelta(minutes=60)]))
+
+        # temperature as one strip (one cell per group) with linear color transition from -20°C (dark blue)
+        # to +40°C (dark red)
+        fig.add_trace(
+            go.Heatmap(x=boundaries, z=[temperatures], zmin=-20, zmax=40,
+                       colorscale=[[0, 'rgb(0, 0, 255)'], [1, 'rgb(255, 0, 0)']], opacity=0.6, showscale=False,
+                       name='Temperature', hovertemplate='%{x}<br>Temperature: %{z:.1f} °C<extra></extra>'),
+            row=2, col=1,
         )
 
     return fig
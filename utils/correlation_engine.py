@@ -0,0 +1,236 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from utils.hdf5_file_output import HDF5Store
+from utils.app_data_processing import stations_sensors_membership
+
+
+def column_correlations(a, b, min_periods=24):
+    """
+    Pearson correlation between the columns of two equally shaped arrays (column i of a with column i of b),
+    only rows where both values are available are used
+
+    :param a: 2D array
+    :param b: 2D array
+    :param min_periods: minimum number of value pairs (NaN otherwise)
+    :return: array with one correlation per column
+    """
+    valid = ~np.isnan(a) & ~np.isnan(b)
+    a, b = np.where(valid, a, 0), np.where(valid, b, 0)
+
+    n = valid.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_a, mean_b = a.sum(axis=0) / n, b.sum(axis=0) / n
+        covariance = (a * b).sum(axis=0) / n - mean_a * mean_b
+        variance_a = (a ** 2).sum(axis=0) / n - mean_a ** 2
+        variance_b = (b ** 2).sum(axis=0) / n - mean_b ** 2
+        correlation = covariance / np.sqrt(variance_a * variance_b)
+
+    correlation[(n < min_periods) | (variance_a <= 0) | (variance_b <= 0)] = np.nan
+
+    return correlation
+
+
+def rolling_column_correlations(a, b, window, min_periods=24):
+    """
+    Rolling Pearson correlation between the columns of two equally shaped arrays over the rows (time),
+    computed from cumulative sums instead of one correlation per window
+
+    :param a: 2D array (rows: time)
+    :param b: 2D array (rows: time)
+    :param window: number of rows per window
+    :param min_periods: minimum number of value pairs within a window (NaN otherwise)
+    :return: 2D array with the correlation of the window ending at every row
+    """
+    valid = ~np.isnan(a) & ~np.isnan(b)
+    a, b = np.where(valid, a, 0), np.where(valid, b, 0)
+
+    def rolling_sum(values):
+        cumulative = np.cumsum(np.vstack([np.zeros((1, values.shape[1])), values]), axis=0)
+        return cumulative[1:] - cumulative[np.maximum(np.arange(1, len(cumulative)) - window, 0)]
+
+    n = rolling_sum(valid.astype('float64'))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_a, mean_b = rolling_sum(a) / n, rolling_sum(b) / n
+        covariance = rolling_sum(a * b) / n - mean_a * mean_b
+        variance_a = rolling_sum(a ** 2) / n - mean_a ** 2
+        variance_b = rolling_sum(b ** 2) / n - mean_b ** 2
+        correlation = covariance / np.sqrt(variance_a * variance_b)
+
+    # tolerance for rounding errors of the cumulative sums
+    correlation[(n < min_periods) | (variance_a <= 1e-9) | (variance_b <= 1e-9)] = np.nan
+
+    return np.clip(correlation, -1, 1)
+
+
+class CorrelationEngine:
+    """
+    Correlations between the components of all air quality stations and the traffic of their nearby sensors.
+    Pollutants and the mean traffic of the nearby sensors of every station are aligned to one hourly array each
+    (one column per station and component), so all stations are processed at once.
+    Results are cached per data version of the HDF5 File (in memory and optionally as files).
+    """
+
+    def __init__(self, path, radius=500, cache_directory=None):
+        """
+        :param path: path to HDF5 File
+        :param radius: radius around the stations for traffic sensors in meters
+        :param cache_directory: directory for cached results (optional)
+        """
+        self.path = path
+        self.radius = radius
+        self.cache_directory = None if cache_directory is None else Path(cache_directory)
+
+        self._cache = {}
+
+    def data_version(self):
+        """
+        Returns the current data version of the HDF5 File
+
+        :return: data version
+        """
+        with HDF5Store(self.path) as store:
+            return store.data_version()
+
+    def _cached(self, key, compute):
+        """
+        Returns a cached result of the current data version or computes and caches it
+
+        :param key: name and parameters of the result
+        :param compute: function computing the result
+        :return: result
+        """
+        key = (self.data_version(), self.radius) + key
+
+        if key not in self._cache and self.cache_directory is not None:
+            file = self.cache_directory / ('_'.join(str(part) for part in key) + '.pkl')
+            if file.exists():
+                self._cache[key] = pd.read_pickle(file)
+
+        if key not in self._cache:
+            # results of former data versions aren't needed anymore
+            self._cache = {cached_key: result for cached_key, result in self._cache.items()
+                           if cached_key[0] == key[0]}
+            self._cache[key] = compute()
+
+            if self.cache_directory is not None:
+                self.cache_directory.mkdir(parents=True, exist_ok=True)
+                pd.to_pickle(self._cache[key],
+                             self.cache_directory / ('_'.join(str(part) for part in key) + '.pkl'))
+
+        return self._cache[key]
+
+    def aligned_data(self):
+        """
+        Aligns pollutants and the mean traffic of the nearby sensors of their station to full hours (without gaps)
+
+        :return: hours, pollutant array, traffic array (one column per station and component each),
+                 columns (station, component) and number of nearby sensors per column
+        """
+        return self._cached(('aligned_data',), self._align)
+
+    def _align(self):
+        """
+        Reads and aligns the data for aligned_data (not cached)
+
+        :return: see aligned_data
+        """
+        with HDF5Store(self.path) as store:
+            df_air_quality = store.read_air_quality_data()
+            df_stations = store.read_air_quality_stations('air_quality')
+            df_sensors = store.read_traffic_sensors('traffic')
+
+            # stations (rows) and their nearby sensors (columns)
+            membership = stations_sensors_membership(df_stations, df_sensors, self.radius)
+            nearby_sensors = membership.columns[membership.any(axis=0)]
+
+            df_traffic = store.read_traffic_data(sensors=list(nearby_sensors))
+
+        # pollutants and traffic per full hour (stored timestamps deviate by up to two minutes)
+        df_air_quality = df_air_quality.groupby(df_air_quality.index.round('h')).mean()
+        df_traffic = df_traffic['Traffic'].unstack(level=0)
+        df_traffic = df_traffic.groupby(df_traffic.index.round('h')).mean()
+
+        # all hours without gaps, so a shift by rows is a shift by hours
+        hours = df_air_quality.index.union(df_traffic.index)
+        hours = pd.date_range(hours.min(), hours.max(), freq='h', name='Timestamp') if len(hours) > 0 else hours
+        pollutants = df_air_quality.reindex(hours).to_numpy(dtype='float64')
+        traffic = df_traffic.reindex(index=hours, columns=membership.columns).to_numpy(dtype='float64')
+
+        # mean traffic of the nearby sensors per station as matrix product with the membership matrix
+        weights = membership.to_numpy(dtype='float64').T
+        traffic_sum = np.nan_to_num(traffic) @ weights
+        traffic_count = (~np.isnan(traffic)).astype('float64') @ weights
+        with np.errstate(invalid='ignore', divide='ignore'):
+            station_traffic = np.where(traffic_count > 0, traffic_sum / traffic_count, np.nan)
+
+        # traffic of the station of every pollutant column
+        columns = df_air_quality.columns
+        station_positions = membership.index.get_indexer(columns.get_level_values(0))
+        station_traffic = station_traffic[:, station_positions]
+        number_of_sensors = membership.to_numpy().sum(axis=1)[station_positions]
+
+        return hours, pollutants, station_traffic, columns, number_of_sensors
+
+    def lagged_correlations(self, max_lag=24, min_periods=24):
+        """
+        Correlations between every station's components and its nearby traffic with the traffic leading
+        by 0 to max_lag hours
+
+        :param max_lag: maximum lag in hours
+        :param min_periods: minimum number of value pairs
+        :return: dataframe with (station, component) as index and lag as columns
+        """
+        def compute():
+            _, pollutants, traffic, columns, _ = self.aligned_data()
+
+            # pollutants of an hour compared with the traffic lag hours before
+            correlations = {lag: column_correlations(pollutants[lag:], traffic[:len(traffic) - lag], min_periods)
+                            for lag in range(max_lag + 1)}
+
+            df = pd.DataFrame(correlations, index=columns)
+            df.columns.name = 'Lag'
+
+            return df
+
+        return self._cached(('lagged_correlations', max_lag, min_periods), compute)
+
+    def rolling_correlations(self, window=168, min_periods=24):
+        """
+        Rolling correlations between every station's components and its nearby traffic (without lag)
+
+        :param window: window in hours
+        :param min_periods: minimum number of value pairs within a window
+        :return: dataframe with hours as index and (station, component) as columns
+        """
+        def compute():
+            hours, pollutants, traffic, columns, _ = self.aligned_data()
+
+            return pd.DataFrame(rolling_column_correlations(pollutants, traffic, window, min_periods), index=hours,
+                                columns=columns)
+
+        return self._cached(('rolling_correlations', window, min_periods), compute)
+
+    def overview(self, max_lag=24, min_periods=24):
+        """
+        City-wide overview: number of nearby sensors, correlation without lag and the lag with the
+        strongest correlation per station and component
+
+        :param max_lag: maximum lag in hours
+        :param min_periods: minimum number of value pairs
+        :return: dataframe with (station, component) as index
+        """
+        def compute():
+            _, _, _, columns, number_of_sensors = self.aligned_data()
+            correlations = self.lagged_correlations(max_lag, min_periods)
+
+            strongest = correlations.abs().fillna(-1).to_numpy().argmax(axis=1)
+
+            return pd.DataFrame({'Sensors': number_of_sensors,
+                                 'Correlation': correlations[0].to_numpy(),
+                                 'Best lag': correlations.columns[strongest],
+                                 'Best correlation': correlations.to_numpy()[np.arange(len(strongest)), strongest]},
+                                index=columns)
+
+        return self._cached(('overview', max_lag, min_periods), compute)
@@ -168,22 +168,12 @@ def check_air_quality_station_data(data):
     :param data: air quality station data
     :return: List of dates missing
     """
-    # to ensure that response is complete
-    core_date_check = {}
-    core_date_check_result = {'complete': 0, 'incomplete': 0}
-    for entry in data:
-        if entry['core'] not in core_date_check.keys():
-            core_date_check[entry['core']] = []
-
-        core_date_check[entry['core']].append(entry['datetime'])
-
-    for core, dates in core_date_check.items():
-        if len(dates) < 24:
-            core_date_check_result['incomplete'] += 1
-        else:
-            core_date_check_result['complete'] += 1
+    # to ensure that response is complete: number of datetimes per core
+    cores = np.array([entry['core'] for entry in data], dtype='U')
+    _, counts = np.unique(cores, return_counts=True)
 
-    return core_date_check_result['incomplete']
+    # cores with less than one value per hour
+    return int((counts < 24).sum())
 
 
 def extract_traffic_sensors(main_url):
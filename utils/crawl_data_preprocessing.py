@@ -166,3 +166,22 @@ def preprocess_traffic_data(data):
     result = data['result'].values[0]
 
     return timestamp, result
+
+
+def preprocess_traffic_range_data(data):
+    """
+    Creates timestamps for traffic data of several hours (re-crawl of missing hours) and returns traffic values
+    as results
+
+    :param data: dataframe with traffic data
+    :return: list of timestamps and list of traffic values
+    """
+
+    # transform timestamps (end of the observation periods like preprocess_traffic_data)
+    timestamps = [datetime.fromisoformat(timestamp_string.split('/')[-1].replace('Z', '')).timestamp()
+                  for timestamp_string in data['phenomenonTime'].values]
+
+    # read result values
+    results = list(data['result'].values)
+
+    return timestamps, results
@@ -6,6 +6,19 @@ import numpy as np
 import json
 
 
+# marker for missing dates in int64 date columns (e.g. constructions without end of validity)
+MISSING_DATE = np.iinfo('int64').min
+
+# resolutions of the pre-aggregated time series (rollups) as pandas period frequency, finest first
+ROLLUP_LEVELS = {'hourly': 'h', 'daily': 'D', 'weekly': 'W', 'monthly': 'M'}
+
+# statistics per value column within the rollups
+ROLLUP_STATISTICS = ['count', 'mean', 'min', 'max']
+
+# number of rewrites (data version and earliest changed timestamp) kept per time series subject
+REWRITE_JOURNAL_SIZE = 256
+
+
 class HDF5PreconditionError(Exception):
     def __init__(self, message="Error occurred when obtaining necessary data to initialize the HDF5 file"):
         self.message = message
@@ -64,6 +77,58 @@ def check_directories(directories):
     return status
 
 
+def create_construction_datasets(constructions_group):
+    """
+    Creates the typed columnar datasets for construction data.
+    One row per construction version in the row datasets (ID, dates, categorical codes, geometry reference),
+    geometries are stored as parts (one coordinate sequence each) referring to a shared coordinate array.
+
+    :param constructions_group: HDF5 group for constructions
+    :return: -nothing- (creates datasets)
+    """
+    # integer IDs, dates as Unix timestamps and row of the previous version of the construction (-1: none)
+    for name in ['id', 'timestamp', 'valid_from', 'valid_to', 'previous']:
+        constructions_group.create_dataset(name, shape=(0,), maxshape=(None,), dtype='int64')
+
+    # categorical columns as codes, the according values are kept in the attribute 'categories' (-1: missing)
+    for name in ['subtype', 'severity', 'direction', 'geo_type']:
+        dataset = constructions_group.create_dataset(name, shape=(0,), maxshape=(None,), dtype='int16')
+        dataset.attrs['categories'] = np.array([], dtype='S')
+
+    # reference of every construction to its geometry parts
+    geometry_dataset = constructions_group.create_dataset('geometry', shape=(0, 2), maxshape=(None, 2), dtype='int64')
+    geometry_dataset.attrs['columns'] = np.array(['First part', 'Parts'], dtype='S')
+
+    # geometry parts: member of geometry collection, polygon of multipolygon, geometry type (code of geo_type)
+    # and reference to the coordinates
+    parts_dataset = constructions_group.create_dataset('parts', shape=(0, 5), maxshape=(None, 5), dtype='int64')
+    parts_dataset.attrs['columns'] = np.array(['Member', 'Polygon', 'Type', 'First coordinate', 'Coordinates'],
+                                              dtype='S')
+
+    # coordinates of all parts (longitude, latitude)
+    coordinates_dataset = constructions_group.create_dataset('coordinates', shape=(0, 2), maxshape=(None, 2),
+                                                             dtype='float64')
+    coordinates_dataset.attrs['columns'] = np.array(['Longitude', 'Latitude'], dtype='S')
+
+    # representative location (first point or mean of coordinates) and bounding box of every geometry
+    for name in ['lat', 'lng']:
+        constructions_group.create_dataset(name, shape=(0,), maxshape=(None,), dtype='float64')
+
+    bbox_dataset = constructions_group.create_dataset('bbox', shape=(0, 4), maxshape=(None, 4), dtype='float64')
+    bbox_dataset.attrs['columns'] = np.array(['Min longitude', 'Min latitude', 'Max longitude', 'Max latitude'],
+                                             dtype='S')
+
+    # index (ID -> row of current version) of the construction data sorted by ID
+    constructions_index = constructions_group.create_dataset('construction_index', shape=(0, 2),
+                                                             maxshape=(None, 2), dtype='int64')
+    constructions_index.attrs['columns'] = np.array(['ID', 'Row'], dtype='S')
+
+    # interval index over the validity of the current versions (sorted starts and sorted ends)
+    for name in ['valid_from_index', 'valid_to_index']:
+        interval_dataset = constructions_group.create_dataset(name, shape=(0, 2), maxshape=(None, 2), dtype='int64')
+        interval_dataset.attrs['columns'] = np.array(['Date', 'Row'], dtype='S')
+
+
 def initialize_h5_file(path, stations, sensors):
     """
     Initializes HDF5 File.
@@ -180,14 +245,8 @@ def initialize_h5_file(path, stations, sensors):
     # create group
     constructions_group = hdf5_file.create_group('constructions')
 
-    # create dataset
-    constructions_dataset = constructions_group.create_dataset('construction_data', shape=(0, 10), data=[],
-                                                               maxshape=(None, 10), dtype=h5py.string_dtype())
-
-    # assign attributes
-    constructions_dataset.attrs['columns'] = np.array(['ID', 'Timestamp', 'Subtype', 'Severity', 'Valid from',
-                                                       'Valid to', 'Direction', 'Geo type', 'Coordinates',
-                                                       'Geometries'], dtype='S')
+    # create typed datasets
+    create_construction_datasets(constructions_group)
 
     # ------------------------------------------------------------------------------------------------------------------
     # car_registrations ------------------------------------------------------------------------------------------------
@@ -0,0 +1,301 @@
+import warnings
+from pathlib import Path
+import h5py
+import numpy as np
+import pandas as pd
+
+from utils.hdf5_file_output import HDF5Store, timestamp_slice
+from utils.hdf5_file_streaming import subject_dataset_paths
+from utils.feature_table import round_to_hour
+
+# columns of the quality report (one row per series)
+REPORT_COLUMNS = ['Expected', 'Values', 'Missing', 'Duplicates', 'Out of range', 'Flatline', 'Spikes']
+
+# columns of the quality report counting findings
+FINDING_COLUMNS = ['Missing', 'Duplicates', 'Out of range', 'Flatline', 'Spikes']
+
+# plausible values per subject (air quality, traffic) or value column (weather)
+PLAUSIBLE_RANGES = {'air_quality': (0.0, 2000.0),
+                    'traffic': (0.0, 20000.0),
+                    'Temperature': (-40.0, 50.0),
+                    'Precipitation': (0.0, 200.0),
+                    'Wind Speed': (0.0, 200.0)}
+
+# value columns without flatline check (e.g. no precipitation for many hours)
+NO_FLATLINE_CHECK = ['Precipitation']
+
+# tables with one row per period (key columns) instead of time series
+REGISTRATION_TABLES = {'car_registrations/car_registrations_data': ['Year'],
+                       'new_car_registrations/new_car_registrations_data': ['Year', 'Month']}
+
+
+def flatline_counts(matrix, flatline_length):
+    """
+    Counts the values of every series which are part of a run of at least flatline_length equal values
+
+    :param matrix: values (rows: positions in time, columns: series, NaN: missing)
+    :param flatline_length: minimum number of equal values in a row
+    :return: array with number of values per series
+    """
+    number_of_positions = len(matrix)
+
+    if number_of_positions < flatline_length:
+        return np.zeros(matrix.shape[1])
+
+    # value equal to the previous one (missing values are never equal)
+    same = matrix[1:] == matrix[:-1]
+    cumulative = np.vstack([np.zeros((1, matrix.shape[1]), dtype='int64'), np.cumsum(same, axis=0)])
+
+    # windows of flatline_length values (by first position) with only equal values
+    flat_windows = (cumulative[flatline_length - 1:] - cumulative[:number_of_positions - flatline_length + 1]) == \
+        flatline_length - 1
+
+    # values covered by at least one of these windows
+    windows = np.vstack([np.zeros((1, matrix.shape[1]), dtype='int64'), np.cumsum(flat_windows, axis=0)])
+    positions = np.arange(number_of_positions)
+    covered = windows[np.minimum(positions, number_of_positions - flatline_length) + 1] - \
+        windows[np.maximum(positions - flatline_length + 1, 0)] > 0
+
+    return covered.sum(axis=0)
+
+
+def spike_counts(matrix, spike_threshold):
+    """
+    Counts the spikes of every series: values which rise and fall back (or the other way round) by more than
+    spike_threshold times the typical change of the series (median absolute change)
+
+    :param matrix: values (rows: positions in time, columns: series, NaN: missing)
+    :param spike_threshold: factor of the typical change
+    :return: array with number of spikes per series
+    """
+    changes = np.diff(matrix, axis=0)
+
+    # typical change per series (mean absolute change for series which mostly don't change)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        median_change = np.nanmedian(np.abs(changes), axis=0)
+        mean_change = np.nanmean(np.abs(changes), axis=0)
+    limit = spike_threshold * np.where(median_change > 0, median_change, mean_change)
+
+    rise, fall = changes[:-1], changes[1:]
+    with np.errstate(invalid='ignore'):
+        spikes = (np.abs(rise) > limit) & (np.abs(fall) > limit) & (np.sign(rise) != np.sign(fall))
+
+    return spikes.sum(axis=0)
+
+
+def check_series(series, positions, values, number_of_series, number_of_positions, lower, upper,
+                 flatline_length=6, spike_threshold=6.0):
+    """
+    Checks completeness, duplicates, plausibility, flatlines and spikes of many series at once.
+    The values of all series are passed as flat arrays and checked as one matrix (positions x series).
+
+    :param series: series (0 to number_of_series - 1) per value
+    :param positions: position (e.g. hour) within the window per value, values outside the window are ignored
+    :param values: values
+    :param number_of_series: number of series
+    :param number_of_positions: number of positions within the window (expected values per series)
+    :param lower: lowest plausible value per series
+    :param upper: highest plausible value per series
+    :param flatline_length: minimum number of equal values in a row for flatlines (None: not checked)
+    :param spike_threshold: factor of the typical change for spikes (None: not checked)
+    :return: array with one row per series and the columns REPORT_COLUMNS
+    """
+    report = np.full((number_of_series, len(REPORT_COLUMNS)), np.nan)
+    report[:, 0] = number_of_positions
+
+    inside = (positions >= 0) & (positions < number_of_positions)
+    series, positions, values = series[inside], positions[inside].astype('int64'), values[inside]
+
+    # DUPLICATES: more than one value per series and position
+    keys, counts = np.unique(series * number_of_positions + positions, return_counts=True)
+    report[:, 3] = np.bincount(keys // max(number_of_positions, 1), weights=counts - 1, minlength=number_of_series)
+
+    # RANGE: values outside the plausible range of the series
+    available = ~np.isnan(values)
+    with np.errstate(invalid='ignore'):
+        out_of_range = available & ((values < lower[series]) | (values > upper[series]))
+    report[:, 4] = np.bincount(series, weights=out_of_range, minlength=number_of_series)
+
+    # values as matrix (last value of duplicates)
+    matrix = np.full((number_of_positions, number_of_series), np.nan)
+    matrix[positions[available], series[available]] = values[available]
+
+    # COMPLETENESS: positions without value
+    report[:, 1] = (~np.isnan(matrix)).sum(axis=0)
+    report[:, 2] = number_of_positions - report[:, 1]
+
+    # FLATLINES and SPIKES
+    if flatline_length is not None:
+        report[:, 5] = flatline_counts(matrix, flatline_length)
+    if spike_threshold is not None:
+        report[:, 6] = spike_counts(matrix, spike_threshold)
+
+    return report
+
+
+def validate_time_series(store, dataset_paths, days, end=None, flatline_length=6, spike_threshold=6.0):
+    """
+    Validates the hourly values of time series datasets of one subject within the active window
+    (the last days up to the latest hour of the datasets)
+
+    :param store: HDF5Store
+    :param dataset_paths: paths of the datasets within the HDF5 File
+    :param days: length of the active window in days
+    :param end: last hour of the window as Unix timestamp (None: latest hour of the datasets)
+    :param flatline_length: minimum number of equal values in a row for flatlines
+    :param spike_threshold: factor of the typical change for spikes
+    :return: dataframe with one row per series (dataset or value column) and the columns REPORT_COLUMNS
+    """
+    if end is None:
+        last_timestamps = [store.dataset(dataset_path)[len(store.dataset(dataset_path)) - 1, 0]
+                           for dataset_path in dataset_paths if len(store.dataset(dataset_path)) > 0]
+        if len(last_timestamps) == 0:
+            return pd.DataFrame(columns=REPORT_COLUMNS)
+        end = float(round_to_hour(max(last_timestamps)))
+
+    start = end - (days * 24 - 1) * 3600
+
+    series_names, lower, upper = [], [], []
+    series, positions, values = [], [], []
+
+    for dataset_path in dataset_paths:
+        dataset = store.dataset(dataset_path)
+        columns = store.columns(dataset_path)
+
+        # rows rounded to the first hour of the window on
+        data = dataset[timestamp_slice(dataset, pd.to_datetime(start - 1800, unit='s'))]
+        hours = round_to_hour(data[:, 0])
+
+        for column_number, column in enumerate(columns[1:], start=1):
+            series_names.append(dataset_path if len(columns) == 2 else f'{dataset_path}/{column}')
+            lower_value, upper_value = PLAUSIBLE_RANGES.get(column, PLAUSIBLE_RANGES.get(
+                dataset_path.strip('/').split('/')[0], (-np.inf, np.inf)))
+            lower.append(lower_value)
+            upper.append(upper_value)
+
+            series.append(np.full(len(data), len(series_names) - 1))
+            positions.append((hours - start) / 3600)
+            values.append(data[:, column_number].astype('float64'))
+
+    report = check_series(np.concatenate(series + [np.empty(0, dtype='int64')]).astype('int64'),
+                          np.round(np.concatenate(positions + [np.empty(0)])),
+                          np.concatenate(values + [np.empty(0)]), len(series_names), days * 24,
+                          np.array(lower), np.array(upper), flatline_length, spike_threshold)
+
+    report = pd.DataFrame(report, index=pd.Index(series_names, name='Series'), columns=REPORT_COLUMNS)
+    report.loc[[name.split('/')[-1] in NO_FLATLINE_CHECK for name in series_names], 'Flatline'] = np.nan
+
+    return report
+
+
+def validate_table(store, dataset_path, key_columns):
+    """
+    Validates a table with one row per period (year or year and month) from its first to its last period:
+    missing and duplicated periods and negative values
+
+    :param store: HDF5Store
+    :param dataset_path: path of the dataset within the HDF5 File
+    :param key_columns: columns identifying the period (Year or Year and Month)
+    :return: dataframe with one row per value column and the columns REPORT_COLUMNS
+    """
+    data = store.dataset(dataset_path)[:].astype('float64')
+    columns = store.columns(dataset_path)
+
+    if len(data) == 0:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+
+    # periods as consecutive numbers (years or months)
+    if key_columns == ['Year']:
+        periods = data[:, columns.index('Year')]
+    else:
+        periods = data[:, columns.index('Year')] * 12 + data[:, columns.index('Month')] - 1
+    value_columns = [column for column in columns if column not in key_columns]
+
+    number_of_series = len(value_columns)
+    report = check_series(np.repeat(np.arange(number_of_series), len(data)),
+                          np.tile(periods - periods.min(), number_of_series),
+                          np.concatenate([data[:, columns.index(column)] for column in value_columns]),
+                          number_of_series, int(periods.max() - periods.min()) + 1,
+                          np.zeros(number_of_series), np.full(number_of_series, np.inf), None, None)
+
+    return pd.DataFrame(report, index=pd.Index([f'{dataset_path}/{column}' for column in value_columns],
+                                               name='Series'), columns=REPORT_COLUMNS)
+
+
+def validate_data(path_h5, days=7, flatline_length=6, spike_threshold=6.0):
+    """
+    Validates the data of all subjects: the hourly time series (air quality, traffic, weather) within the active
+    window and the registration tables completely
+
+    :param path_h5: path to HDF5 File
+    :param days: length of the active window in days
+    :param flatline_length: minimum number of equal hourly values in a row for flatlines
+    :param spike_threshold: factor of the typical change of a series for spikes
+    :return: dataframe with one row per series and the columns REPORT_COLUMNS
+    """
+    if not Path(path_h5).exists():
+        raise FileNotFoundError
+
+    reports = []
+
+    with HDF5Store(path_h5) as store:
+        for subject in ['air_quality', 'traffic', 'weather']:
+            if subject in store.file:
+                reports.append(validate_time_series(store, subject_dataset_paths(path_h5, subject), days,
+                                                    flatline_length=flatline_length,
+                                                    spike_threshold=spike_threshold))
+
+        for dataset_path, key_columns in REGISTRATION_TABLES.items():
+            if dataset_path in store.file:
+                reports.append(validate_table(store, dataset_path, key_columns))
+
+    reports = [report for report in reports if not report.empty]
+
+    if len(reports) == 0:
+        return pd.DataFrame(columns=REPORT_COLUMNS)
+
+    return pd.concat(reports)
+
+
+def count_findings(report):
+    """
+    Counts the series of a quality report with at least one finding
+
+    :param report: quality report
+    :return: number of series
+    """
+    return int((report[FINDING_COLUMNS].fillna(0) > 0).any(axis=1).sum())
+
+
+def write_quality_report(path_h5, run_id, report, keep=720):
+    """
+    Writes the quality report of a crawl run to the HDF5 File (group 'quality_reports/<run_id>' with the
+    datasets 'report' and 'series'), only the latest reports are kept
+
+    :param path_h5: path to HDF5 File
+    :param run_id: identifier of the crawl run
+    :param report: quality report (e.g. from validate_data)
+    :param keep: number of reports to be kept
+    :return: None
+    """
+    if not Path(path_h5).exists():
+        raise FileNotFoundError
+
+    with h5py.File(path_h5, 'a') as hdf5_file:
+        reports_group = hdf5_file.require_group('quality_reports')
+
+        if run_id in reports_group:
+            del reports_group[run_id]
+
+        run_group = reports_group.create_group(run_id)
+
+        # counts as float32 (missing checks as NaN)
+        report_dataset = run_group.create_dataset('report', data=report.to_numpy(dtype='float32'),
+                                                  compression='gzip')
+        report_dataset.attrs['columns'] = np.array(REPORT_COLUMNS, dtype='S')
+        run_group.create_dataset('series', data=np.array(report.index, dtype='S'), compression='gzip')
+
+        # remove the oldest reports (run identifiers are sortable)
+        for old_run_id in sorted(reports_group)[:-keep] if keep > 0 else []:
+            del reports_group[old_run_id]
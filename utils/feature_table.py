@@ -0,0 +1,188 @@
+from pathlib import Path
+import h5py
+import numpy as np
+import pandas as pd
+
+from utils.hdf5_file_output import HDF5Store, timestamp_slice, sensor_coordinates
+from utils.spatial_index import haversine_distances
+
+# columns of the feature table after the pollutant components of a station
+FEATURE_COLUMNS = ['Traffic sum', 'Traffic mean', 'Traffic sensors', 'Temperature', 'Precipitation', 'Wind Speed',
+                   'Constructions']
+
+
+def round_to_hour(timestamps):
+    """
+    Rounds Unix timestamps to the nearest full hour (stored timestamps deviate by up to two minutes)
+
+    :param timestamps: Unix timestamps
+    :return: Unix timestamps of the hours
+    """
+    return np.round(np.asarray(timestamps, dtype='float64') / 3600) * 3600
+
+
+def read_hourly_series(store, dataset_path, start):
+    """
+    Reads a time series dataset from a point in time on with the values aligned to full hours
+
+    :param store: HDF5Store
+    :param dataset_path: path of the dataset within the HDF5 File
+    :param start: first hour to be read as Unix timestamp (None: from the beginning)
+    :return: hours and values
+    """
+    dataset = store.dataset(dataset_path)
+
+    # start one hour earlier to get values rounded up to the first hour
+    first = None if start is None else pd.to_datetime(start - 3600, unit='s')
+    data = dataset[timestamp_slice(dataset, first)]
+    hours = round_to_hour(data[:, 0])
+
+    selected = hours >= (-np.inf if start is None else start)
+
+    return hours[selected], data[selected, 1].astype('float64')
+
+
+def compute_station_features(store, station, station_lat, station_lng, start, sensors, weather, construction_rows,
+                             radius):
+    """
+    Computes the hourly features of an air quality station from a point in time on
+
+    :param store: HDF5Store
+    :param station: code of the station
+    :param station_lat: latitude of the station
+    :param station_lng: longitude of the station
+    :param start: first hour to be computed as Unix timestamp (None: from the beginning)
+    :param sensors: dataframe with coordinates (lat, lng) of all traffic sensors
+    :param weather: dataframe with weather data (Unix timestamp in the column Timestamp)
+    :param construction_rows: dataframe with rows and representative location of the current constructions
+    :param radius: radius around the station for traffic sensors and constructions in meters
+    :return: dataframe with one row per hour (columns Timestamp, components and features)
+    """
+    # POLLUTANTS: one column per component, hours of all components as key
+    components = list(store.file[f'air_quality/{station}'])
+    series = {component: read_hourly_series(store, f'air_quality/{station}/{component}', start)
+              for component in components}
+
+    hours = np.unique(np.concatenate([hours for hours, _ in series.values()] + [np.empty(0)]))
+    df = pd.DataFrame({'Timestamp': hours})
+
+    for component, (component_hours, values) in series.items():
+        df[component] = pd.Series(values).groupby(component_hours).mean().reindex(hours).to_numpy()
+
+    # TRAFFIC: sum and mean of the sensors within the radius
+    nearby_sensors = sensors.index[haversine_distances(station_lat, station_lng, sensors['lat'], sensors['lng'])
+                                   <= radius]
+    traffic = [read_hourly_series(store, f'traffic/{sensor}', start) for sensor in nearby_sensors]
+    traffic = pd.DataFrame({'Timestamp': np.concatenate([hours for hours, _ in traffic] + [np.empty(0)]),
+                            'Traffic': np.concatenate([values for _, values in traffic] + [np.empty(0)])})
+    traffic = traffic.dropna().groupby('Timestamp')['Traffic'].agg(['sum', 'mean', 'count']).reindex(hours)
+
+    df['Traffic sum'] = traffic['sum'].to_numpy()
+    df['Traffic mean'] = traffic['mean'].to_numpy()
+    df['Traffic sensors'] = traffic['count'].fillna(0).to_numpy()
+
+    # WEATHER: nearest crawl within one hour
+    weather_columns = ['Temperature', 'Precipitation', 'Wind Speed']
+    if weather.empty:
+        df[weather_columns] = np.nan
+    else:
+        df = pd.merge_asof(df, weather[['Timestamp'] + weather_columns], on='Timestamp', direction='nearest',
+                           tolerance=3600.0)
+
+    # CONSTRUCTIONS: number of active constructions within the radius
+    if construction_rows is None:
+        df['Constructions'] = np.nan
+    else:
+        nearby_rows = construction_rows['Row'][
+            haversine_distances(station_lat, station_lng, construction_rows['Latitude'],
+                                construction_rows['Longitude']) <= radius]
+        df['Constructions'] = store.count_active_constructions(pd.to_datetime(hours, unit='s'),
+                                                               rows=nearby_rows.to_numpy())
+
+    return df[['Timestamp'] + components + FEATURE_COLUMNS]
+
+
+def update_feature_table(path_h5, radius=500):
+    """
+    Updates the hourly feature table of every air quality station (group 'features') which combines pollutants,
+    traffic of nearby sensors, weather and active nearby constructions. Only the hours from the point in time
+    marked as outdated (attribute 'dirty_from') on are recomputed.
+
+    :param path_h5: path to HDF5 File
+    :param radius: radius around the station for traffic sensors and constructions in meters
+    :return: number of recomputed rows
+    """
+    if not Path(path_h5).exists():
+        raise FileNotFoundError
+
+    features = {}
+
+    # compute features (read only)
+    with HDF5Store(path_h5) as store:
+        dirty_from = float(store.file['features'].attrs.get('dirty_from', np.inf)) if 'features' in store.file \
+            else -np.inf
+
+        # radius changed: recompute everything
+        if 'features' in store.file and store.file['features'].attrs.get('radius', radius) != radius:
+            dirty_from = -np.inf
+
+        # nothing changed since the last update
+        if dirty_from == np.inf:
+            return 0
+
+        df_stations = store.read_air_quality_stations('air_quality')
+        sensors = sensor_coordinates(store.read_traffic_sensors('traffic'))
+
+        weather = store.read_weather_data()
+        if not weather.empty:
+            weather = weather.reset_index()
+            weather['Timestamp'] = (weather['Timestamp'] - pd.Timestamp(0)).dt.total_seconds()
+
+        construction_rows = None
+        if 'constructions' in store.file and 'construction_index' in store.file['constructions']:
+            construction_rows = store.read_construction_data(with_geometries=False)
+            construction_rows['Row'] = np.sort(store.dataset('constructions/construction_index')[:, 1])
+
+        for station, station_info in df_stations.iterrows():
+            columns = ['Timestamp'] + list(store.file[f'air_quality/{station}']) + FEATURE_COLUMNS
+
+            # stations without feature table or with changed components are computed completely
+            if dirty_from == -np.inf or f'features/{station}' not in store.file or \
+                    store.columns(f'features/{station}') != columns:
+                start = None
+            else:
+                start = round_to_hour(dirty_from - 1800)
+
+            features[station] = (start, compute_station_features(
+                store, station, float(station_info['lat']), float(station_info['lng']), start, sensors, weather,
+                construction_rows, radius))
+
+    # write recomputed hours
+    number_of_rows = 0
+    with h5py.File(path_h5, 'a') as hdf5_file:
+        features_group = hdf5_file.require_group('features')
+
+        for station, (start, df) in features.items():
+            columns = np.array(df.columns, dtype='S')
+
+            # complete recomputation: replace feature table
+            if station in features_group and start is None:
+                del features_group[station]
+
+            if station not in features_group:
+                dataset = features_group.create_dataset(station, shape=(0, len(columns)),
+                                                        maxshape=(None, len(columns)), dtype='float64',
+                                                        chunks=(1024, len(columns)))
+                dataset.attrs['columns'] = columns
+
+            dataset = features_group[station]
+            position = 0 if start is None else timestamp_slice(dataset, pd.to_datetime(start, unit='s')).start
+
+            dataset.resize((position + len(df), len(columns)))
+            dataset[position:] = df.to_numpy(dtype='float64')
+            number_of_rows += len(df)
+
+        features_group.attrs['dirty_from'] = np.inf
+        features_group.attrs['radius'] = radius
+
+    return number_of_rows
@@ -0,0 +1,210 @@
+import json
+from pathlib import Path
+from datetime import datetime, timedelta
+from urllib.parse import quote
+import numpy as np
+import pandas as pd
+
+from utils.hdf5_file_output import HDF5Store, timestamp_slice
+from utils.hdf5_file_streaming import subject_dataset_paths
+from utils.feature_table import round_to_hour
+
+
+def find_gaps(timestamps, start, end):
+    """
+    Finds the missing hours of an hourly time series between start and end with the differences of the
+    stored timestamps
+
+    :param timestamps: stored Unix timestamps
+    :param start: first expected hour as Unix timestamp
+    :param end: last expected hour as Unix timestamp
+    :return: array with first and last missing hour per gap (one row per gap)
+    """
+    hours = np.unique(round_to_hour(timestamps))
+    hours = hours[(hours >= start) & (hours <= end)]
+
+    # hours before and after the window as borders, so missing hours at the beginning and end are found as well
+    borders = np.concatenate([[start - 3600], hours, [end + 3600]])
+    gap_positions = np.flatnonzero(np.diff(borders) > 3600)
+
+    return np.column_stack([borders[gap_positions] + 3600, borders[gap_positions + 1] - 3600])
+
+
+def gap_window(subject, date, days):
+    """
+    Determines the hours which should already be stored for a subject (the last days up to the last crawled hour)
+
+    :param subject: subject (air_quality, traffic)
+    :param date: current datetime
+    :param days: length of the window in days
+    :return: first and last hour as Unix timestamps
+    """
+    if subject == 'air_quality':
+        # air quality is crawled for the last day
+        end = datetime(date.year, date.month, date.day) - timedelta(hours=1)
+    else:
+        # traffic is crawled for the hour ending two hours ago (see determine_subject_date)
+        if date.minute >= 30:
+            date += timedelta(hours=1)
+        end = date.replace(minute=0, second=0, microsecond=0) - timedelta(hours=2)
+
+    end = end.timestamp()
+
+    return end - (days * 24 - 1) * 3600, end
+
+
+def scan_gaps(path, subject, start, end):
+    """
+    Finds the missing hours of all time series datasets of a subject (air quality components, traffic sensors).
+    Datasets without any data are skipped.
+
+    :param path: path to HDF5 File
+    :param subject: subject (air_quality, traffic)
+    :param start: first expected hour as Unix timestamp
+    :param end: last expected hour as Unix timestamp
+    :return: dataframe with source (station or sensor), dataset, first and last missing hour per gap
+    """
+    gaps = []
+
+    with HDF5Store(path) as store:
+        for dataset_path in subject_dataset_paths(path, subject):
+            dataset = store.dataset(dataset_path)
+
+            if len(dataset) == 0:
+                continue
+
+            timestamps = dataset[timestamp_slice(dataset, pd.to_datetime(start - 1800, unit='s'),
+                                                 pd.to_datetime(end + 1800, unit='s')), 0]
+            dataset_gaps = find_gaps(timestamps, start, end)
+
+            gaps.append(pd.DataFrame({'Source': dataset_path.strip('/').split('/')[1], 'Dataset': dataset_path,
+                                      'Start': dataset_gaps[:, 0], 'End': dataset_gaps[:, 1]}))
+
+    if len(gaps) == 0:
+        return pd.DataFrame(columns=['Source', 'Dataset', 'Start', 'End'])
+
+    return pd.concat(gaps, ignore_index=True)
+
+
+def merge_gaps(gaps, merge_hours=0, max_hours=None):
+    """
+    Merges the gaps of every source (e.g. all components of a station) to a minimal list of re-crawl jobs.
+    Overlapping and adjacent gaps and gaps with at most merge_hours existing hours in between are merged
+    into one range, ranges longer than max_hours are split.
+
+    :param gaps: dataframe with source, first and last missing hour per gap (e.g. from scan_gaps)
+    :param merge_hours: maximum number of existing hours between two gaps to be merged
+    :param max_hours: maximum number of hours per job (None: unlimited)
+    :return: dataframe with source, first and last hour and number of hours per job
+    """
+    if gaps.empty:
+        return pd.DataFrame(columns=['Source', 'Start', 'End', 'Hours'])
+
+    gaps = gaps.sort_values(['Source', 'Start'], kind='stable')
+    sources = gaps['Source'].to_numpy()
+    starts, ends = gaps['Start'].to_numpy(dtype='float64'), gaps['End'].to_numpy(dtype='float64')
+
+    # latest end of the previous gaps of the same source
+    previous_ends = gaps.groupby('Source', sort=False)['End'].cummax().shift(1).to_numpy(dtype='float64')
+
+    # new job for a new source or a gap further than merge_hours from the previous gaps
+    new_job = np.ones(len(gaps), dtype=bool)
+    new_job[1:] = (sources[1:] != sources[:-1]) | (starts[1:] > previous_ends[1:] + (merge_hours + 1) * 3600)
+
+    jobs = pd.DataFrame({'Source': sources[new_job],
+                         'Start': starts[new_job],
+                         'End': np.maximum.reduceat(ends, np.flatnonzero(new_job))})
+    jobs['Hours'] = ((jobs['End'] - jobs['Start']) / 3600).round().astype('int64') + 1
+
+    # split long jobs into parts of max_hours
+    if max_hours is not None and (jobs['Hours'] > max_hours).any():
+        parts = ((jobs['Hours'] - 1) // max_hours + 1).to_numpy()
+        part_numbers = np.arange(parts.sum()) - np.repeat(np.cumsum(parts) - parts, parts)
+        jobs = jobs.loc[jobs.index.repeat(parts)].reset_index(drop=True)
+
+        jobs['Start'] = jobs['Start'] + part_numbers * max_hours * 3600
+        jobs['End'] = np.minimum(jobs['End'], jobs['Start'] + (max_hours - 1) * 3600)
+        jobs['Hours'] = ((jobs['End'] - jobs['Start']) / 3600).round().astype('int64') + 1
+
+    return jobs
+
+
+def select_gap_hours(gaps, attempts_file, max_attempts=3):
+    """
+    Removes the missing hours which were re-crawled max_attempts times already (hours which can't be
+    filled by the API are not crawled again and again) and counts the attempts per source and hour in a JSON file
+
+    :param gaps: dataframe with source, first and last missing hour per gap (e.g. from scan_gaps)
+    :param attempts_file: path to JSON file with the number of attempts per source and hour
+    :param max_attempts: maximum number of attempts per hour
+    :return: dataframe with source, first and last missing hour per remaining gap
+    """
+    attempts_file = Path(attempts_file)
+    attempts = json.loads(attempts_file.read_text()) if attempts_file.exists() else {}
+
+    # one row per source and missing hour (missing hours of several datasets of a source only once)
+    lengths = ((gaps['End'].to_numpy(dtype='float64') - gaps['Start'].to_numpy(dtype='float64')) / 3600).round() \
+        .astype('int64') + 1
+    hours = pd.DataFrame({'Source': np.repeat(gaps['Source'].to_numpy(), lengths),
+                          'Hour': np.repeat(gaps['Start'].to_numpy(dtype='float64'), lengths) +
+                          (np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)) * 3600})
+    hours = hours.drop_duplicates().sort_values(['Source', 'Hour'], kind='stable')
+
+    counts = np.array([attempts.get(source, {}).get(f'{hour:.0f}', 0) for source, hour in
+                       zip(hours['Source'], hours['Hour'])], dtype='int64')
+    selected = counts < max_attempts
+
+    # attempts of the current missing hours only (hours which were filled or left the window are removed)
+    new_attempts = {}
+    for source, hour, count, select in zip(hours['Source'], hours['Hour'], counts, selected):
+        new_attempts.setdefault(source, {})[f'{hour:.0f}'] = int(count + select)
+    attempts_file.parent.mkdir(parents=True, exist_ok=True)
+    attempts_file.write_text(json.dumps(new_attempts))
+
+    hours = hours[selected]
+
+    # consecutive hours of a source as gaps again
+    sources, hour_values = hours['Source'].to_numpy(), hours['Hour'].to_numpy()
+    new_gap = np.ones(len(hours), dtype=bool)
+    new_gap[1:] = (sources[1:] != sources[:-1]) | (np.diff(hour_values) > 3600)
+    last_hours = np.append(np.flatnonzero(new_gap)[1:] - 1, len(hours) - 1) if len(hours) > 0 else []
+
+    return pd.DataFrame({'Source': sources[new_gap], 'Start': hour_values[new_gap],
+                         'End': hour_values[last_hours]})
+
+
+def gap_jobs(path, subject, date, days=7, merge_hours=0, max_hours=None, attempts_file=None, max_attempts=3):
+    """
+    Determines the re-crawl jobs of a subject: missing hours within the last days merged per source
+
+    :param path: path to HDF5 File
+    :param subject: subject (air_quality, traffic)
+    :param date: current datetime
+    :param days: length of the window in days
+    :param merge_hours: maximum number of existing hours between two gaps to be merged
+    :param max_hours: maximum number of hours per job (None: unlimited)
+    :param attempts_file: path to JSON file with the number of attempts per source and hour (None: no limit)
+    :param max_attempts: maximum number of attempts per hour
+    :return: dataframe with source, first and last hour and number of hours per job
+    """
+    if not Path(path).exists():
+        raise FileNotFoundError
+
+    start, end = gap_window(subject, date, days)
+    gaps = scan_gaps(path, subject, start, end)
+
+    if attempts_file is not None:
+        gaps = select_gap_hours(gaps, attempts_file, max_attempts)
+
+    return merge_gaps(gaps, merge_hours, max_hours)
+
+
+def format_gap_hour(timestamp, date_format):
+    """
+    Formats an hour of a re-crawl job for an API URL (local time like the regular crawl)
+
+    :param timestamp: Unix timestamp
+    :param date_format: format string (strftime)
+    :return: URL encoded string
+    """
+    return quote(datetime.fromtimestamp(timestamp).strftime(date_format))
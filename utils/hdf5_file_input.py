@@ -6,40 +6,608 @@ import json
 from dateutil import parser
 from datetime import datetime
 
+from utils.crawl_setup import create_construction_datasets, MISSING_DATE, ROLLUP_LEVELS, ROLLUP_STATISTICS, \
+    REWRITE_JOURNAL_SIZE
+from utils.hdf5_file_output import timestamp_slice, search_sorted, read_rows, validity_ends
+from utils.quantile_sketch import sketch_bins, NUMBER_OF_BINS, RELATIVE_ACCURACY, MIN_VALUE, MAX_VALUE
+from utils.feature_table import round_to_hour
 
-def add_air_quality_data(path_h5, data):
+
+def update_dataset_statistics(dataset, rows):
+    """
+    Updates the running statistics stored as attributes of a dataset with newly appended rows.
+    The first column is treated as ordering column (Timestamp or Year), all other columns as values.
+    Mean and variance are maintained with the (batched) Welford algorithm, NaN values are ignored.
+
+    :param dataset: HDF5 dataset the rows were appended to
+    :param rows: 2D array with the appended rows
+    :return:
+    """
+    rows = np.asarray(rows, dtype='float64').reshape(-1, dataset.shape[1])
+    keys = rows[:, 0]
+    values = rows[:, 1:]
+
+    # statistics of the new batch (ignoring missing values)
+    valid = ~np.isnan(values)
+    batch_count = valid.sum(axis=0)
+    batch_sum = np.where(valid, values, 0).sum(axis=0)
+    batch_mean = np.divide(batch_sum, batch_count, out=np.zeros(values.shape[1]), where=batch_count > 0)
+    batch_m2 = np.where(valid, values - batch_mean, 0)
+    batch_m2 = (batch_m2 ** 2).sum(axis=0)
+    batch_min = np.where(valid, values, np.inf).min(axis=0, initial=np.inf)
+    batch_max = np.where(valid, values, -np.inf).max(axis=0, initial=-np.inf)
+
+    if 'count' in dataset.attrs:
+        # read previous statistics
+        count = int(dataset.attrs['count'])
+        first_timestamp = float(dataset.attrs['first_timestamp'])
+        last_timestamp = float(dataset.attrs['last_timestamp'])
+        value_count = dataset.attrs['value_count'].astype('int64')
+        value_mean = dataset.attrs['value_mean'].astype('float64')
+        value_m2 = dataset.attrs['value_m2'].astype('float64')
+        value_min = dataset.attrs['value_min'].astype('float64')
+        value_max = dataset.attrs['value_max'].astype('float64')
+    else:
+        # initialize empty statistics
+        count = 0
+        first_timestamp = np.inf
+        last_timestamp = -np.inf
+        value_count = np.zeros(values.shape[1], dtype='int64')
+        value_mean = np.zeros(values.shape[1])
+        value_m2 = np.zeros(values.shape[1])
+        value_min = np.full(values.shape[1], np.inf)
+        value_max = np.full(values.shape[1], -np.inf)
+
+    # combining previous and new statistics (parallel variant of the Welford algorithm)
+    total_count = value_count + batch_count
+    delta = batch_mean - value_mean
+    ratio = np.divide(batch_count, total_count, out=np.zeros(values.shape[1]), where=total_count > 0)
+    value_mean = value_mean + delta * ratio
+    value_m2 = value_m2 + batch_m2 + delta ** 2 * value_count * ratio
+
+    # write statistics to attributes
+    dataset.attrs['count'] = count + rows.shape[0]
+    dataset.attrs['first_timestamp'] = min(first_timestamp, np.nanmin(keys, initial=np.inf))
+    dataset.attrs['last_timestamp'] = max(last_timestamp, np.nanmax(keys, initial=-np.inf))
+    dataset.attrs['value_count'] = total_count
+    dataset.attrs['value_mean'] = value_mean
+    dataset.attrs['value_m2'] = value_m2
+    dataset.attrs['value_min'] = np.minimum(value_min, batch_min)
+    dataset.attrs['value_max'] = np.maximum(value_max, batch_max)
+
+
+def append_rows(dataset, rows):
+    """
+    Appends rows to a resizable 2D dataset in one write and keeps its statistics up to date
+
+    :param dataset: HDF5 dataset
+    :param rows: rows to be appended
+    :return:
+    """
+    rows = np.asarray(rows, dtype=dataset.dtype).reshape(-1, dataset.shape[1])
+
+    # datasets written before statistics were introduced are initialized once from existing data
+    if 'count' not in dataset.attrs and dataset.shape[0] > 0:
+        update_dataset_statistics(dataset, dataset[:])
+
+    # expanding the existing dataset and add data
+    start = dataset.shape[0]
+    dataset.resize((start + rows.shape[0], dataset.shape[1]))
+    dataset[start:] = rows
+
+    update_dataset_statistics(dataset, rows)
+
+
+def reset_dataset_statistics(dataset):
+    """
+    Recomputes the statistics of a dataset from its complete data (e.g. after values were overwritten)
+
+    :param dataset: HDF5 dataset
+    :return:
+    """
+    for name in ['count', 'first_timestamp', 'last_timestamp', 'value_count', 'value_mean', 'value_m2',
+                 'value_min', 'value_max']:
+        if name in dataset.attrs:
+            del dataset.attrs[name]
+
+    update_dataset_statistics(dataset, dataset[:])
+
+
+def merge_rows(dataset, rows, overwrite=False, changes=None):
+    """
+    Adds rows to a time series dataset sorted by its Timestamp column (first column) without creating
+    duplicate timestamps, so repeated crawls and backfills can be added safely.
+    Incoming timestamps are only compared with the tail of the dataset from the earliest incoming timestamp on
+    (found by binary search), rows with already existing timestamps are dropped or overwrite the existing values.
+
+    :param dataset: HDF5 dataset
+    :param rows: rows to be added
+    :param overwrite: overwrite values of existing timestamps instead of dropping the incoming rows
+    :param changes: dictionary collecting the changes of several merges for time_series_changed
+                    (None: data derived from the dataset is updated right away)
+    :return: number of added rows
+    """
+    rows = np.asarray(rows, dtype=dataset.dtype).reshape(-1, dataset.shape[1])
+
+    # sort incoming rows and keep the last row per timestamp
+    rows = rows[np.argsort(rows[:, 0], kind='stable')]
+    last_rows = np.append(rows[1:, 0] != rows[:-1, 0], True)
+    rows = rows[last_rows]
+
+    if rows.shape[0] == 0:
+        return 0
+
+    # usual case: all rows are newer than the existing data
+    if dataset.shape[0] == 0 or rows[0, 0] > dataset[-1, 0]:
+        append_rows(dataset, rows)
+        record_change(dataset, rows[0, 0], True, changes)
+        return rows.shape[0]
+
+    # read tail of the dataset which could contain the incoming timestamps
+    start = timestamp_slice(dataset, pd.to_datetime(float(rows[0, 0]), unit='s')).start
+    tail = dataset[start:]
+
+    # vectorized search of the incoming timestamps within the tail
+    positions = np.searchsorted(tail[:, 0], rows[:, 0])
+    existing = positions < tail.shape[0]
+    existing[existing] = tail[positions[existing], 0] == rows[existing, 0]
+
+    overwritten = False
+    if overwrite and existing.any():
+        changed = (tail[positions[existing]] != rows[existing]).any(axis=1)
+        if changed.any():
+            tail[positions[existing]] = rows[existing]
+            dataset[start:] = tail
+            overwritten = True
+
+    new_rows = rows[~existing]
+    appended = not overwritten
+
+    if new_rows.shape[0] > 0 and new_rows[0, 0] > tail[-1, 0]:
+        # only newer rows left
+        append_rows(dataset, new_rows)
+    elif new_rows.shape[0] > 0:
+        appended = False
+
+        # backfill: merge new rows into the tail and rewrite it in order
+        merged = np.concatenate([tail, new_rows])
+        merged = merged[np.argsort(merged[:, 0], kind='stable')]
+
+        if 'count' not in dataset.attrs:
+            update_dataset_statistics(dataset, dataset[:])
+
+        dataset.resize((start + merged.shape[0], dataset.shape[1]))
+        dataset[start:] = merged
+        update_dataset_statistics(dataset, new_rows)
+
+    if overwritten:
+        reset_dataset_statistics(dataset)
+
+    if overwritten or new_rows.shape[0] > 0:
+        record_change(dataset, rows[0, 0], appended, changes)
+
+    return new_rows.shape[0]
+
+
+def rollup_rows(rows, columns, frequency):
+    """
+    Aggregates rows of a time series dataset by period (count, mean, minimum and maximum of every value column,
+    missing values are ignored)
+
+    :param rows: rows of the dataset sorted by Timestamp (first column)
+    :param columns: column names of the dataset
+    :param frequency: period as pandas period frequency (e.g. 'h', 'D', 'W', 'M')
+    :return: 2D array with period start (Unix timestamp) and statistics per value column
+    """
+    rows = np.asarray(rows, dtype='float64').reshape(-1, len(columns))
+    if rows.shape[0] == 0:
+        return np.empty((0, 1 + len(ROLLUP_STATISTICS) * (len(columns) - 1)))
+
+    # period start of every row, rows of a period are consecutive (sorted timestamps); the float32 timestamps
+    # are snapped to the full hour first, otherwise hours stored slightly too early fall into the previous period
+    period_starts = pd.to_datetime(round_to_hour(rows[:, 0]), unit='s').to_period(frequency).start_time
+    period_starts = (period_starts - pd.Timestamp(0)).total_seconds().to_numpy()
+    period_starts, first_rows = np.unique(period_starts, return_index=True)
+
+    values = rows[:, 1:]
+    valid = ~np.isnan(values)
+
+    count = np.add.reduceat(valid.astype('int64'), first_rows, axis=0)
+    total = np.add.reduceat(np.where(valid, values, 0), first_rows, axis=0)
+    mean = np.divide(total, count, out=np.full(total.shape, np.nan), where=count > 0)
+    minimum = np.minimum.reduceat(np.where(valid, values, np.inf), first_rows, axis=0)
+    maximum = np.maximum.reduceat(np.where(valid, values, -np.inf), first_rows, axis=0)
+    minimum[count == 0] = np.nan
+    maximum[count == 0] = np.nan
+
+    # statistics per value column: count, mean, min, max
+    statistics = np.stack([count, mean, minimum, maximum], axis=2).reshape(len(period_starts), -1)
+
+    return np.column_stack([period_starts, statistics])
+
+
+def update_rollups(dataset, timestamp=None):
+    """
+    Updates the rollups (pre-aggregated time series in the group 'rollups') of a time series dataset.
+    Only the periods from the given timestamp on are recomputed from the raw data, missing rollups are
+    computed completely.
+
+    :param dataset: HDF5 dataset whose data was changed
+    :param timestamp: earliest changed Unix timestamp (None: recompute everything)
+    :return:
     """
-    Adds air quality data to HDF5 File
+    hdf5_file = dataset.file
+    columns = [column.decode('utf-8') for column in dataset.attrs['columns']]
+    rollup_group = hdf5_file.require_group(f'rollups{dataset.name}')
+
+    # rollups which don't exist yet are computed from the beginning
+    if any(level not in rollup_group for level in ROLLUP_LEVELS):
+        timestamp = None
+
+    # first period to be recomputed per level
+    period_starts = {level: None if timestamp is None else
+                     pd.to_datetime(round_to_hour(timestamp), unit='s').to_period(frequency).start_time
+                     for level, frequency in ROLLUP_LEVELS.items()}
+
+    # read raw data from the earliest period on (half an hour earlier, as rows are assigned to the nearest hour)
+    if timestamp is None:
+        rows = dataset[:]
+    else:
+        rows = dataset[timestamp_slice(dataset, min(period_starts.values()) - pd.Timedelta(minutes=30)).start:]
+
+    for level, frequency in ROLLUP_LEVELS.items():
+        if level not in rollup_group:
+            rollup_columns = ['Timestamp'] + [f'{column} {statistic}' for column in columns[1:]
+                                              for statistic in ROLLUP_STATISTICS]
+            rollup_dataset = rollup_group.create_dataset(level, shape=(0, len(rollup_columns)),
+                                                         maxshape=(None, len(rollup_columns)), dtype='float64')
+            rollup_dataset.attrs['columns'] = np.array(rollup_columns, dtype='S')
+            rollup_dataset.attrs['frequency'] = frequency
+
+        rollup_dataset = rollup_group[level]
+
+        if period_starts[level] is None:
+            level_rows, position = rows, 0
+        else:
+            # raw rows and rollup rows from the first changed period on
+            period_start = (period_starts[level] - pd.Timestamp(0)).total_seconds()
+            level_rows = rows[round_to_hour(rows[:, 0]) >= period_start]
+            position = timestamp_slice(rollup_dataset, period_starts[level]).start
+
+        rollup = rollup_rows(level_rows, columns, frequency)
+
+        # replace the changed periods
+        rollup_dataset.resize((position + rollup.shape[0], rollup_dataset.shape[1]))
+        rollup_dataset[position:] = rollup
+
+
+def update_sketches(dataset, timestamp=None):
+    """
+    Updates the monthly quantile sketches (group 'sketches') of an air quality dataset. Every row of the sketch
+    dataset holds the start of the month and the number of values per logarithmic bin (utils.quantile_sketch),
+    so sketches of any months can be merged by adding them up. Only the months from the given timestamp on are
+    recomputed from the raw data.
+
+    :param dataset: HDF5 dataset whose data was changed
+    :param timestamp: earliest changed Unix timestamp (None: recompute everything)
+    :return:
+    """
+    hdf5_file = dataset.file
+    sketch_path = f'sketches{dataset.name}'
+
+    if sketch_path not in hdf5_file:
+        sketch_dataset = hdf5_file.create_dataset(sketch_path, shape=(0, 1 + NUMBER_OF_BINS),
+                                                  maxshape=(None, 1 + NUMBER_OF_BINS), dtype='int64',
+                                                  chunks=(16, 1 + NUMBER_OF_BINS), compression='gzip')
+        sketch_dataset.attrs['relative_accuracy'] = RELATIVE_ACCURACY
+        sketch_dataset.attrs['min_value'] = MIN_VALUE
+        sketch_dataset.attrs['max_value'] = MAX_VALUE
+        timestamp = None
+
+    sketch_dataset = hdf5_file[sketch_path]
+
+    # read raw data from the first changed month on
+    if timestamp is None:
+        month_start, position = None, 0
+        rows = dataset[:]
+    else:
+        month_start = pd.to_datetime(float(timestamp), unit='s').to_period('M').start_time
+        position = timestamp_slice(sketch_dataset, month_start).start
+        rows = dataset[timestamp_slice(dataset, month_start).start:]
+
+    timestamps = pd.to_datetime(rows[:, 0].astype('float64'), unit='s')
+    selected = ~np.isnan(rows[:, 1])
+    if month_start is not None:
+        selected &= timestamps >= month_start
+
+    # number of values per month and bin
+    months = timestamps[selected].to_period('M').start_time
+    month_starts, month_numbers = np.unique((months - pd.Timestamp(0)).total_seconds().to_numpy(),
+                                            return_inverse=True)
+    counts = np.bincount(month_numbers * NUMBER_OF_BINS + sketch_bins(rows[selected, 1]),
+                         minlength=len(month_starts) * NUMBER_OF_BINS).reshape(len(month_starts), NUMBER_OF_BINS)
+
+    # replace the changed months
+    sketch_dataset.resize((position + len(month_starts), sketch_dataset.shape[1]))
+    sketch_dataset[position:] = np.column_stack([month_starts.astype('int64'), counts])
+
+
+def build_sketches(path_h5, rebuild=False):
+    """
+    Computes the missing quantile sketches of all air quality datasets (e.g. for HDF5 Files created before
+    sketches were introduced)
 
     :param path_h5: path to HDF5 File
-    :param data: Data to be added
+    :param rebuild: recompute existing sketches as well
+    :return: number of datasets whose sketches were computed
+    """
+    hdf5_file = Path(path_h5)
+    if hdf5_file.exists():
+        with h5py.File(path_h5, 'a') as hdf5_file:
+            datasets = time_series_datasets(hdf5_file, ['air_quality'])
+
+            if not rebuild:
+                datasets = [dataset for dataset in datasets if f'sketches{dataset.name}' not in hdf5_file]
+
+            for dataset in datasets:
+                update_sketches(dataset)
+
+            return len(datasets)
+    else:
+        raise FileNotFoundError
+
+
+def time_series_datasets(hdf5_file, subjects):
+    """
+    Collects all time series datasets of subjects
+
+    :param hdf5_file: opened HDF5 File
+    :param subjects: subjects with time series datasets
+    :return: list of HDF5 datasets
+    """
+    datasets = []
+
+    def collect_dataset(name, item):
+        if isinstance(item, h5py.Dataset) and 'columns' in item.attrs:
+            datasets.append(item)
+
+    for subject in subjects:
+        if subject in hdf5_file:
+            hdf5_file[subject].visititems(collect_dataset)
+
+    return datasets
+
+
+def mark_features_dirty(hdf5_file, timestamp):
+    """
+    Marks the feature table (group 'features') as outdated from the given point in time on
+
+    :param hdf5_file: opened HDF5 File
+    :param timestamp: earliest changed Unix timestamp (-inf: everything)
+    :return:
+    """
+    features_group = hdf5_file.require_group('features')
+    features_group.attrs['dirty_from'] = min(float(features_group.attrs.get('dirty_from', np.inf)), float(timestamp))
+
+
+def mark_neighborhoods_outdated(hdf5_file):
+    """
+    Marks the neighborhood table of the stations (group 'neighborhoods') as outdated, e.g. after constructions changed
+
+    :param hdf5_file: opened HDF5 File
     :return:
     """
+    hdf5_file.require_group('neighborhoods').attrs['outdated'] = True
+
+
+def bump_data_version(hdf5_file, subject=None):
+    """
+    Increments the data version (attribute 'data_version' of the HDF5 File), so results derived from the data
+    (e.g. cached analyses) can be recognized as outdated
+
+    :param hdf5_file: opened HDF5 File
+    :param subject: group of the changed data (optional), its attribute 'data_version' is set to the new version,
+                    so readers can tell which data changed
+    :return: new data version
+    """
+    version = int(hdf5_file.attrs.get('data_version', 0)) + 1
+    hdf5_file.attrs['data_version'] = version
+
+    if subject is not None:
+        hdf5_file[subject].attrs['data_version'] = version
+
+    return version
+
+
+def record_change(dataset, timestamp, appended, changes=None):
+    """
+    Records a change of a time series dataset for time_series_changed
+
+    :param dataset: HDF5 dataset whose data was changed
+    :param timestamp: earliest changed Unix timestamp
+    :param appended: rows were only appended
+    :param changes: dictionary collecting the changes of several merges (None: time_series_changed right away)
+    :return:
+    """
+    if changes is None:
+        time_series_changed(dataset.file, {dataset.name: (float(timestamp), appended)})
+        return
+
+    previous_timestamp, previous_appended = changes.get(dataset.name, (np.inf, True))
+    changes[dataset.name] = (min(previous_timestamp, float(timestamp)), previous_appended and appended)
+
+
+def time_series_changed(hdf5_file, changes, version=None):
+    """
+    Updates everything derived from time series datasets after their data was changed. All changes of a batch
+    are handled at once: rollups and sketches are updated once per dataset and the data version is incremented once.
+
+    :param hdf5_file: opened HDF5 File
+    :param changes: dictionary with dataset path and earliest changed Unix timestamp and whether rows were only
+                    appended (False: existing rows were changed or moved, attribute 'rewritten_version' of the
+                    subject group is set, so readers of the tail reload the subject, see also record_rewrite)
+    :param version: data version of the changes, e.g. of earlier batches of the same run (None: new version)
+    :return: data version of the changes
+    """
+    if len(changes) == 0:
+        return version
+
+    for dataset_path, (timestamp, _) in changes.items():
+        dataset = hdf5_file[dataset_path]
+        update_rollups(dataset, timestamp)
+
+        if dataset.name.startswith('/air_quality/'):
+            update_sketches(dataset, timestamp)
+
+    mark_features_dirty(hdf5_file, min(timestamp for timestamp, _ in changes.values()))
+
+    if version is None:
+        version = bump_data_version(hdf5_file)
+
+    # earliest rewritten timestamp per subject
+    rewritten = {}
+
+    for dataset_path, (timestamp, appended) in changes.items():
+        subject = dataset_path.strip('/').split('/')[0]
+        hdf5_file[subject].attrs['data_version'] = version
+
+        if not appended:
+            rewritten[subject] = min(rewritten.get(subject, np.inf), timestamp)
+
+    for subject, timestamp in rewritten.items():
+        record_rewrite(hdf5_file[subject], version, timestamp)
+
+    return version
+
+
+def record_rewrite(subject_group, version, timestamp):
+    """
+    Records a change of a time series subject which didn't only append rows (e.g. a backfill or overwritten values):
+    attribute 'rewritten_version' and the journal of the last rewrites (attribute 'rewrites' with data version and
+    earliest changed timestamp per rewrite), so readers of new rows (e.g. the Parquet export) know which time range
+    they have to read again. Attribute 'rewrites_complete_after' holds the latest version removed from the journal.
+
+    :param subject_group: HDF5 group of the subject (air_quality, traffic, weather)
+    :param version: data version of the change
+    :param timestamp: earliest changed Unix timestamp
+    :return:
+    """
+    subject_group.attrs['rewritten_version'] = version
+
+    rewrites = subject_group.attrs.get('rewrites', np.empty((0, 2))).reshape(-1, 2)
+
+    # a later batch of the same run (same version) extends the rewrite of the version
+    if len(rewrites) > 0 and rewrites[-1, 0] == version:
+        rewrites[-1, 1] = min(rewrites[-1, 1], timestamp)
+    else:
+        rewrites = np.concatenate([rewrites, [[version, timestamp]]])
+
+    if len(rewrites) > REWRITE_JOURNAL_SIZE:
+        subject_group.attrs['rewrites_complete_after'] = int(rewrites[-REWRITE_JOURNAL_SIZE - 1, 0])
+        rewrites = rewrites[-REWRITE_JOURNAL_SIZE:]
+
+    subject_group.attrs['rewrites'] = rewrites
+
+
+def build_rollups(path_h5, subjects=('air_quality', 'traffic', 'weather'), rebuild=False):
+    """
+    Computes the missing rollups of all time series datasets (e.g. for HDF5 Files created before rollups
+    were introduced)
+
+    :param path_h5: path to HDF5 File
+    :param subjects: subjects with time series datasets
+    :param rebuild: recompute existing rollups as well
+    :return: number of datasets whose rollups were computed
+    """
     hdf5_file = Path(path_h5)
     if hdf5_file.exists():
         with h5py.File(path_h5, 'a') as hdf5_file:
-            for entry in data:
-                # converting the date to a Unix timestamp
-                timestamp = parser.parse(entry['datetime']).timestamp()
+            datasets = time_series_datasets(hdf5_file, subjects)
 
-                # determine dataset path within station group
-                dataset_path = f"air_quality/{entry['station']}/{entry['component']}"
+            # datasets without (complete) rollups
+            if not rebuild:
+                datasets = [dataset for dataset in datasets
+                            if any(f'rollups{dataset.name}/{level}' not in hdf5_file for level in ROLLUP_LEVELS)]
 
-                if dataset_path in hdf5_file:
-                    # expanding the existing dataset
-                    dataset = hdf5_file[dataset_path]
-                    dataset.resize((dataset.shape[0] + 1, 2))
+            for dataset in datasets:
+                update_rollups(dataset)
 
-                    # add data
-                    dataset[-1] = [timestamp, entry['value']]
+            return len(datasets)
+    else:
+        raise FileNotFoundError
+
+
+def add_air_quality_data(path_h5, data, overwrite=False):
+    """
+    Adds air quality data to HDF5 File (already existing timestamps are skipped)
+
+    :param path_h5: path to HDF5 File
+    :param data: Data to be added
+    :param overwrite: overwrite values of existing timestamps
+    :return:
+    """
+    hdf5_file = Path(path_h5)
+    if hdf5_file.exists():
+        # collect rows per dataset to write every dataset only once
+        dataset_rows = {}
+
+        for entry in data:
+            # converting the date to a Unix timestamp
+            timestamp = parser.parse(entry['datetime']).timestamp()
+
+            # determine dataset path within station group
+            dataset_path = f"air_quality/{entry['station']}/{entry['component']}"
+            dataset_rows.setdefault(dataset_path, []).append([timestamp, entry['value']])
+
+        add_time_series_data(path_h5, dataset_rows, overwrite)
+
+    else:
+        raise FileNotFoundError
+
+
+def add_time_series_data(path_h5, dataset_rows, overwrite=False):
+    """
+    Adds rows to several time series datasets (air quality, traffic, weather) with one opening of the HDF5 File.
+    Rows with timestamps already existing in a dataset are dropped (or overwrite the existing values).
 
-                else:
-                    print(f"{entry['component']} not in {entry['station']}")
+    :param path_h5: path to HDF5 File
+    :param dataset_rows: dictionary with dataset path and rows to be added
+    :param overwrite: overwrite values of existing timestamps
+    :return:
+    """
+    hdf5_file = Path(path_h5)
+    if hdf5_file.exists():
+        with h5py.File(path_h5, 'a') as hdf5_file:
+            merge_time_series_rows(hdf5_file, dataset_rows, overwrite)
 
     else:
         raise FileNotFoundError
 
 
+def merge_time_series_rows(hdf5_file, dataset_rows, overwrite=False, version=None):
+    """
+    Adds rows to several time series datasets of an opened HDF5 File, see add_time_series_data.
+    Data derived from the datasets (rollups, sketches, data version) is updated once for all datasets.
+
+    :param hdf5_file: HDF5 File opened for writing
+    :param dataset_rows: dictionary with dataset path and rows to be added
+    :param overwrite: overwrite values of existing timestamps
+    :param version: data version of the changes, e.g. of earlier batches of the same run (None: new version)
+    :return: data version of the changes (version if nothing changed)
+    """
+    changes = {}
+
+    for dataset_path, rows in dataset_rows.items():
+        if dataset_path in hdf5_file:
+            # expanding the existing dataset and add data
+            merge_rows(hdf5_file[dataset_path], np.array(rows, dtype='float64'), overwrite, changes)
+
+        else:
+            print(f'Dataset {dataset_path} not found')
+
+    return time_series_changed(hdf5_file, changes, version)
+
+
 def add_weather_data(path_h5, temperature, precipitation, wind_speed):
     """
     Adds weather data to HDF5 File
@@ -62,11 +630,8 @@ def add_weather_data(path_h5, temperature, precipitation, wind_speed):
                 # create timestamp
                 timestamp = datetime.now().timestamp()
 
-                # expanding the existing dataset
-                dataset.resize((dataset.shape[0] + 1, 4))
-
-                # add data
-                dataset[-1] = [timestamp, temperature, precipitation, wind_speed]
+                # expanding the existing dataset and add data
+                merge_rows(dataset, [timestamp, temperature, precipitation, wind_speed])
             else:
                 print('Dataset not found')
     else:
@@ -90,12 +655,9 @@ def add_car_regs_data(path_h5, data):
             if dataset_path in hdf5_file:
                 dataset = hdf5_file[dataset_path]
 
-                # expanding the existing dataset
-                dataset.resize((dataset.shape[0] + 1, 7))
-                data_array = np.array(data)
-
-                # add data
-                dataset[-1] = data_array
+                # expanding the existing dataset and add data
+                append_rows(dataset, np.array(data))
+                bump_data_version(hdf5_file, 'car_registrations')
             else:
                 print('Dataset not found')
     else:
@@ -119,12 +681,9 @@ def add_new_car_regs_data(path_h5, data):
             if dataset_path in hdf5_file:
                 dataset = hdf5_file[dataset_path]
 
-                # expanding the existing dataset
-                dataset.resize((dataset.shape[0] + 1, 8))
-                data_array = np.array(data)
-
-                # add data
-                dataset[-1] = data_array
+                # expanding the existing dataset and add data
+                append_rows(dataset, np.array(data))
+                bump_data_version(hdf5_file, 'new_car_registrations')
             else:
                 print('Dataset not found')
 
@@ -132,67 +691,422 @@ def add_new_car_regs_data(path_h5, data):
         raise FileNotFoundError
 
 
-def add_construction_data(path_h5, data):
+def encode_categories(dataset, values):
     """
-    Adds construction data to HDF5 File
+    Encodes categorical values as codes of the categories stored in the attributes of the dataset.
+    Values not seen before are added to the categories, missing values get the code -1.
 
-    :param path_h5: path to HDF5 File
-    :param data: construction data
-    :return:
+    :param dataset: HDF5 dataset with attribute 'categories'
+    :param values: categorical values
+    :return: array of codes
+    """
+    categories = [category.decode('utf-8') for category in dataset.attrs['categories']]
+    values = pd.Series(values, dtype='object')
+    missing = values.isna()
+    values = values.astype(str)
+
+    # extend categories by new values
+    new_categories = [value for value in values[~missing].unique() if value not in categories]
+    if new_categories:
+        categories += new_categories
+        dataset.attrs['categories'] = np.array([category.encode('utf-8') for category in categories], dtype='S')
+
+    codes = pd.Categorical(values, categories=categories).codes.astype('int16')
+    codes[missing.to_numpy()] = -1
+
+    return codes
+
+
+def encode_dates(values):
+    """
+    Encodes dates (strings in any common format) as Unix timestamps, missing dates as MISSING_DATE.
+    Dates without timezone are stored as UTC.
+
+    :param values: dates
+    :return: array of Unix timestamps (int64)
+    """
+    dates = pd.to_datetime(pd.Series(values, dtype='object'), errors='coerce', utc=True, dayfirst=True,
+                           format='mixed')
+    seconds = (dates - pd.Timestamp(0, tz='UTC')).dt.total_seconds()
+
+    return seconds.fillna(MISSING_DATE).to_numpy().astype('int64')
+
+
+def encode_geometries(geo_types, coordinates, geometries, type_dataset):
     """
-    def convert_row_to_string(cell):
-        if isinstance(cell, (list, dict)):
-            return json.dumps(cell)
+    Splits GeoJSON geometries into parts (one coordinate sequence each) and one coordinate array.
+    Members of geometry collections and polygons of multipolygons are kept as numbers of the parts.
+
+    :param geo_types: geometry types
+    :param coordinates: coordinates of the geometries (not for geometry collections)
+    :param geometries: members of geometry collections
+    :param type_dataset: HDF5 dataset with categories of geometry types
+    :return: number of parts per geometry, parts (member, polygon, type, first coordinate, coordinates)
+             and coordinates
+    """
+    def coordinate_sequences(geo_type, geo_coordinates):
+        # list of (polygon, coordinate sequence) depending on the nesting level of the geometry type
+        if geo_type == 'Point':
+            return [(0, [geo_coordinates])]
+        elif geo_type in ['LineString', 'MultiPoint']:
+            return [(0, geo_coordinates)]
+        elif geo_type in ['Polygon', 'MultiLineString']:
+            return [(0, sequence) for sequence in geo_coordinates]
+        elif geo_type == 'MultiPolygon':
+            return [(polygon, sequence) for polygon, rings in enumerate(geo_coordinates) for sequence in rings]
+        else:
+            return []
+
+    part_counts = []
+    parts = []
+    points = []
+
+    for geo_type, geo_coordinates, geo_geometries in zip(geo_types, coordinates, geometries):
+        # geometry collections consist of several members, all other geometries of one
+        if geo_type == 'GeometryCollection':
+            members = geo_geometries if isinstance(geo_geometries, list) else []
+        elif isinstance(geo_coordinates, list):
+            members = [{'type': geo_type, 'coordinates': geo_coordinates}]
         else:
-            return str(cell)
+            members = []
+
+        part_count = 0
+        for member, geometry in enumerate(members):
+            for polygon, sequence in coordinate_sequences(geometry['type'], geometry['coordinates']):
+                parts.append([member, polygon, geometry['type'], len(points), len(sequence)])
+                points.extend(sequence)
+                part_count += 1
+
+        part_counts.append(part_count)
+
+    parts = pd.DataFrame(parts, columns=['Member', 'Polygon', 'Type', 'First coordinate', 'Coordinates'])
+    parts['Type'] = encode_categories(type_dataset, parts['Type'])
+
+    return (np.array(part_counts, dtype='int64'),
+            parts.to_numpy(dtype='int64').reshape(-1, 5),
+            np.array(points, dtype='float64').reshape(-1, 2))
+
+
+def geometry_locations(part_counts, parts, coordinates, point_code):
+    """
+    Determines a representative location and the bounding box of every geometry.
+    The representative location is the first point of the geometry if there is one (e.g. in geometry collections),
+    otherwise the mean of all coordinates.
+
+    :param part_counts: number of parts per geometry
+    :param parts: geometry parts (member, polygon, type, first coordinate, coordinates) of all geometries in order
+    :param coordinates: coordinates (longitude, latitude) of all parts in order
+    :param point_code: code of geometry type 'Point' (None if unknown)
+    :return: latitude, longitude and bounding box (min longitude, min latitude, max longitude, max latitude)
+    """
+    number_of_geometries = len(part_counts)
+    geometry_of_part = np.repeat(np.arange(number_of_geometries), part_counts)
+    coordinate_counts = np.bincount(geometry_of_part, weights=parts[:, 4], minlength=number_of_geometries)
+    coordinate_counts = coordinate_counts.astype('int64')
+
+    lng = np.full(number_of_geometries, np.nan)
+    lat = np.full(number_of_geometries, np.nan)
+    bbox = np.full((number_of_geometries, 4), np.nan)
+
+    with_coordinates = coordinate_counts > 0
+    if with_coordinates.any():
+        # coordinates of a geometry are contiguous, so all reductions work on the starts of the geometries
+        starts = np.concatenate([[0], np.cumsum(coordinate_counts)[:-1]])[with_coordinates]
+        counts = coordinate_counts[with_coordinates]
+
+        mean = np.add.reduceat(coordinates, starts, axis=0) / counts[:, np.newaxis]
+        lng[with_coordinates], lat[with_coordinates] = mean[:, 0], mean[:, 1]
+        bbox[with_coordinates] = np.column_stack([np.minimum.reduceat(coordinates, starts, axis=0),
+                                                  np.maximum.reduceat(coordinates, starts, axis=0)])
+
+    if point_code is not None:
+        # first point per geometry replaces the mean
+        point_parts = np.flatnonzero(parts[:, 2] == point_code)
+        geometries, first = np.unique(geometry_of_part[point_parts], return_index=True)
+        points = coordinates[parts[point_parts[first], 3]]
+        lng[geometries], lat[geometries] = points[:, 0], points[:, 1]
+
+    return lat, lng, bbox
+
+
+def add_geometry_locations(constructions_group):
+    """
+    Adds representative locations and bounding boxes for all stored constructions
+    (HDF5 Files created before the locations were stored on write)
+
+    :param constructions_group: HDF5 group for constructions
+    :return:
+    """
+    geometry = constructions_group['geometry'][:]
+    parts = constructions_group['parts'][:]
+    coordinates = constructions_group['coordinates'][:]
 
+    # parts and coordinates of every geometry in order
+    part_rows = np.concatenate([np.arange(first, first + count) for first, count in geometry] + [[]]).astype('int64')
+    parts = parts[part_rows]
+    coordinate_rows = np.concatenate([np.arange(first, first + count) for first, count in parts[:, 3:5]] + [[]])
+    coordinates = coordinates[coordinate_rows.astype('int64')]
+    parts[:, 3] = np.concatenate([[0], np.cumsum(parts[:, 4])[:-1]]).astype('int64')
+
+    categories = [category.decode('utf-8') for category in constructions_group['geo_type'].attrs['categories']]
+    point_code = categories.index('Point') if 'Point' in categories else None
+
+    lat, lng, bbox = geometry_locations(geometry[:, 1], parts, coordinates, point_code)
+
+    constructions_group.create_dataset('lat', data=lat, maxshape=(None,), dtype='float64')
+    constructions_group.create_dataset('lng', data=lng, maxshape=(None,), dtype='float64')
+    constructions_group.create_dataset('bbox', data=bbox, maxshape=(None, 4), dtype='float64')
+    constructions_group['bbox'].attrs['columns'] = np.array(['Min longitude', 'Min latitude',
+                                                             'Max longitude', 'Max latitude'], dtype='S')
+
+
+def read_construction_index(hdf5_file):
+    """
+    Reads the persistent index (ID -> row) of the construction data sorted by ID.
+    The index is built once from the ID dataset if it doesn't exist yet (HDF5 Files created before the index).
+
+    :param hdf5_file: HDF5 File opened for writing
+    :return: index dataset with columns ID and Row
+    """
+    index_path = '/constructions/construction_index'
+
+    if index_path not in hdf5_file:
+        index_dataset = hdf5_file.create_dataset(index_path, shape=(0, 2), maxshape=(None, 2), dtype='int64')
+        index_dataset.attrs['columns'] = np.array(['ID', 'Row'], dtype='S')
+
+        ids = hdf5_file['/constructions/id'][:]
+        if len(ids) > 0:
+            # for IDs stored multiple times the last row is the current one
+            unique_ids, reversed_rows = np.unique(ids[::-1], return_index=True)
+            rows = len(ids) - 1 - reversed_rows
+
+            index_dataset.resize((len(unique_ids), 2))
+            index_dataset[:] = np.column_stack([unique_ids, rows])
+
+    return hdf5_file[index_path]
+
+
+def read_interval_index(constructions_group):
+    """
+    Reads the interval index over the validity periods of the current construction versions:
+    validity starts and ends sorted separately together with the according rows.
+    The index is built once from the stored data if it doesn't exist yet.
+
+    :param constructions_group: HDF5 group for constructions
+    :return: datasets with sorted (valid from, row) and (valid to, row)
+    """
+    if 'valid_from_index' not in constructions_group:
+        for name in ['valid_from_index', 'valid_to_index']:
+            dataset = constructions_group.create_dataset(name, shape=(0, 2), maxshape=(None, 2), dtype='int64')
+            dataset.attrs['columns'] = np.array(['Date', 'Row'], dtype='S')
+
+        current_rows = np.sort(read_construction_index(constructions_group.file)[:, 1])
+        if len(current_rows) > 0:
+            update_interval_index((constructions_group['valid_from_index'], constructions_group['valid_to_index']),
+                                  np.array([], dtype='int64'), current_rows,
+                                  constructions_group['valid_from'][current_rows],
+                                  constructions_group['valid_to'][current_rows])
+
+    return constructions_group['valid_from_index'], constructions_group['valid_to_index']
+
+
+def update_interval_index(interval_index, removed_rows, added_rows, valid_from, valid_to):
+    """
+    Removes superseded versions from the interval index and adds new versions.
+    Missing starts are sorted first (MISSING_DATE), missing ends last (open-ended validity).
+    Only the part of the index from the earliest removed or added date on is read and rewritten.
+
+    :param interval_index: datasets with sorted (valid from, row) and (valid to, row)
+    :param removed_rows: rows of superseded versions
+    :param added_rows: rows of new versions
+    :param valid_from: start of validity of new versions
+    :param valid_to: end of validity of new versions
+    :return:
+    """
+    # dates of the superseded versions as stored in the index
+    constructions_group = interval_index[0].parent
+    removed_from = read_rows(constructions_group['valid_from'], removed_rows)
+    removed_to = validity_ends(removed_from, read_rows(constructions_group['valid_to'], removed_rows))
+
+    for dataset, removed_dates, dates in zip(interval_index, [removed_from, removed_to],
+                                             [valid_from, validity_ends(valid_from, valid_to)]):
+        changed_dates = np.concatenate([removed_dates, dates])
+        if len(changed_dates) == 0:
+            continue
+
+        # entries before the earliest changed date stay as they are
+        first = search_sorted(dataset, changed_dates.min())
+
+        entries = dataset[first:]
+        entries = entries[~np.isin(entries[:, 1], removed_rows)]
+        entries = np.concatenate([entries, np.column_stack([dates, added_rows])])
+        entries = entries[np.argsort(entries[:, 0], kind='stable')]
+
+        dataset.resize((first + len(entries), 2))
+        dataset[first:] = entries
+
+
+def migrate_construction_data(hdf5_file):
+    """
+    Converts construction data from the former string matrix (/constructions/construction_data) into the typed
+    columnar datasets. The former dataset is kept as /constructions/construction_data_legacy.
+
+    :param hdf5_file: HDF5 File opened for writing
+    :return:
+    """
     def reconvert_cells(cell):
         try:
             return json.loads(cell)
         except json.JSONDecodeError:
             return cell.decode('utf-8')
 
+    constructions_group = hdf5_file['constructions']
+    legacy_dataset = constructions_group['construction_data']
+
+    # decode all cells once
+    legacy_data = pd.DataFrame(legacy_dataset[:]).applymap(reconvert_cells)
+    legacy_data.columns = ['properties.id', 'properties.tstore', 'properties.subtype', 'properties.severity',
+                           'properties.validity.from', 'properties.validity.to', 'properties.direction',
+                           'geometry.type', 'geometry.coordinates', 'geometry.geometries']
+
+    if 'construction_index' in constructions_group:
+        del constructions_group['construction_index']
+
+    create_construction_datasets(constructions_group)
+
+    # IDs stored more than once are former versions of the construction
+    version = legacy_data.groupby('properties.id').cumcount()
+    for number in range(version.max() + 1 if len(version) else 0):
+        write_construction_rows(constructions_group, legacy_data[version == number])
+
+    # keep statistics and former data
+    for attr in ['count', 'first_timestamp', 'last_timestamp']:
+        if attr in legacy_dataset.attrs:
+            constructions_group['timestamp'].attrs[attr] = legacy_dataset.attrs[attr]
+    constructions_group.move('construction_data', 'construction_data_legacy')
+
+
+def write_construction_rows(constructions_group, data):
+    """
+    Writes construction data to the typed columnar datasets.
+    All constructions are appended at once as new versions, earlier versions of an ID are kept (history).
+
+    :param constructions_group: HDF5 group for constructions
+    :param data: construction data (preprocessed columns)
+    :return:
+    """
+    # only the last entry of an ID within the new data is relevant
+    data = data.drop_duplicates(subset='properties.id', keep='last')
+    construction_ids = data['properties.id'].astype('int64').to_numpy()
+
+    # encode columns
+    columns = {'id': construction_ids,
+               'timestamp': encode_dates(data['properties.tstore']),
+               'valid_from': encode_dates(data['properties.validity.from']),
+               'valid_to': encode_dates(data['properties.validity.to']),
+               'subtype': encode_categories(constructions_group['subtype'], data['properties.subtype']),
+               'severity': encode_categories(constructions_group['severity'], data['properties.severity']),
+               'direction': encode_categories(constructions_group['direction'], data['properties.direction']),
+               'geo_type': encode_categories(constructions_group['geo_type'], data['geometry.type'])}
+
+    part_counts, parts, coordinates = encode_geometries(data['geometry.type'], data['geometry.coordinates'],
+                                                        data['geometry.geometries'], constructions_group['geo_type'])
+
+    # representative location and bounding box of every geometry
+    categories = [category.decode('utf-8') for category in constructions_group['geo_type'].attrs['categories']]
+    point_code = categories.index('Point') if 'Point' in categories else None
+    columns['lat'], columns['lng'], columns['bbox'] = geometry_locations(part_counts, parts, coordinates, point_code)
+
+    # geometries are appended, rows refer to their first part
+    parts_dataset = constructions_group['parts']
+    coordinates_dataset = constructions_group['coordinates']
+
+    parts[:, 3] += coordinates_dataset.shape[0]
+    first_parts = parts_dataset.shape[0] + np.concatenate([[0], np.cumsum(part_counts)[:-1]])
+    columns['geometry'] = np.column_stack([first_parts, part_counts])
+
+    for dataset, rows in [(parts_dataset, parts), (coordinates_dataset, coordinates)]:
+        dataset.resize((dataset.shape[0] + rows.shape[0], dataset.shape[1]))
+        dataset[dataset.shape[0] - rows.shape[0]:] = rows
+
+    # look up IDs in the sorted index
+    index_dataset = read_construction_index(constructions_group.file)
+    index = index_dataset[:]
+
+    positions = np.searchsorted(index[:, 0], construction_ids)
+    existing = positions < len(index)
+    existing[existing] = index[positions[existing], 0] == construction_ids[existing]
+
+    # every construction is appended as new version referring to its previous version (-1: first version)
+    number_of_rows = constructions_group['id'].shape[0]
+    new_rows = np.arange(number_of_rows, number_of_rows + len(construction_ids))
+
+    columns['previous'] = np.full(len(construction_ids), -1, dtype='int64')
+    columns['previous'][existing] = index[positions[existing], 1]
+
+    for name, values in columns.items():
+        dataset = constructions_group[name]
+        dataset.resize((number_of_rows + len(values),) + dataset.shape[1:])
+        dataset[number_of_rows:] = values
+
+    # index refers to the current version, new IDs are added and the index is kept sorted
+    interval_index = read_interval_index(constructions_group)
+    superseded_rows = index[positions[existing], 1]
+
+    index[positions[existing], 1] = new_rows[existing]
+    index = np.concatenate([index, np.column_stack([construction_ids[~existing], new_rows[~existing]])])
+    index = index[np.argsort(index[:, 0], kind='stable')]
+    index_dataset.resize(index.shape)
+    index_dataset[:] = index
+
+    update_interval_index(interval_index, superseded_rows, new_rows, columns['valid_from'], columns['valid_to'])
+
+    # active constructions in the feature table change from the start of validity of the old and new versions on
+    valid_from = np.concatenate([read_rows(constructions_group['valid_from'], superseded_rows), columns['valid_from']])
+    mark_features_dirty(constructions_group.file, -np.inf if (valid_from == MISSING_DATE).any() else valid_from.min())
+    mark_neighborhoods_outdated(constructions_group.file)
+    bump_data_version(constructions_group.file, 'constructions')
+
+    # update statistics (number of constructions and range of their timestamps)
+    timestamp_dataset = constructions_group['timestamp']
+    timestamps = columns['timestamp'][columns['timestamp'] != MISSING_DATE]
+
+    timestamp_dataset.attrs['count'] = timestamp_dataset.shape[0]
+    timestamp_dataset.attrs['first_timestamp'] = np.fmin(timestamp_dataset.attrs.get('first_timestamp', np.nan),
+                                                         timestamps.min(initial=np.iinfo('int64').max))
+    timestamp_dataset.attrs['last_timestamp'] = np.fmax(timestamp_dataset.attrs.get('last_timestamp', np.nan),
+                                                        timestamps.max(initial=MISSING_DATE))
+
+
+def add_construction_data(path_h5, data):
+    """
+    Adds construction data to HDF5 File.
+    Constructions are appended as new versions, earlier versions of an ID are kept.
+
+    :param path_h5: path to HDF5 File
+    :param data: construction data
+    :return:
+    """
     hdf5_file_path = Path(path_h5)
 
     if hdf5_file_path.exists():
-        # determine dataset path
-        dataset_path = '/constructions/construction_data'
-
         with h5py.File(hdf5_file_path, 'a') as hdf5_file:
-            if dataset_path in hdf5_file:
-                # read existing data
-                dataset = hdf5_file[dataset_path]
+            if 'constructions' in hdf5_file:
+                # HDF5 Files with the former string matrix are converted once
+                if 'id' not in hdf5_file['constructions']:
+                    migrate_construction_data(hdf5_file)
+
+                # HDF5 Files with typed datasets but before version history start with first versions
+                if 'previous' not in hdf5_file['constructions']:
+                    number_of_rows = hdf5_file['constructions/id'].shape[0]
+                    hdf5_file['constructions'].create_dataset('previous', data=np.full(number_of_rows, -1),
+                                                              maxshape=(None,), dtype='int64')
 
-                # read column names from attributes
-                columns = [column.decode('utf-8') for column in dataset.attrs['columns']]
-
-                # create dataframe from existing dataset data
-                existing_data = pd.DataFrame(dataset[:], columns=columns)
-                existing_data = existing_data.applymap(reconvert_cells)
-
-                for index, row in data.iterrows():
-                    construction_id = str(row['properties.id'])
-
-                    # conversion of the line into a numpy array
-                    string_row = row.apply(convert_row_to_string)
-                    string_array = np.array(string_row.tolist(), dtype=h5py.string_dtype())
-
-                    if existing_data.empty:
-                        # if there's no data only expand dataset and add data
-                        dataset.resize((dataset.shape[0] + 1,) + dataset.shape[1:])
-                        dataset[-1] = string_array
-                    else:
-                        # check for existing ID and save index if ID exists
-                        existing_row_index = existing_data.index[existing_data['ID'] == construction_id].tolist()
-
-                        # if there's data check for IDs already existing
-                        if existing_row_index:
-                            # if ID is already in dataset: overwrite data
-                            dataset[existing_row_index[0]] = string_array
-                        else:
-                            # if ID is not in dataset: write new data
-                            dataset.resize((dataset.shape[0] + 1,) + dataset.shape[1:])
-                            dataset[-1] = string_array
+                # HDF5 Files before locations were stored on write
+                if 'lat' not in hdf5_file['constructions']:
+                    add_geometry_locations(hdf5_file['constructions'])
+
+                write_construction_rows(hdf5_file['constructions'], data)
 
                 return True
 
@@ -203,14 +1117,15 @@ def add_construction_data(path_h5, data):
         raise FileNotFoundError
 
 
-def add_traffic_data(path_h5, sensor_name, timestamp, result):
+def add_traffic_data(path_h5, sensor_name, timestamp, result, overwrite=False):
     """
-    Adds traffic data to HDF5 File
+    Adds traffic data to HDF5 File (already existing timestamps are skipped)
 
     :param path_h5: path to HDF5 File
     :param sensor_name: sensor name/code
     :param timestamp: timestamp
     :param result: result / value
+    :param overwrite: overwrite value of an existing timestamp
     :return:
     """
     hdf5_file_path = Path(path_h5)
@@ -223,11 +1138,8 @@ def add_traffic_data(path_h5, sensor_name, timestamp, result):
             if dataset_path in hdf5_file:
                 dataset = hdf5_file[dataset_path]
 
-                # expanding the existing dataset
-                dataset.resize((dataset.shape[0] + 1, 2))
-
-                # add data
-                dataset[-1] = [timestamp, result]
+                # expanding the existing dataset and add data
+                merge_rows(dataset, [timestamp, result], overwrite)
             else:
                 print('Dataset not found')
     else:
@@ -1,132 +1,512 @@
 from pathlib import Path
 import h5py
 import pandas as pd
+import numpy as np
 import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
+from utils.crawl_setup import MISSING_DATE, ROLLUP_LEVELS
+from utils.quantile_sketch import sketch_quantiles, sketch_exceedances
 
-def read_air_quality_stations(path_h5, subject):
+
+def read_dataset_slices(path, dataset_paths, start=None, end=None):
     """
-    Reads existing metadata for air quality stations from HDF5 File
+    Reads several datasets within a time range with an own handle of the HDF5 File
+    (used by worker processes of the parallel loaders)
 
-    :param path_h5: path to HDF5 File
-    :param subject: subject (= air quality)
-    :return: dataframe with air quality stations
+    :param path: path to HDF5 File
+    :param dataset_paths: paths of the datasets within the HDF5 File
+    :param start: first date to be read (optional)
+    :param end: last date to be read (optional)
+    :return: list with the data of every dataset
     """
-    file = Path(path_h5)
-    h5_group = subject
+    with h5py.File(path, 'r') as hdf5_file:
+        return [hdf5_file[dataset_path][timestamp_slice(hdf5_file[dataset_path], start, end)]
+                for dataset_path in dataset_paths]
 
-    if file.exists():
-        stations_info = {}
 
-        with h5py.File(file, 'r') as hdf5_file:
-            air_quality_group = hdf5_file[h5_group]
+def sensor_coordinates(data_sensors):
+    """
+    Determines latitude and longitude of traffic sensors
 
-            # passing through all stations in the 'air_quality' group
-            for station_code in air_quality_group:
-                # access to the subgroup of the respective station
-                station_group = air_quality_group[station_code]
+    :param data_sensors: traffic sensor dataframe (from read_traffic_sensors)
+    :return: dataframe with columns lat and lng (index: sensor name)
+    """
+    # !!! BE AWARE OF THE FOLLOWING COMMENTS
 
-                # collect attributes
-                attributes = {attr: station_group.attrs[attr] for attr in station_group.attrs}
+    # THIS (SWAPPED) FALSE ASSIGNMENT IS JUST DUE TO A MISTAKE
+    lat = data_sensors['location_longitude']
+    lng = data_sensors['location_latitude']
 
-                # adding the collected attributes to the dictionary
-                stations_info[station_code] = attributes
+    # CHANGE IT TO THAT IF YOU RE-INITIALIZE EVERYTHING!
+    # lat = data_sensors['location_latitude']
+    # lng = data_sensors['location_longitude']
 
-        # convert dictionary to dataframe
-        df = pd.DataFrame.from_dict(stations_info, orient='index')
+    return pd.DataFrame({'lat': lat.astype('float64'), 'lng': lng.astype('float64')}, index=data_sensors.index)
 
-        # use code as index
-        df.index.name = 'code'
 
-        return df
+def to_unix_timestamp(date):
+    """
+    Converts a date to a Unix timestamp as stored in the HDF5 File.
+    Dates without timezone are interpreted as UTC like the dates returned by the read functions.
 
-    else:
-        raise FileNotFoundError
+    :param date: date (string, datetime or pandas Timestamp)
+    :return: Unix timestamp in seconds
+    """
+    timestamp = pd.Timestamp(date)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert('UTC').tz_localize(None)
 
+    return (timestamp - pd.Timestamp(0)).total_seconds()
 
-def read_air_quality_data(path):
+
+def timestamp_slice(dataset, start=None, end=None):
     """
-    Reads air quality data from HDF5 File
+    Determines the rows of a dataset within a time range by binary search on its sorted Timestamp column
+    (first column). Only single values are read from the dataset, so the costs only grow logarithmically.
 
-    :param path: path to HDF5 File
-    :return: dataframe with data from all air quality stations
+    :param dataset: HDF5 dataset with timestamps in the first column
+    :param start: first date to be included (None: from the beginning)
+    :param end: last date to be included (None: until the end)
+    :return: slice of matching rows
     """
-    file = Path(path)
-    if file.exists():
-        with h5py.File(file, 'r') as hdf5_file:
-            air_quality = hdf5_file['air_quality']
+    low = 0 if start is None else search_sorted(dataset, to_unix_timestamp(start))
+    high = dataset.shape[0] if end is None else search_sorted(dataset, to_unix_timestamp(end), right=True)
 
-            # list for storing the data
-            all_data = []
+    return slice(low, max(low, high))
 
-            for group_name, subgroup in air_quality.items():
-                for component, dataset in subgroup.items():
-                    # read data from dataset
-                    data = dataset[:]
 
-                    # Create a temporary dataframe for the current dataset
-                    df_station = pd.DataFrame(data, columns=['Timestamp', component])
-                    df_station['Timestamp'] = pd.to_datetime(df_station['Timestamp'], unit='s')
-                    df_station.set_index('Timestamp', inplace=True)
+def search_sorted(dataset, value, right=False):
+    """
+    Finds the position of a value in the sorted first column of a dataset by binary search (like np.searchsorted),
+    only single values are read from the dataset
 
-                    # adding the column MultiIndex structure (station, component)
-                    df_station.columns = pd.MultiIndex.from_tuples([(group_name, component)])
+    :param dataset: HDF5 dataset sorted by its first column
+    :param value: value to be found, compared in the dtype of the dataset (e.g. timestamps stored as float32)
+    :param right: position after equal values instead of before
+    :return: position
+    """
+    value = dataset.dtype.type(value)
+    low, high = 0, dataset.shape[0]
 
-                    # add data to list
-                    all_data.append(df_station)
+    while low < high:
+        middle = (low + high) // 2
+        middle_value = dataset[middle, 0]
+        if middle_value < value or (right and middle_value == value):
+            low = middle + 1
+        else:
+            high = middle
 
-            # concat dataframe to existing and drop "empty" data
-            df = pd.concat(all_data, axis=1)
-            df = df.dropna(axis=1, how='all')
+    return low
 
-            return df
-    else:
-        raise FileNotFoundError
 
+def read_rows(dataset, rows):
+    """
+    Reads single rows of a dataset (e.g. the rows of a few constructions) without reading the whole dataset
 
-def read_air_quality_station_data(path, station):
+    :param dataset: HDF5 dataset
+    :param rows: unique row numbers in any order
+    :return: array with the values of the rows (order of rows)
     """
-    Reads specific station data from HDF5 File
+    rows = np.asarray(rows, dtype='int64')
 
-    :param path: path to HDF5 File
-    :param station: station to be read
-    :return: address and coordinates
+    if len(rows) == 0:
+        return np.empty((0,) + dataset.shape[1:], dtype=dataset.dtype)
+
+    # h5py reads rows in increasing order only
+    order = np.argsort(rows)
+    values = np.empty((len(rows),) + dataset.shape[1:], dtype=dataset.dtype)
+    values[order] = dataset[rows[order]]
+
+    return values
+
+
+def validity_ends(valid_from, valid_to):
     """
-    file = Path(path)
-    if file.exists():
-        with h5py.File(file, 'r') as hdf5_file:
-            station_group = hdf5_file['air_quality'][station]
+    Determines the end of validity of constructions as used by the interval index: missing ends are open-ended
+    (sorted last) and an end before the start is treated as end at the start
 
-            address = station_group.attrs['address']
-            lat = station_group.attrs['lat']
-            lng = station_group.attrs['lng']
+    :param valid_from: start of validity (Unix timestamps)
+    :param valid_to: end of validity (Unix timestamps, MISSING_DATE: missing)
+    :return: array of ends (Unix timestamps)
+    """
+    return np.maximum(np.where(valid_to == MISSING_DATE, np.iinfo('int64').max, valid_to), valid_from)
 
-            return address, float(lat), float(lng)
-    else:
-        raise FileNotFoundError
 
+def dataset_statistics(dataset):
+    """
+    Returns the statistics of a dataset maintained on write (see hdf5_file_input.update_dataset_statistics).
+    Datasets written before statistics were introduced are evaluated once from their data instead.
 
-def read_traffic_sensors(path, subject):
+    :param dataset: HDF5 dataset
+    :return: dictionary with count, first/last timestamp and a dataframe with the statistics per value column
     """
-    Read available sensors from HDF5 File
+    if dataset.dtype.kind == 'O' or dataset.ndim == 1:
+        # constructions only keep number of rows and range of their timestamps
+        return {'count': dataset.shape[0],
+                'first_timestamp': pd.to_datetime(dataset.attrs.get('first_timestamp', np.nan), unit='s'),
+                'last_timestamp': pd.to_datetime(dataset.attrs.get('last_timestamp', np.nan), unit='s'),
+                'values': pd.DataFrame()}
+
+    columns = [column.decode('utf-8') for column in dataset.attrs['columns']]
+
+    if 'value_count' in dataset.attrs:
+        count = int(dataset.attrs['count'])
+        first_timestamp = float(dataset.attrs['first_timestamp'])
+        last_timestamp = float(dataset.attrs['last_timestamp'])
+        df = pd.DataFrame({'count': dataset.attrs['value_count'],
+                           'min': dataset.attrs['value_min'],
+                           'max': dataset.attrs['value_max'],
+                           'mean': dataset.attrs['value_mean'],
+                           'm2': dataset.attrs['value_m2']}, index=columns[1:])
+    else:
+        # fallback: evaluate the data (read-only access, so the result can't be persisted)
+        data = dataset[:].astype('float64').reshape(-1, len(columns))
+        values = data[:, 1:]
+        valid = ~np.isnan(values)
+        value_count = valid.sum(axis=0)
+
+        count = data.shape[0]
+        first_timestamp = np.nanmin(data[:, 0], initial=np.inf)
+        last_timestamp = np.nanmax(data[:, 0], initial=-np.inf)
+        mean = np.divide(np.where(valid, values, 0).sum(axis=0), value_count,
+                         out=np.zeros(values.shape[1]), where=value_count > 0)
+        df = pd.DataFrame({'count': value_count,
+                           'min': np.where(valid, values, np.inf).min(axis=0, initial=np.inf),
+                           'max': np.where(valid, values, -np.inf).max(axis=0, initial=-np.inf),
+                           'mean': mean,
+                           'm2': (np.where(valid, values - mean, 0) ** 2).sum(axis=0)}, index=columns[1:])
+
+    # sample variance from the sum of squared deviations, empty columns get NaN instead of infinite values
+    df['variance'] = df['m2'] / (df['count'] - 1).where(df['count'] > 1)
+    df = df.drop(columns='m2')
+    df.loc[df['count'] == 0, ['min', 'max', 'mean']] = np.nan
+
+    if count == 0:
+        first_timestamp = last_timestamp = np.nan
+
+    # timestamps are returned as dates, other ordering columns (e.g. Year) as they are
+    if columns[0] == 'Timestamp':
+        first_timestamp = pd.to_datetime(first_timestamp, unit='s')
+        last_timestamp = pd.to_datetime(last_timestamp, unit='s')
+
+    return {'count': count, 'first_timestamp': first_timestamp, 'last_timestamp': last_timestamp, 'values': df}
+
+
+def decode_dates(values):
+    """
+    Decodes Unix timestamps (int64) to dates, MISSING_DATE to NaT
 
-    :param path: path to HDF5 File
-    :param subject: subject (traffic)
-    :return:
+    :param values: Unix timestamps
+    :return: dates
+    """
+    return pd.to_datetime(np.where(values == MISSING_DATE, np.nan, values), unit='s')
+
+
+def decode_geometries(geo_types, geometry, parts, coordinates, type_categories):
+    """
+    Reassembles GeoJSON coordinates and geometry collection members from geometry parts and coordinate array
+
+    :param geo_types: geometry type per construction
+    :param geometry: first part and number of parts per construction
+    :param parts: geometry parts (member, polygon, type, first coordinate, coordinates)
+    :param coordinates: coordinate array
+    :param type_categories: categories of geometry types
+    :return: lists of coordinates and geometries (NaN where not applicable)
+    """
+    def assemble(geo_type, sequences):
+        # nesting of the coordinate sequences depending on the geometry type
+        if geo_type == 'Point':
+            return sequences[0][1][0]
+        elif geo_type in ['LineString', 'MultiPoint']:
+            return sequences[0][1]
+        elif geo_type in ['Polygon', 'MultiLineString']:
+            return [sequence for polygon, sequence in sequences]
+        else:
+            polygons = {}
+            for polygon, sequence in sequences:
+                polygons.setdefault(polygon, []).append(sequence)
+            return list(polygons.values())
+
+    list_coordinates = []
+    list_geometries = []
+
+    for geo_type, (first_part, number_of_parts) in zip(geo_types, geometry):
+        members = {}
+        for member, polygon, type_code, first_coordinate, number_of_coordinates in \
+                parts[first_part:first_part + number_of_parts]:
+            sequence = coordinates[first_coordinate:first_coordinate + number_of_coordinates].tolist()
+            members.setdefault(member, (type_categories[type_code], []))[1].append((polygon, sequence))
+
+        geometries = [{'type': member_type, 'coordinates': assemble(member_type, sequences)}
+                      for member_type, sequences in members.values()]
+
+        if geo_type == 'GeometryCollection':
+            list_coordinates.append(np.nan)
+            list_geometries.append(geometries)
+        else:
+            list_coordinates.append(geometries[0]['coordinates'] if geometries else np.nan)
+            list_geometries.append(np.nan)
+
+    return list_coordinates, list_geometries
+
+
+class HDF5Store:
+    """
+    Keeps one read handle of the HDF5 File open and provides the read operations of this module as methods.
+    Dataset handles, column names and metadata (stations, sensors) are cached, so repeated reads don't pay for
+    opening the file and parsing metadata again.
     """
-    file = Path(path)
-    h5_group = subject
+    def __init__(self, path, chunk_cache_size=64 * 1024 ** 2, chunk_cache_slots=10007):
+        """
+        Opens the HDF5 File for reading
+
+        :param path: path to HDF5 File
+        :param chunk_cache_size: size of the chunk cache in bytes
+        :param chunk_cache_slots: number of slots of the chunk cache (preferably a prime number)
+        """
+        self.path = Path(path)
+
+        if not self.path.exists():
+            raise FileNotFoundError
+
+        self.file = h5py.File(self.path, 'r', rdcc_nbytes=chunk_cache_size, rdcc_nslots=chunk_cache_slots)
 
-    if file.exists():
-        sensor_info_list = []
+        # caches for dataset handles and decoded metadata
+        self._datasets = {}
+        self._columns = {}
+        self._stations = {}
+        self._sensors = {}
+        self._categories = {}
 
-        with h5py.File(file, 'r') as hdf5_file:
-            traffic_group = hdf5_file[h5_group]
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Closes the read handle of the HDF5 File
+
+        :return:
+        """
+        self.file.close()
+
+    def data_version(self, subject=None):
+        """
+        Returns the data version of the HDF5 File (incremented by every change of the data)
+
+        :param subject: return the version of the last change of this subject / group instead (optional)
+        :return: data version
+        """
+        if subject is None:
+            return int(self.file.attrs.get('data_version', 0))
+
+        return int(self.file[subject].attrs.get('data_version', 0)) if subject in self.file else 0
+
+    def rewritten_version(self, subject):
+        """
+        Returns the data version of the last change of a subject which didn't only append rows
+        (e.g. a backfill), data read before can't be completed by reading the new rows only
+
+        :param subject: subject / group (air_quality, traffic, weather)
+        :return: data version
+        """
+        return int(self.file[subject].attrs.get('rewritten_version', 0)) if subject in self.file else 0
+
+    def rewritten_since(self, subject, version):
+        """
+        Returns the earliest timestamp of the rows of a subject which were changed without being appended
+        (e.g. backfills or overwritten values) after a data version, see hdf5_file_input.record_rewrite
+
+        :param subject: subject / group (air_quality, traffic, weather)
+        :param version: data version (e.g. of the last read)
+        :return: earliest changed Unix timestamp, None if rows were only appended or -inf if the rewrites since
+                 the version aren't known anymore
+        """
+        if subject not in self.file:
+            return None
+
+        attributes = self.file[subject].attrs
+
+        if int(attributes.get('rewritten_version', 0)) <= version:
+            return None
+
+        # rewrites before the journal or removed from it
+        if 'rewrites' not in attributes or version < int(attributes.get('rewrites_complete_after', 0)):
+            return -np.inf
+
+        rewrites = attributes['rewrites'].reshape(-1, 2)
+        rewrites = rewrites[rewrites[:, 0] > version]
+
+        return float(rewrites[:, 1].min()) if len(rewrites) > 0 else None
+
+    def dataset_lengths(self, subject):
+        """
+        Returns the number of rows of all time series datasets of a subject (without reading data)
+
+        :param subject: subject / group (air_quality, traffic, weather)
+        :return: dictionary with number of rows by dataset path
+        """
+        lengths = {}
+
+        def collect_length(name, item):
+            if isinstance(item, h5py.Dataset) and 'columns' in item.attrs:
+                lengths[f'{subject}/{name}'] = item.shape[0]
+
+        if subject in self.file:
+            self.file[subject].visititems(collect_length)
+
+        return lengths
+
+    def dataset(self, dataset_path):
+        """
+        Returns the (cached) handle of a dataset
+
+        :param dataset_path: path of the dataset within the HDF5 File
+        :return: HDF5 dataset
+        """
+        if dataset_path not in self._datasets:
+            self._datasets[dataset_path] = self.file[dataset_path]
+
+        return self._datasets[dataset_path]
+
+    def columns(self, dataset_path):
+        """
+        Returns the (cached) column names of a dataset
+
+        :param dataset_path: path of the dataset within the HDF5 File
+        :return: list of column names
+        """
+        if dataset_path not in self._columns:
+            self._columns[dataset_path] = [column.decode('utf-8')
+                                           for column in self.dataset(dataset_path).attrs['columns']]
+
+        return self._columns[dataset_path]
+
+    def read_air_quality_stations(self, subject='air_quality'):
+        """
+        Reads existing metadata for air quality stations
+
+        :param subject: subject (= air quality)
+        :return: dataframe with air quality stations
+        """
+        if subject not in self._stations:
+            stations_info = {}
+
+            air_quality_group = self.file[subject]
+
+            # passing through all stations in the 'air_quality' group
+            for station_code in air_quality_group:
+                # access to the subgroup of the respective station
+                station_group = air_quality_group[station_code]
+
+                # collect attributes
+                attributes = {attr: station_group.attrs[attr] for attr in station_group.attrs}
+
+                # adding the collected attributes to the dictionary
+                stations_info[station_code] = attributes
+
+            # convert dictionary to dataframe
+            df = pd.DataFrame.from_dict(stations_info, orient='index')
+
+            # use code as index
+            df.index.name = 'code'
+
+            self._stations[subject] = df
+
+        return self._stations[subject].copy()
+
+    def read_air_quality_data(self, start=None, end=None, stations=None, components=None, workers=1, rows=None):
+        """
+        Reads air quality data. The datasets are read first (optionally in parallel by worker processes with
+        their own file handles) and the wide dataframe is filled from the union of all timestamps at once.
+
+        :param start: first date to be read (optional)
+        :param end: last date to be read (optional)
+        :param stations: read only the given stations (optional)
+        :param components: read only the given components (optional)
+        :param workers: number of worker processes (only used where processes can be forked)
+        :param rows: slices of rows to be read by dataset path instead of the time range, e.g. the rows appended
+                     since the last read (optional, other datasets are left out)
+        :return: dataframe with data from all air quality stations
+        """
+        air_quality = self.file['air_quality']
+
+        # determine datasets (station, component) to be read
+        columns = [(station, component) for station, subgroup in air_quality.items() for component in subgroup
+                   if (stations is None or station in stations) and (components is None or component in components)]
+        dataset_paths = [f'air_quality/{station}/{component}' for station, component in columns]
+
+        # read data within time range (or the given rows) from all datasets
+        if rows is not None:
+            all_data = [self.dataset(dataset_path)[rows.get(dataset_path, slice(0, 0))]
+                        for dataset_path in dataset_paths]
+        elif workers > 1 and len(dataset_paths) > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            chunks = [list(chunk) for chunk in np.array_split(dataset_paths, min(workers, len(dataset_paths)))]
+            with ProcessPoolExecutor(max_workers=len(chunks),
+                                     mp_context=multiprocessing.get_context('fork')) as executor:
+                results = executor.map(read_dataset_slices, [self.path] * len(chunks), chunks,
+                                       [start] * len(chunks), [end] * len(chunks))
+                all_data = [data for result in results for data in result]
+        else:
+            all_data = []
+            for dataset_path in dataset_paths:
+                dataset = self.dataset(dataset_path)
+                all_data.append(dataset[timestamp_slice(dataset, start, end)])
+
+        # leave out "empty" datasets
+        columns = [column for column, data in zip(columns, all_data) if data.shape[0] > 0]
+        all_data = [data for data in all_data if data.shape[0] > 0]
+
+        # union of all timestamps as index and one allocation for all values
+        timestamps = np.unique(np.concatenate([data[:, 0] for data in all_data])) if all_data else \
+            np.empty(0, dtype='float32')
+        values = np.full((len(timestamps), len(columns)), np.nan, dtype='float32')
+
+        for position, data in enumerate(all_data):
+            values[np.searchsorted(timestamps, data[:, 0]), position] = data[:, 1]
+
+        index = pd.DatetimeIndex(pd.to_datetime(timestamps, unit='s'), name='Timestamp')
+        df = pd.DataFrame(values, index=index, columns=pd.MultiIndex.from_arrays([[station for station, _ in columns],
+                                                                  [component for _, component in columns]]))
+
+        # drop "empty" data (columns without any value within the time range)
+        return df.dropna(axis=1, how='all')
+
+    def read_air_quality_station_data(self, station):
+        """
+        Reads specific station data
+
+        :param station: station to be read
+        :return: address and coordinates
+        """
+        df_stations = self._stations.get('air_quality')
+        if df_stations is None:
+            df_stations = self.read_air_quality_stations('air_quality')
+
+        station_info = df_stations.loc[station]
+
+        return station_info['address'], float(station_info['lat']), float(station_info['lng'])
+
+    def read_traffic_sensors(self, subject='traffic'):
+        """
+        Read available sensors
+
+        :param subject: subject (traffic)
+        :return: dataframe with traffic sensors
+        """
+        if subject not in self._sensors:
+            sensor_info_list = []
+
+            traffic_group = self.file[subject]
 
             # running through all sensors in the group
             for sensor_name in traffic_group:
                 # access to the dataset of the respective sensor
-                sensor_dataset = traffic_group[sensor_name]
+                sensor_dataset = self.dataset(f'{subject}/{sensor_name}')
 
                 # check whether the 'sensor_information' attribute exists
                 if 'sensor_information' in sensor_dataset.attrs:
@@ -140,135 +520,700 @@ def read_traffic_sensors(path, subject):
                     # add the extracted information to the list
                     sensor_info_list.append(sensor_info)
 
-        # convert list to dataframe
-        df = pd.DataFrame(sensor_info_list)
+            # convert list to dataframe
+            df = pd.DataFrame(sensor_info_list)
+
+            # set name as index
+            df.set_index('name', inplace=True)
+
+            self._sensors[subject] = df
+
+        return self._sensors[subject].copy()
+
+    def read_traffic_data(self, start=None, end=None, sensors=None, rows=None):
+        """
+        Reads traffic data. The arrays of all sensors are read first and combined once, the index is built
+        from a categorical name column and one conversion of all timestamps.
+
+        :param start: first date to be read (optional)
+        :param end: last date to be read (optional)
+        :param sensors: read only the given sensors (optional)
+        :param rows: slices of rows to be read by dataset path instead of the time range, e.g. the rows appended
+                     since the last read (optional, other sensors are left out)
+        :return: dataframe with traffic data
+        """
+        h5_group = 'traffic'
+
+        sensor_names = list(self.file[h5_group]) if sensors is None else \
+            [sensor_name for sensor_name in sensors if sensor_name in self.file[h5_group]]
 
-        # set name as index
-        df.set_index('name', inplace=True)
+        # read data of all sensors within time range (sensors without data are left out)
+        names, arrays = [], []
+        for sensor_name in sensor_names:
+            sensor_dataset = self.dataset(f'{h5_group}/{sensor_name}')
+            data = sensor_dataset[timestamp_slice(sensor_dataset, start, end) if rows is None else
+                                  rows.get(f'{h5_group}/{sensor_name}', slice(0, 0))]
+
+            if data.shape[0] > 0:
+                names.append(sensor_name)
+                arrays.append(data)
+
+        data = np.concatenate(arrays) if arrays else np.empty((0, 2), dtype='float32')
+        lengths = [array.shape[0] for array in arrays]
+
+        # name as categorical column (one code per row) and conversion of all timestamps at once
+        name = pd.Categorical.from_codes(np.repeat(np.arange(len(names)), lengths), categories=names)
+        timestamp = pd.to_datetime(data[:, 0], unit='s')
+
+        index = pd.MultiIndex.from_arrays([name, timestamp], names=['name', 'Timestamp'])
+
+        return pd.DataFrame({'Traffic': data[:, 1]}, index=index)
+
+    def read_weather_data(self, start=None, end=None, rows=None):
+        """
+        Reads weather data
+
+        :param start: first date to be read (optional)
+        :param end: last date to be read (optional)
+        :param rows: slices of rows to be read by dataset path instead of the time range (optional)
+        :return: dataframe with weather data
+        """
+        # determine dataset path
+        dataset_path = 'weather/weather_data'
+
+        if dataset_path in self.file:
+            # read data within time range from dataset
+            dataset = self.dataset(dataset_path)
+            data = dataset[timestamp_slice(dataset, start, end) if rows is None else
+                           rows.get(dataset_path, slice(0, 0))]
+
+            # create dataframe from data
+            df = pd.DataFrame(data, columns=self.columns(dataset_path))
+
+            # conversion of the timestamp into a readable date and set it as index
+            df['Timestamp'] = pd.to_datetime(df['Timestamp'], unit='s')
+            df.set_index('Timestamp', inplace=True)
+
+            return df
+        else:
+            return pd.DataFrame()
+
+    def read_rollup_data(self, dataset_path, start=None, end=None, max_points=None, level=None):
+        """
+        Reads pre-aggregated data (rollups) of a time series dataset. Without a given level the finest level
+        whose number of periods within the time range doesn't exceed max_points is chosen (coarsest level otherwise).
+
+        :param dataset_path: path of the time series dataset (e.g. air_quality/010/no2_1h)
+        :param start: first date to be read (optional)
+        :param end: last date to be read (optional)
+        :param max_points: maximum number of periods to be read (optional)
+        :param level: level to be read (hourly, daily, weekly, monthly)
+        :return: dataframe with period start as index and columns (value column, statistic), level in attrs
+        """
+        rollup_path = f'rollups/{dataset_path.strip("/")}'
+
+        if rollup_path not in self.file:
+            return pd.DataFrame()
+
+        # choose level by number of periods within the time range
+        if level is None:
+            for level in ROLLUP_LEVELS:
+                rows = timestamp_slice(self.dataset(f'{rollup_path}/{level}'), start, end)
+                if max_points is None or rows.stop - rows.start <= max_points:
+                    break
+
+        dataset = self.dataset(f'{rollup_path}/{level}')
+        data = dataset[timestamp_slice(dataset, start, end)]
+
+        columns = pd.MultiIndex.from_tuples([tuple(column.rsplit(' ', 1))
+                                             for column in self.columns(f'{rollup_path}/{level}')[1:]])
+        df = pd.DataFrame(data[:, 1:], columns=columns,
+                          index=pd.DatetimeIndex(pd.to_datetime(data[:, 0], unit='s'), name='Timestamp'))
+        df.attrs['level'] = level
 
         return df
 
-    else:
-        raise FileNotFoundError
+    def read_sketch(self, station, component, start=None, end=None):
+        """
+        Merges the monthly quantile sketches of an air quality dataset within a range of months
+
+        :param station: code of the station
+        :param component: component
+        :param start: date within the first month (optional)
+        :param end: date within the last month (optional)
+        :return: number of values per bin
+        """
+        sketch_path = f'sketches/air_quality/{station}/{component}'
+
+        if sketch_path not in self.file:
+            return np.empty(0, dtype='int64')
+
+        # months are identified by their start
+        start = None if start is None else pd.Timestamp(start).to_period('M').start_time
+        end = None if end is None else pd.Timestamp(end).to_period('M').start_time
+
+        sketch_dataset = self.dataset(sketch_path)
+
+        return sketch_dataset[timestamp_slice(sketch_dataset, start, end)][:, 1:].sum(axis=0)
+
+    def read_quantiles(self, station, component, start=None, end=None, quantiles=(0.5, 0.95, 0.99)):
+        """
+        Determines quantiles of an air quality dataset within a range of months from the quantile sketches
+        (relative error of at most 1 %)
+
+        :param station: code of the station
+        :param component: component
+        :param start: date within the first month (optional)
+        :param end: date within the last month (optional)
+        :param quantiles: quantiles between 0 and 1
+        :return: series with value per quantile
+        """
+        counts = self.read_sketch(station, component, start, end)
+
+        return pd.Series(sketch_quantiles(counts, quantiles), index=list(quantiles), name=(station, component))
+
+    def read_exceedances(self, station, component, threshold, start=None, end=None):
+        """
+        Counts the values of an air quality dataset above a threshold within a range of months from the quantile
+        sketches (values within 1 % of the threshold may be misclassified)
+
+        :param station: code of the station
+        :param component: component
+        :param threshold: threshold (e.g. limit value)
+        :param start: date within the first month (optional)
+        :param end: date within the last month (optional)
+        :return: number of values above the threshold
+        """
+        counts = self.read_sketch(station, component, start, end)
+
+        return sketch_exceedances(counts, threshold) if len(counts) > 0 else 0
+
+    def read_feature_table(self, station, start=None, end=None):
+        """
+        Reads the hourly feature table of an air quality station (pollutants, traffic of nearby sensors, weather
+        and number of active nearby constructions)
+
+        :param station: code of the station
+        :param start: first date to be read (optional)
+        :param end: last date to be read (optional)
+        :return: dataframe with the hour as index
+        """
+        dataset_path = f'features/{station}'
+
+        if dataset_path not in self.file:
+            return pd.DataFrame()
+
+        dataset = self.dataset(dataset_path)
+        data = dataset[timestamp_slice(dataset, start, end)]
+
+        df = pd.DataFrame(data[:, 1:], columns=self.columns(dataset_path)[1:],
+                          index=pd.DatetimeIndex(pd.to_datetime(data[:, 0], unit='s'), name='Timestamp'))
+
+        return df
 
+    def read_neighborhood(self, station, radius=500):
+        """
+        Reads the precomputed neighborhood of an air quality station (see utils.neighborhoods): station data,
+        traffic sensors and current constructions within the radius
+
+        :param station: code of the station
+        :param radius: radius in meters (at most the largest radius of the neighborhood table)
+        :return: address and coordinates of the station, dataframe with sensors (index) and dataframe with
+                 constructions or None if the neighborhood isn't available
+        """
+        if f'neighborhoods/{station}' not in self.file or self.file['neighborhoods'].attrs.get('outdated', True) or \
+                radius > self.file['neighborhoods'].attrs['radius']:
+            return None
+
+        station_group = self.file[f'neighborhoods/{station}']
+
+        sensors = station_group['sensors'][:]
+        sensor_names = np.array(self.categories(f'neighborhoods/{station}/sensors'), dtype='object')
+        df_sensors = pd.DataFrame(sensors[:, 1:], columns=self.columns(f'neighborhoods/{station}/sensors')[1:],
+                                  index=pd.Index(sensor_names[sensors[:, 0].astype('int64')], name='Sensor'))
+
+        df_constructions = pd.DataFrame(station_group['constructions'][:],
+                                        columns=self.columns(f'neighborhoods/{station}/constructions'))
+        df_constructions['ID'] = df_constructions['ID'].astype('int64')
+
+        station_info = (station_group.attrs['address'], float(station_group.attrs['lat']),
+                        float(station_group.attrs['lng']))
+
+        return station_info, df_sensors[df_sensors['Distance'] <= radius], \
+            df_constructions[df_constructions['Distance'] <= radius].reset_index(drop=True)
+
+    def list_quality_reports(self):
+        """
+        Lists the crawl runs with a quality report (oldest first)
+
+        :return: list of run identifiers
+        """
+        if 'quality_reports' not in self.file:
+            return []
+
+        return sorted(self.file['quality_reports'])
+
+    def read_quality_report(self, run_id=None):
+        """
+        Reads the quality report of a crawl run (counts of missing and duplicated values, implausible values,
+        flatlines and spikes per series)
+
+        :param run_id: identifier of the crawl run (None: latest run)
+        :return: dataframe with the series as index
+        """
+        run_ids = self.list_quality_reports()
+
+        if run_id is None:
+            run_id = run_ids[-1] if len(run_ids) > 0 else None
+
+        if run_id not in run_ids:
+            return pd.DataFrame()
+
+        run_group = self.file[f'quality_reports/{run_id}']
+        series = [name.decode('utf-8') for name in run_group['series'][:]]
+
+        return pd.DataFrame(run_group['report'][:], columns=self.columns(f'quality_reports/{run_id}/report'),
+                            index=pd.Index(series, name='Series'))
+
+    def categories(self, dataset_path):
+        """
+        Returns the (cached) categories of a dataset with categorical codes
+
+        :param dataset_path: path of the dataset within the HDF5 File
+        :return: list of categories
+        """
+        if dataset_path not in self._categories:
+            self._categories[dataset_path] = [category.decode('utf-8')
+                                              for category in self.dataset(dataset_path).attrs['categories']]
+
+        return self._categories[dataset_path]
+
+    def read_construction_data(self, with_geometries=True, history=False, rows=None, with_bounding_boxes=False):
+        """
+        Reads construction data (current version of every construction by default)
+
+        :param with_geometries: reassemble GeoJSON coordinates and geometries (columns Coordinates and Geometries)
+        :param history: read all versions including the superseded ones (columns Row and Previous)
+        :param rows: read only the given rows (versions)
+        :param with_bounding_boxes: add bounding boxes of the geometries
+        :return: dataframe with constructions data (representative location as Latitude and Longitude)
+        """
+        if 'constructions' not in self.file:
+            return pd.DataFrame()
+
+        constructions_group = self.file['constructions']
+
+        if 'id' not in constructions_group:
+            # HDF5 Files with the former string matrix which hasn't been converted yet
+            return self._read_legacy_construction_data()
+
+        # select rows: given rows, all versions or the current versions from the index
+        if rows is None and not history:
+            rows = np.sort(self.dataset('constructions/construction_index')[:, 1])
+        elif rows is None:
+            rows = np.arange(self.dataset('constructions/id').shape[0])
+
+        def column(name):
+            return self.dataset(f'constructions/{name}')[:][rows]
+
+        def categorical(name):
+            return pd.Categorical.from_codes(column(name), categories=self.categories(f'constructions/{name}'))
+
+        df = pd.DataFrame({'ID': column('id'),
+                           'Timestamp': decode_dates(column('timestamp')),
+                           'Subtype': categorical('subtype'),
+                           'Severity': categorical('severity'),
+                           'Valid from': decode_dates(column('valid_from')),
+                           'Valid to': decode_dates(column('valid_to')),
+                           'Direction': categorical('direction'),
+                           'Geo type': categorical('geo_type'),
+                           'Latitude': column('lat'),
+                           'Longitude': column('lng')})
+
+        if with_bounding_boxes:
+            df[self.columns('constructions/bbox')] = column('bbox')
+
+        if with_geometries:
+            df['Coordinates'], df['Geometries'] = decode_geometries(df['Geo type'], column('geometry'),
+                                                                    self.dataset('constructions/parts')[:],
+                                                                    self.dataset('constructions/coordinates')[:],
+                                                                    self.categories('constructions/geo_type'))
+
+        if history:
+            df['Row'] = rows
+            df['Previous'] = column('previous') if 'previous' in constructions_group else -1
+
+        return df
+
+    def read_construction_history(self, construction_id, with_geometries=True):
+        """
+        Reads all versions of a construction by following the references to the previous versions
+
+        :param construction_id: ID of the construction
+        :param with_geometries: reassemble GeoJSON coordinates and geometries
+        :return: dataframe with all versions of the construction (oldest first)
+        """
+        index = self.dataset('constructions/construction_index')[:]
+        position = np.searchsorted(index[:, 0], construction_id)
+
+        if position == len(index) or index[position, 0] != construction_id:
+            return pd.DataFrame()
+
+        # walk back from the current version
+        previous_dataset = self.dataset('constructions/previous')
+        rows = [index[position, 1]]
+        while previous_dataset[rows[-1]] >= 0:
+            rows.append(previous_dataset[rows[-1]])
+
+        df = self.read_construction_data(with_geometries, history=True, rows=np.array(rows[::-1]))
+        df.insert(1, 'Version', np.arange(1, len(df) + 1))
+
+        return df
+
+    def query_active_constructions(self, start, end=None, with_geometries=False):
+        """
+        Reads the current constructions which are valid at a point in time or overlap a time window.
+        Both ends of the window are found by binary search in the interval index.
+
+        :param start: point in time or start of the window
+        :param end: end of the window (optional)
+        :param with_geometries: reassemble GeoJSON coordinates and geometries
+        :return: dataframe with constructions data
+        """
+        end = start if end is None else end
+
+        # started before end of window and not ended before start of window
+        valid_from_index = self.dataset('constructions/valid_from_index')
+        valid_to_index = self.dataset('constructions/valid_to_index')
+
+        started = timestamp_slice(valid_from_index, None, end)
+        not_ended = timestamp_slice(valid_to_index, start, None)
+
+        # rows of the smaller range of the index, only their other date is checked
+        if started.stop - started.start <= not_ended.stop - not_ended.start:
+            rows = np.sort(valid_from_index[started][:, 1])
+            valid_to = validity_ends(read_rows(self.dataset('constructions/valid_from'), rows),
+                                     read_rows(self.dataset('constructions/valid_to'), rows))
+            rows = rows[valid_to >= np.int64(to_unix_timestamp(start))]
+        else:
+            rows = np.sort(valid_to_index[not_ended][:, 1])
+            valid_from = read_rows(self.dataset('constructions/valid_from'), rows)
+            rows = rows[valid_from <= np.int64(to_unix_timestamp(end))]
+
+        return self.read_construction_data(with_geometries, rows=rows)
+
+    def count_active_constructions(self, dates, rows=None):
+        """
+        Counts the current constructions valid at each of the given points in time
+
+        :param dates: points in time
+        :param rows: count only the given rows (e.g. constructions nearby a station)
+        :return: array with the number of valid constructions per point in time
+        """
+        timestamps = np.array([to_unix_timestamp(date) for date in pd.DatetimeIndex(dates)])
+
+        valid_from = self.dataset('constructions/valid_from_index')[:]
+        valid_to = self.dataset('constructions/valid_to_index')[:]
+
+        if rows is not None:
+            valid_from = valid_from[np.isin(valid_from[:, 1], rows)]
+            valid_to = valid_to[np.isin(valid_to[:, 1], rows)]
+
+        # started until the point in time minus ended before
+        return (np.searchsorted(valid_from[:, 0], timestamps, side='right')
+                - np.searchsorted(valid_to[:, 0], timestamps, side='left'))
+
+    def _read_legacy_construction_data(self):
+        """
+        Reads construction data stored as string matrix (HDF5 Files before the typed datasets)
+
+        :return: dataframe with constructions data
+        """
+        def reconvert_cells(cell):
+            try:
+                return json.loads(cell)
+            except json.JSONDecodeError:
+                return cell.decode('utf-8')
+
+        dataset_path = 'constructions/construction_data'
+
+        if dataset_path in self.file:
+            # read data
+            data = self.dataset(dataset_path)[:]
+
+            # read column names from attributes
+            df = pd.DataFrame(data, columns=self.columns(dataset_path))
+
+            # applying the conversion function to each cell
+            df = df.applymap(reconvert_cells)
+
+            # representative location: coordinates of points or first member of geometry collections
+            coordinates = df.apply(lambda row: row['Coordinates'] if isinstance(row['Coordinates'], list)
+                                   else (row['Geometries'][0]['coordinates']
+                                         if isinstance(row['Geometries'], list) else [np.nan, np.nan]), axis=1)
+            df['Longitude'] = [location[0] for location in coordinates]
+            df['Latitude'] = [location[1] for location in coordinates]
+
+            return df
+        else:
+            return pd.DataFrame()
+
+    def read_car_registration_data(self):
+        """
+        Reads car registrations data
+
+        :return: dataframe with car registrations data
+        """
+        return self._read_table('car_registrations/car_registrations_data')
+
+    def read_new_car_registration_data(self):
+        """
+        Reads new car registrations data
+
+        :return: dataframe with new car registrations data
+        """
+        return self._read_table('new_car_registrations/new_car_registrations_data')
+
+    def _read_table(self, dataset_path):
+        """
+        Reads a complete dataset into a dataframe with the column names from its attributes
+
+        :param dataset_path: path of the dataset within the HDF5 File
+        :return: dataframe (empty if dataset doesn't exist)
+        """
+        if dataset_path in self.file:
+            # read data and create dataframe with column names from attributes
+            data = self.dataset(dataset_path)[:]
+            return pd.DataFrame(data, columns=self.columns(dataset_path))
+        else:
+            return pd.DataFrame()
+
+    def read_dataset_statistics(self, dataset_path):
+        """
+        Reads the statistics of a single dataset without reading its data
+
+        :param dataset_path: path of the dataset within the HDF5 File (e.g. 'air_quality/010/no2_1h')
+        :return: dictionary with count, first/last timestamp and a dataframe with the statistics per value column
+        """
+        return dataset_statistics(self.dataset(dataset_path))
+
+    def read_statistics_overview(self, subject):
+        """
+        Reads count and first/last timestamp of all datasets of a subject
+
+        :param subject: subject (air_quality, traffic, weather, ...)
+        :return: dataframe with one row per dataset
+        """
+        overview = {}
+
+        def collect_statistics(name, item):
+            if isinstance(item, h5py.Dataset) and 'columns' in item.attrs and item.dtype.kind in 'fiu':
+                statistics = dataset_statistics(item)
+                overview[f'{subject}/{name}'] = {'count': statistics['count'],
+                                                 'first_timestamp': statistics['first_timestamp'],
+                                                 'last_timestamp': statistics['last_timestamp']}
+
+        # passing through all datasets of the subject
+        self.file[subject].visititems(collect_statistics)
+
+        df = pd.DataFrame.from_dict(overview, orient='index')
+        df.index.name = 'dataset'
+
+        return df
 
-def read_traffic_data(path):
+
+def read_air_quality_stations(path_h5, subject):
     """
-    Reads traffic data from HDF5 file
+    Reads existing metadata for air quality stations from HDF5 File
 
-    :param path: path to HDF5 file
-    :return: dataframe with traffic data
+    :param path_h5: path to HDF5 File
+    :param subject: subject (= air quality)
+    :return: dataframe with air quality stations
     """
-    file = Path(path)
-    h5_group = 'traffic'
+    with HDF5Store(path_h5) as store:
+        return store.read_air_quality_stations(subject)
 
-    if file.exists():
-        df = pd.DataFrame(columns=['name', 'Timestamp', 'Traffic'])
 
-        with h5py.File(file, 'r') as hdf5_file:
-            traffic_group = hdf5_file[h5_group]
+def read_air_quality_data(path, start=None, end=None, stations=None, components=None, workers=1):
+    """
+    Reads air quality data from HDF5 File
 
-            # running through all sensors in the group
-            for sensor_name in traffic_group:
-                # access to the dataset of the respective sensor
-                sensor_dataset = traffic_group[sensor_name]
+    :param path: path to HDF5 File
+    :param start: first date to be read (optional)
+    :param end: last date to be read (optional)
+    :param stations: read only the given stations (optional)
+    :param components: read only the given components (optional)
+    :param workers: number of worker processes
+    :return: dataframe with data from all air quality stations
+    """
+    with HDF5Store(path) as store:
+        return store.read_air_quality_data(start, end, stations, components, workers)
 
-                # read column names from attributes
-                columns = [column.decode('utf-8') for column in sensor_dataset.attrs['columns']]
 
-                # read data
-                data = sensor_dataset[:]
+def read_air_quality_station_data(path, station):
+    """
+    Reads specific station data from HDF5 File
 
-                # assign data to temporary dataframe
-                df_temp = pd.DataFrame(data, columns=columns)
+    :param path: path to HDF5 File
+    :param station: station to be read
+    :return: address and coordinates
+    """
+    with HDF5Store(path) as store:
+        return store.read_air_quality_station_data(station)
 
-                # conversion of the timestamp into a readable date
-                df_temp['Timestamp'] = pd.to_datetime(df_temp['Timestamp'], unit='s')
 
-                # add name to dataframe
-                df_temp['name'] = sensor_name
+def read_traffic_sensors(path, subject):
+    """
+    Read available sensors from HDF5 File
 
-                # add the extracted information to the list
-                df = pd.concat([df, df_temp])
+    :param path: path to HDF5 File
+    :param subject: subject (traffic)
+    :return:
+    """
+    with HDF5Store(path) as store:
+        return store.read_traffic_sensors(subject)
 
-            df = df.set_index(['name', 'Timestamp'])
 
-        return df
+def read_traffic_data(path, start=None, end=None, sensors=None):
+    """
+    Reads traffic data from HDF5 file
 
-    else:
-        raise FileNotFoundError
+    :param path: path to HDF5 file
+    :param start: first date to be read (optional)
+    :param end: last date to be read (optional)
+    :param sensors: read only the given sensors (optional)
+    :return: dataframe with traffic data
+    """
+    with HDF5Store(path) as store:
+        return store.read_traffic_data(start, end, sensors)
 
 
-def read_weather_data(path):
+def read_weather_data(path, start=None, end=None):
     """
     Reads weather data from HDF5 File
 
     :param path: path to HDF5 file
+    :param start: first date to be read (optional)
+    :param end: last date to be read (optional)
     :return: dataframe with weather data
     """
-    file = Path(path)
-    if file.exists():
-        with h5py.File(file, 'r') as hdf5_file:
-            # determine dataset path
-            dataset_path = 'weather/weather_data'
+    with HDF5Store(path) as store:
+        return store.read_weather_data(start, end)
 
-            if dataset_path in hdf5_file:
-                # read data from dataset
-                dataset = hdf5_file[dataset_path]
-                data = dataset[:]
 
-                # read column names from attributes
-                columns = [column.decode('utf-8') for column in dataset.attrs['columns']]
+def read_rollup_data(path, dataset_path, start=None, end=None, max_points=None, level=None):
+    """
+    Reads pre-aggregated data (rollups) of a time series dataset from HDF5 File
 
-                # create dataframe from data
-                df = pd.DataFrame(data, columns=columns)
+    :param path: path to HDF5 File
+    :param dataset_path: path of the time series dataset (e.g. air_quality/010/no2_1h)
+    :param start: first date to be read (optional)
+    :param end: last date to be read (optional)
+    :param max_points: maximum number of periods to be read (optional)
+    :param level: level to be read (hourly, daily, weekly, monthly)
+    :return: dataframe with period start as index and columns (value column, statistic)
+    """
+    with HDF5Store(path) as store:
+        return store.read_rollup_data(dataset_path, start, end, max_points, level)
 
-                # conversion of the timestamp into a readable date and set it as index
-                df['Timestamp'] = pd.to_datetime(df['Timestamp'], unit='s')
-                df.set_index('Timestamp', inplace=True)
 
-                return df
-            else:
-                return pd.DataFrame()
-    else:
-        raise FileNotFoundError
+def read_quantiles(path, station, component, start=None, end=None, quantiles=(0.5, 0.95, 0.99)):
+    """
+    Determines quantiles of an air quality dataset within a range of months from HDF5 File
+
+    :param path: path to HDF5 File
+    :param station: code of the station
+    :param component: component
+    :param start: date within the first month (optional)
+    :param end: date within the last month (optional)
+    :param quantiles: quantiles between 0 and 1
+    :return: series with value per quantile
+    """
+    with HDF5Store(path) as store:
+        return store.read_quantiles(station, component, start, end, quantiles)
+
+
+def read_exceedances(path, station, component, threshold, start=None, end=None):
+    """
+    Counts the values of an air quality dataset above a threshold within a range of months from HDF5 File
+
+    :param path: path to HDF5 File
+    :param station: code of the station
+    :param component: component
+    :param threshold: threshold (e.g. limit value)
+    :param start: date within the first month (optional)
+    :param end: date within the last month (optional)
+    :return: number of values above the threshold
+    """
+    with HDF5Store(path) as store:
+        return store.read_exceedances(station, component, threshold, start, end)
+
+
+def read_feature_table(path, station, start=None, end=None):
+    """
+    Reads the hourly feature table of an air quality station from HDF5 File
+
+    :param path: path to HDF5 File
+    :param station: code of the station
+    :param start: first date to be read (optional)
+    :param end: last date to be read (optional)
+    :return: dataframe with the hour as index
+    """
+    with HDF5Store(path) as store:
+        return store.read_feature_table(station, start, end)
 
 
-def read_construction_data(path):
+def read_quality_report(path, run_id=None):
+    """
+    Reads the quality report of a crawl run from HDF5 File
+
+    :param path: path to HDF5 File
+    :param run_id: identifier of the crawl run (None: latest run)
+    :return: dataframe with the series as index
+    """
+    with HDF5Store(path) as store:
+        return store.read_quality_report(run_id)
+
+
+def read_construction_data(path, with_geometries=True, history=False, with_bounding_boxes=False):
     """
     Reads construction data from HDF5 File
 
     :param path: path to HDF5 File
+    :param with_geometries: reassemble GeoJSON coordinates and geometries (columns Coordinates and Geometries)
+    :param history: read all versions including the superseded ones
+    :param with_bounding_boxes: add bounding boxes of the geometries
     :return: dataframe with constructions data
     """
-    def reconvert_cells(cell):
-        try:
-            return json.loads(cell)
-        except json.JSONDecodeError:
-            return cell.decode('utf-8')
+    with HDF5Store(path) as store:
+        return store.read_construction_data(with_geometries, history, with_bounding_boxes=with_bounding_boxes)
 
-    file = Path(path)
-    if file.exists():
-        with h5py.File(file, 'r') as hdf5_file:
-            dataset_path = 'constructions/construction_data'
 
-            if dataset_path in hdf5_file:
-                # read data
-                dataset = hdf5_file[dataset_path]
-                data = dataset[:]
+def read_construction_history(path, construction_id, with_geometries=True):
+    """
+    Reads all versions of a construction from HDF5 File
 
-                # read column names from attributes
-                columns = [column.decode('utf-8') for column in dataset.attrs['columns']]
-                df = pd.DataFrame(data, columns=columns)
+    :param path: path to HDF5 File
+    :param construction_id: ID of the construction
+    :param with_geometries: reassemble GeoJSON coordinates and geometries
+    :return: dataframe with all versions of the construction (oldest first)
+    """
+    with HDF5Store(path) as store:
+        return store.read_construction_history(construction_id, with_geometries)
 
-                # applying the conversion function to each cell
-                df = df.applymap(reconvert_cells)
 
-                return df
-            else:
-                return pd.DataFrame()
-    else:
-        raise FileNotFoundError
+def query_active_constructions(path, start, end=None, with_geometries=False):
+    """
+    Reads the current constructions valid at a point in time or within a time window from HDF5 File
+
+    :param path: path to HDF5 File
+    :param start: point in time or start of the window
+    :param end: end of the window (optional)
+    :param with_geometries: reassemble GeoJSON coordinates and geometries
+    :return: dataframe with constructions data
+    """
+    with HDF5Store(path) as store:
+        return store.query_active_constructions(start, end, with_geometries)
 
 
 def read_car_registration_data(path):
@@ -278,28 +1223,8 @@ def read_car_registration_data(path):
     :param path: path to HDF5 File
     :return: dataframe with car registrations data
     """
-    file = Path(path)
-    if file.exists():
-        with h5py.File(file, 'r') as hdf5_file:
-            # determine dataset path
-            dataset_path = 'car_registrations/car_registrations_data'
-
-            if dataset_path in hdf5_file:
-                # read data
-                dataset = hdf5_file[dataset_path]
-                data = dataset[:]
-
-                # read column names from attributes
-                columns = [column.decode('utf-8') for column in dataset.attrs['columns']]
-
-                # create dataframe from data
-                df = pd.DataFrame(data, columns=columns)
-
-                return df
-            else:
-                return pd.DataFrame()
-    else:
-        raise FileNotFoundError
+    with HDF5Store(path) as store:
+        return store.read_car_registration_data()
 
 
 def read_new_car_registration_data(path):
@@ -309,25 +1234,29 @@ def read_new_car_registration_data(path):
     :param path: path to HDF5 File
     :return: dataframe with new car registrations data
     """
-    file = Path(path)
-    if file.exists():
-        with h5py.File(file, 'r') as hdf5_file:
-            # determine dataset path
-            dataset_path = 'new_car_registrations/new_car_registrations_data'
+    with HDF5Store(path) as store:
+        return store.read_new_car_registration_data()
+
+
+def read_dataset_statistics(path, dataset_path):
+    """
+    Reads the statistics of a single dataset from HDF5 File without reading its data
 
-            if dataset_path in hdf5_file:
-                # read data
-                dataset = hdf5_file[dataset_path]
-                data = dataset[:]
+    :param path: path to HDF5 File
+    :param dataset_path: path of the dataset within the HDF5 File (e.g. 'air_quality/010/no2_1h')
+    :return: dictionary with count, first/last timestamp and a dataframe with the statistics per value column
+    """
+    with HDF5Store(path) as store:
+        return store.read_dataset_statistics(dataset_path)
 
-                # read column names from attributes
-                columns = [column.decode('utf-8') for column in dataset.attrs['columns']]
 
-                # create dataframe from data
-                df = pd.DataFrame(data, columns=columns)
+def read_statistics_overview(path, subject):
+    """
+    Reads count and first/last timestamp of all datasets of a subject from HDF5 File
 
-                return df
-            else:
-                return pd.DataFrame()
-    else:
-        raise FileNotFoundError
+    :param path: path to HDF5 File
+    :param subject: subject (air_quality, traffic, weather, ...)
+    :return: dataframe with one row per dataset
+    """
+    with HDF5Store(path) as store:
+        return store.read_statistics_overview(subject)
@@ -0,0 +1,190 @@
+import h5py
+import numpy as np
+import pandas as pd
+
+from utils.hdf5_file_output import HDF5Store, timestamp_slice
+
+# default number of rows per chunk (2 float32 columns: about 1.5 MB)
+CHUNK_ROWS = 200000
+
+
+def chunk_to_dataframe(data, columns):
+    """
+    Converts rows of a time series dataset to a dataframe with the timestamp as index
+
+    :param data: rows of the dataset
+    :param columns: column names of the dataset
+    :return: dataframe
+    """
+    df = pd.DataFrame(data[:, 1:], columns=columns[1:])
+    df.index = pd.DatetimeIndex(pd.to_datetime(data[:, 0], unit='s'), name='Timestamp')
+
+    return df
+
+
+def subject_dataset_paths(path, subject):
+    """
+    Determines the paths of all time series datasets of a subject
+
+    :param path: path to HDF5 File
+    :param subject: subject / group within the HDF5 File (air_quality, traffic, weather)
+    :return: list of dataset paths
+    """
+    dataset_paths = []
+
+    def collect_dataset(name, item):
+        if isinstance(item, h5py.Dataset) and 'columns' in item.attrs:
+            dataset_paths.append(f'{subject}/{name}')
+
+    with HDF5Store(path) as store:
+        store.file[subject].visititems(collect_dataset)
+
+    return dataset_paths
+
+
+def iter_dataset_chunks(path, dataset_path, start=None, end=None, chunk_rows=CHUNK_ROWS):
+    """
+    Reads a time series dataset in chunks of a bounded number of rows, so only one chunk is kept in memory
+
+    :param path: path to HDF5 File
+    :param dataset_path: path of the dataset within the HDF5 File
+    :param start: first date to be read (optional)
+    :param end: last date to be read (optional)
+    :param chunk_rows: maximum number of rows per chunk
+    :return: generator of dataframes (Timestamp as index)
+    """
+    with HDF5Store(path) as store:
+        dataset = store.dataset(dataset_path)
+        columns = store.columns(dataset_path)
+        rows = timestamp_slice(dataset, start, end)
+
+        for chunk_start in range(rows.start, rows.stop, chunk_rows):
+            yield chunk_to_dataframe(dataset[chunk_start:min(chunk_start + chunk_rows, rows.stop)], columns)
+
+
+def iter_subject_chunks(path, subject, start=None, end=None, chunk_rows=CHUNK_ROWS):
+    """
+    Reads all time series datasets of a subject (air_quality, traffic, weather) in chunks one after another
+
+    :param path: path to HDF5 File
+    :param subject: subject / group within the HDF5 File
+    :param start: first date to be read (optional)
+    :param end: last date to be read (optional)
+    :param chunk_rows: maximum number of rows per chunk
+    :return: generator of dataset path and dataframe
+    """
+    dataset_paths = subject_dataset_paths(path, subject)
+
+    for dataset_path in dataset_paths:
+        for chunk in iter_dataset_chunks(path, dataset_path, start, end, chunk_rows):
+            yield dataset_path, chunk
+
+
+def iter_time_windows(path, dataset_path, frequency='D', start=None, end=None):
+    """
+    Reads a time series dataset window by window (e.g. day by day), every window is located by binary search
+
+    :param path: path to HDF5 File
+    :param dataset_path: path of the dataset within the HDF5 File
+    :param frequency: length of the windows as pandas period frequency (e.g. 'h', 'D', 'W', 'M')
+    :param start: first date to be read (optional)
+    :param end: last date to be read (optional)
+    :return: generator of window start and dataframe
+    """
+    with HDF5Store(path) as store:
+        dataset = store.dataset(dataset_path)
+        columns = store.columns(dataset_path)
+        rows = timestamp_slice(dataset, start, end)
+
+        if rows.start == rows.stop:
+            return
+
+        # windows between the first and the last row to be read
+        first = pd.to_datetime(dataset[rows.start, 0], unit='s')
+        last = pd.to_datetime(dataset[rows.stop - 1, 0], unit='s')
+        periods = pd.period_range(first.to_period(frequency), last.to_period(frequency), freq=frequency)
+        window_starts = periods.start_time
+
+        # first row of every window (the first window starts with the first row to be read)
+        boundaries = [rows.start] + [max(rows.start, timestamp_slice(dataset, window_start).start)
+                                     for window_start in window_starts[1:]] + [rows.stop]
+
+        for window_start, low, high in zip(window_starts, boundaries[:-1], boundaries[1:]):
+            if high > low:
+                yield window_start, chunk_to_dataframe(dataset[low:high], columns)
+
+
+def aggregate_by_period(chunks, frequency='D'):
+    """
+    Aggregates chunks of a time series by period without keeping the chunks in memory.
+    Count, sum, minimum and maximum of every period are combined chunk by chunk (missing values are ignored),
+    the mean is derived at the end.
+
+    :param chunks: iterable of dataframes with timestamp index (e.g. from iter_dataset_chunks)
+    :param frequency: period as pandas period frequency (e.g. 'h', 'D', 'W', 'M')
+    :return: dataframe with period start as index and columns (value column, statistic)
+    """
+    count, total, minimum, maximum = None, None, None, None
+
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+
+        # timestamps are stored as float32 (a few seconds off the full hour), so they are rounded to the hour first
+        grouped = chunk.groupby(chunk.index.round('h').to_period(frequency).start_time)
+
+        if count is None:
+            count, total, minimum, maximum = grouped.count(), grouped.sum(), grouped.min(), grouped.max()
+        else:
+            # only periods at the border of two chunks appear in both
+            count = count.add(grouped.count(), fill_value=0)
+            total = total.add(grouped.sum(), fill_value=0)
+            minimum = pd.concat([minimum, grouped.min()]).groupby(level=0).min()
+            maximum = pd.concat([maximum, grouped.max()]).groupby(level=0).max()
+
+    if count is None:
+        return pd.DataFrame()
+
+    count = count.astype('int64')
+    mean = total / count.replace(0, np.nan)
+
+    # columns per value column: count, sum, min, max, mean
+    statistics = pd.concat({column: pd.concat({'count': count[column], 'sum': total[column], 'min': minimum[column],
+                                               'max': maximum[column], 'mean': mean[column]}, axis=1)
+                            for column in count.columns}, axis=1)
+    statistics.index.name = 'Period'
+
+    return statistics
+
+
+def aggregate_dataset(path, dataset_path, frequency='D', start=None, end=None, chunk_rows=CHUNK_ROWS):
+    """
+    Aggregates a time series dataset by period in constant memory (apart from the result)
+
+    :param path: path to HDF5 File
+    :param dataset_path: path of the dataset within the HDF5 File
+    :param frequency: period as pandas period frequency (e.g. 'h', 'D', 'W', 'M')
+    :param start: first date to be read (optional)
+    :param end: last date to be read (optional)
+    :param chunk_rows: maximum number of rows per chunk
+    :return: dataframe with period start as index and columns (value column, statistic)
+    """
+    return aggregate_by_period(iter_dataset_chunks(path, dataset_path, start, end, chunk_rows), frequency)
+
+
+def aggregate_subject(path, subject, frequency='D', start=None, end=None, chunk_rows=CHUNK_ROWS):
+    """
+    Aggregates all time series datasets of a subject by period, one dataset after another
+
+    :param path: path to HDF5 File
+    :param subject: subject / group within the HDF5 File (air_quality, traffic, weather)
+    :param frequency: period as pandas period frequency (e.g. 'h', 'D', 'W', 'M')
+    :param start: first date to be read (optional)
+    :param end: last date to be read (optional)
+    :param chunk_rows: maximum number of rows per chunk
+    :return: dictionary with dataset path and aggregated dataframe
+    """
+    dataset_paths = subject_dataset_paths(path, subject)
+
+    return {dataset_path: aggregate_dataset(path, dataset_path, frequency, start, end, chunk_rows)
+            for dataset_path in dataset_paths}
@@ -0,0 +1,114 @@
+from pathlib import Path
+import h5py
+import numpy as np
+
+from utils.hdf5_file_output import HDF5Store, sensor_coordinates
+from utils.hdf5_file_input import bump_data_version
+from utils.spatial_index import haversine_distances
+
+
+def station_neighbors(station_lats, station_lngs, lats, lngs, radius):
+    """
+    Determines the pairs of stations and neighbors (e.g. traffic sensors) within a radius for all stations at once
+
+    :param station_lats: latitudes of the stations
+    :param station_lngs: longitudes of the stations
+    :param lats: latitudes of the neighbors (missing values are never within the radius)
+    :param lngs: longitudes of the neighbors
+    :param radius: radius in meters
+    :return: positions of the stations, positions of the neighbors and distances in meters per pair
+    """
+    # distances between every station (rows) and every neighbor (columns)
+    distances = haversine_distances(np.asarray(station_lats, dtype='float64')[:, np.newaxis],
+                                    np.asarray(station_lngs, dtype='float64')[:, np.newaxis],
+                                    np.asarray(lats, dtype='float64')[np.newaxis, :],
+                                    np.asarray(lngs, dtype='float64')[np.newaxis, :])
+
+    station_positions, neighbor_positions = np.nonzero(distances <= radius)
+
+    return station_positions, neighbor_positions, distances[station_positions, neighbor_positions]
+
+
+def update_neighborhoods(path_h5, radii=(500,)):
+    """
+    Updates the neighborhood table of the air quality stations (group 'neighborhoods'): traffic sensors and current
+    constructions within the largest radius with their distances, so neighborhoods of all smaller radii can be
+    looked up as well. The table is only recomputed if it doesn't exist, was marked as outdated (attribute
+    'outdated', e.g. by new constructions) or the radii changed.
+
+    :param path_h5: path to HDF5 File
+    :param radii: radii around the stations in meters
+    :return: number of stored pairs (0 if the table is up to date)
+    """
+    if not Path(path_h5).exists():
+        raise FileNotFoundError
+
+    radius = float(max(radii))
+
+    with HDF5Store(path_h5) as store:
+        if 'neighborhoods' in store.file:
+            attributes = store.file['neighborhoods'].attrs
+
+            if not attributes.get('outdated', True) and list(attributes.get('radii', [])) == list(radii):
+                return 0
+
+        df_stations = store.read_air_quality_stations('air_quality')
+        sensors = sensor_coordinates(store.read_traffic_sensors('traffic'))
+
+        if 'constructions' in store.file and 'construction_index' in store.file['constructions']:
+            constructions = store.read_construction_data(with_geometries=False)[['ID', 'Latitude', 'Longitude']]
+        else:
+            constructions = None
+
+    station_lats = df_stations['lat'].to_numpy(dtype='float64')
+    station_lngs = df_stations['lng'].to_numpy(dtype='float64')
+
+    # pairs within the largest radius (one vectorized pass per subject)
+    sensor_pairs = station_neighbors(station_lats, station_lngs, sensors['lat'], sensors['lng'], radius)
+    construction_pairs = station_neighbors(station_lats, station_lngs, constructions['Latitude'],
+                                           constructions['Longitude'], radius) if constructions is not None else \
+        (np.empty(0, dtype='int64'), np.empty(0, dtype='int64'), np.empty(0))
+
+    sensor_names = np.array(sensors.index, dtype='S')
+    sensor_values = sensors[['lat', 'lng']].to_numpy(dtype='float64')
+    construction_values = constructions[['ID', 'Latitude', 'Longitude']].to_numpy(dtype='float64') \
+        if constructions is not None else np.empty((0, 3))
+
+    with h5py.File(path_h5, 'a') as hdf5_file:
+        if 'neighborhoods' in hdf5_file:
+            del hdf5_file['neighborhoods']
+
+        neighborhoods_group = hdf5_file.create_group('neighborhoods')
+
+        for station_position, (station, station_info) in enumerate(df_stations.iterrows()):
+            station_group = neighborhoods_group.create_group(station)
+            station_group.attrs['address'] = str(station_info['address'])
+            station_group.attrs['lat'] = float(station_info['lat'])
+            station_group.attrs['lng'] = float(station_info['lng'])
+
+            # SENSORS: sensor names as categories of the codes (order of the sensors)
+            selected = sensor_pairs[0] == station_position
+            positions = sensor_pairs[1][selected]
+            sensor_dataset = station_group.create_dataset(
+                'sensors', data=np.column_stack([np.arange(len(positions)), sensor_pairs[2][selected],
+                                                 sensor_values[positions]]).reshape(-1, 4))
+            sensor_dataset.attrs['columns'] = np.array(['Sensor', 'Distance', 'lat', 'lng'], dtype='S')
+            sensor_dataset.attrs['categories'] = sensor_names[positions]
+
+            # CONSTRUCTIONS: current constructions by ID (representative location)
+            selected = construction_pairs[0] == station_position
+            positions = construction_pairs[1][selected]
+            construction_dataset = station_group.create_dataset(
+                'constructions', data=np.column_stack([construction_values[positions, 0],
+                                                       construction_pairs[2][selected],
+                                                       construction_values[positions, 1:]]).reshape(-1, 4))
+            construction_dataset.attrs['columns'] = np.array(['ID', 'Distance', 'Latitude', 'Longitude'], dtype='S')
+
+        neighborhoods_group.attrs['radius'] = radius
+        neighborhoods_group.attrs['radii'] = np.array(radii, dtype='float64')
+        neighborhoods_group.attrs['outdated'] = False
+
+        # the app shows the neighborhoods
+        bump_data_version(hdf5_file, 'neighborhoods')
+
+    return len(sensor_pairs[0]) + len(construction_pairs[0])
@@ -0,0 +1,252 @@
+from pathlib import Path
+import shutil
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import datetime
+
+from utils.hdf5_file_output import HDF5Store, timestamp_slice
+
+
+def read_export_state(export_directory):
+    """
+    Reads the state of previous exports (last exported timestamp per dataset / number of exported rows and
+    data version of the HDF5 File)
+
+    :param export_directory: directory of the Parquet export
+    :return: dictionary with export state per subject
+    """
+    file = Path(export_directory) / 'export_state.json'
+
+    if file.exists():
+        with open(file, 'r') as state_file:
+            return json.load(state_file)
+    else:
+        return {}
+
+
+def write_export_state(export_directory, state):
+    """
+    Writes the state of the export
+
+    :param export_directory: directory of the Parquet export
+    :param state: dictionary with export state per subject
+    :return:
+    """
+    file = Path(export_directory) / 'export_state.json'
+
+    with open(file, 'w') as state_file:
+        json.dump(state, state_file, indent=2)
+
+
+def write_partitions(df, subject_directory, partition_column, run_id):
+    """
+    Writes a dataframe as partitioned Parquet files (one directory per value of the partition column).
+    Existing partitions are kept, new files are added next to them.
+
+    :param df: dataframe to be written
+    :param subject_directory: directory of the subject within the export
+    :param partition_column: column to partition by (e.g. date)
+    :param run_id: identifier of the export run (part of the file names)
+    :return: number of written rows
+    """
+    if df.empty:
+        return 0
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_to_dataset(table, root_path=str(subject_directory), partition_cols=[partition_column],
+                        basename_template=f'part-{run_id}-{{i}}.parquet',
+                        existing_data_behavior='overwrite_or_ignore', compression='zstd')
+
+    return len(df)
+
+
+def remove_partitions(subject_directory, first_date):
+    """
+    Removes the date partitions of a subject from a date on (e.g. partitions with rewritten rows)
+
+    :param subject_directory: directory of the subject within the export
+    :param first_date: first date to be removed (YYYY-MM-DD)
+    :return:
+    """
+    for partition in Path(subject_directory).glob('date=*'):
+        if partition.name[len('date='):] >= first_date:
+            shutil.rmtree(partition)
+
+
+def read_new_series_rows(store, dataset_path, last_timestamp, rewritten_from=None):
+    """
+    Reads the rows of a time series dataset after the last exported timestamp and the rows of removed partitions
+
+    :param store: HDF5Store
+    :param dataset_path: path of the dataset within the HDF5 File
+    :param last_timestamp: last exported Unix timestamp (None: read everything)
+    :param rewritten_from: Unix timestamp of the first removed partition, from which all rows are read (optional)
+    :return: dataframe with the new rows (Timestamp as date)
+    """
+    dataset = store.dataset(dataset_path)
+
+    if last_timestamp is None:
+        data = dataset[:]
+    else:
+        first_timestamp = last_timestamp if rewritten_from is None else min(last_timestamp, rewritten_from)
+        data = dataset[timestamp_slice(dataset, pd.to_datetime(first_timestamp, unit='s'), None)]
+
+        new = data[:, 0] > last_timestamp
+        if rewritten_from is not None:
+            new |= data[:, 0] >= rewritten_from
+        data = data[new]
+
+    df = pd.DataFrame(data, columns=store.columns(dataset_path))
+    df['Timestamp'] = pd.to_datetime(df['Timestamp'], unit='s')
+
+    return df
+
+
+def export_time_series(store, subject, dataset_paths, key_columns, subject_directory, subject_state, run_id,
+                       exported_version=None):
+    """
+    Exports time series datasets of a subject in long format partitioned by date.
+    Rows which were changed without being appended since the last export (backfills, overwritten values)
+    are exported by writing the partitions from the date of the earliest changed row on again.
+
+    :param store: HDF5Store
+    :param subject: subject (air_quality, traffic, weather)
+    :param dataset_paths: paths of the datasets to be exported
+    :param key_columns: function returning the identifying columns (e.g. station, component) of a dataset path
+    :param subject_directory: directory of the subject within the export
+    :param subject_state: last exported timestamp per dataset (updated in place)
+    :param run_id: identifier of the export run
+    :param exported_version: data version of the HDF5 File at the last export (None: unknown)
+    :return: number of exported rows
+    """
+    all_data = []
+
+    # partitions with rows changed since the last export are written again
+    rewritten_from = None
+    if subject_state:
+        rewritten_from = store.rewritten_since(subject, exported_version) if exported_version is not None \
+            else -np.inf
+
+    if rewritten_from == -np.inf:
+        subject_state.clear()
+        if Path(subject_directory).exists():
+            shutil.rmtree(subject_directory)
+        rewritten_from = None
+    elif rewritten_from is not None:
+        first_date = pd.to_datetime(rewritten_from, unit='s').floor('D')
+        remove_partitions(subject_directory, first_date.strftime('%Y-%m-%d'))
+        rewritten_from = first_date.timestamp()
+
+    for dataset_path in dataset_paths:
+        df = read_new_series_rows(store, dataset_path, subject_state.get(dataset_path), rewritten_from)
+
+        if not df.empty:
+            for column, value in key_columns(dataset_path).items():
+                df.insert(0, column, value)
+
+            subject_state[dataset_path] = float(store.dataset(dataset_path)[-1, 0])
+            all_data.append(df)
+
+    if not all_data:
+        return 0
+
+    df = pd.concat(all_data, ignore_index=True)
+
+    # identifying columns as dictionary encoded strings
+    for column in df.columns.difference(['Timestamp']):
+        if df[column].dtype == object:
+            df[column] = df[column].astype('category')
+
+    df['date'] = df['Timestamp'].dt.strftime('%Y-%m-%d')
+
+    return write_partitions(df, subject_directory, 'date', f'{subject}-{run_id}')
+
+
+def export_parquet(path_h5, export_directory, incremental=False):
+    """
+    Exports all subjects of the HDF5 File to Parquet files
+    - air quality, traffic and weather in long format partitioned by date
+    - constructions (all versions) partitioned by date of their timestamp
+    - (new) car registrations partitioned by year
+
+    In incremental mode only data added since the last export is written (new files in new or existing
+    partitions), otherwise the export is rewritten completely.
+
+    :param path_h5: path to HDF5 File
+    :param export_directory: directory of the Parquet export
+    :param incremental: only export data added since the last export
+    :return: number of exported rows per subject
+    """
+    export_directory = Path(export_directory)
+    export_directory.mkdir(parents=True, exist_ok=True)
+
+    state = read_export_state(export_directory) if incremental else {}
+    run_id = datetime.now().strftime('%Y%m%dT%H%M%S')
+    exported_rows = {}
+
+    def subject_directory(subject):
+        directory = export_directory / subject
+
+        # complete export: remove previous files
+        if not incremental and directory.exists():
+            shutil.rmtree(directory)
+
+        return directory
+
+    with HDF5Store(path_h5) as store:
+        # data version of the last export (rewritten rows are exported again)
+        exported_version = state.get('data_version')
+        state['data_version'] = store.data_version()
+
+        # AIR QUALITY
+        dataset_paths = [f'air_quality/{station}/{component}'
+                         for station in store.file.get('air_quality', {})
+                         for component in store.file['air_quality'][station]]
+        exported_rows['air_quality'] = export_time_series(
+            store, 'air_quality', dataset_paths,
+            lambda dataset_path: {'component': dataset_path.split('/')[2], 'station': dataset_path.split('/')[1]},
+            subject_directory('air_quality'), state.setdefault('air_quality', {}), run_id, exported_version)
+
+        # TRAFFIC
+        dataset_paths = [f'traffic/{sensor}' for sensor in store.file.get('traffic', {})]
+        exported_rows['traffic'] = export_time_series(
+            store, 'traffic', dataset_paths, lambda dataset_path: {'name': dataset_path.split('/')[1]},
+            subject_directory('traffic'), state.setdefault('traffic', {}), run_id, exported_version)
+
+        # WEATHER
+        dataset_paths = ['weather/weather_data'] if 'weather/weather_data' in store.file else []
+        exported_rows['weather'] = export_time_series(
+            store, 'weather', dataset_paths, lambda dataset_path: {},
+            subject_directory('weather'), state.setdefault('weather', {}), run_id, exported_version)
+
+        # CONSTRUCTIONS (versions are only appended, so the number of exported rows is the state)
+        directory = subject_directory('constructions')
+        exported_versions = state.get('constructions', 0)
+        number_of_versions = store.dataset('constructions/id').shape[0] if 'constructions/id' in store.file else 0
+
+        df = pd.DataFrame()
+        if number_of_versions > exported_versions:
+            df = store.read_construction_data(with_geometries=False, history=True, with_bounding_boxes=True,
+                                              rows=np.arange(exported_versions, number_of_versions))
+            for column in ['Subtype', 'Severity', 'Direction', 'Geo type']:
+                df[column] = df[column].astype(str).astype('category')
+            df['date'] = df['Timestamp'].dt.strftime('%Y-%m-%d')
+
+        exported_rows['constructions'] = write_partitions(df, directory, 'date', f'constructions-{run_id}')
+        state['constructions'] = number_of_versions
+
+        # CAR REGISTRATIONS (small tables, always rewritten completely)
+        for subject, df in [('car_registrations', store.read_car_registration_data()),
+                            ('new_car_registrations', store.read_new_car_registration_data())]:
+            directory = export_directory / subject
+            if directory.exists():
+                shutil.rmtree(directory)
+
+            exported_rows[subject] = write_partitions(df, directory, 'Year', f'{subject}-{run_id}')
+
+    write_export_state(export_directory, state)
+
+    return exported_rows
@@ -0,0 +1,81 @@
+import numpy as np
+
+# relative accuracy of the quantiles (1 %) and range of values with logarithmic bins,
+# smaller values (including zero and negative values) are counted in the first bin, larger ones in the last bin
+RELATIVE_ACCURACY = 0.01
+MIN_VALUE = 0.01
+MAX_VALUE = 100000.0
+
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+MIN_KEY = int(np.floor(np.log(MIN_VALUE) / np.log(GAMMA)))
+NUMBER_OF_BINS = int(np.ceil(np.log(MAX_VALUE) / np.log(GAMMA))) - MIN_KEY + 1
+
+
+def sketch_bins(values):
+    """
+    Determines the bins of values within the logarithmic bins of the sketch
+    (bin i covers the values from GAMMA^(MIN_KEY + i - 1) to GAMMA^(MIN_KEY + i))
+
+    :param values: values (missing values have to be removed before)
+    :return: array with bin per value
+    """
+    values = np.asarray(values, dtype='float64')
+    keys = np.ceil(np.log(np.maximum(values, MIN_VALUE)) / np.log(GAMMA))
+
+    return np.clip(keys - MIN_KEY, 0, NUMBER_OF_BINS - 1).astype('int64')
+
+
+def sketch_counts(values):
+    """
+    Creates a sketch (number of values per bin) of values, missing values are ignored
+
+    :param values: values
+    :return: array with number of values per bin
+    """
+    values = np.asarray(values, dtype='float64')
+
+    return np.bincount(sketch_bins(values[~np.isnan(values)]), minlength=NUMBER_OF_BINS)
+
+
+def bin_values(bins):
+    """
+    Returns the representative value of bins (relative error of at most RELATIVE_ACCURACY within the bin)
+
+    :param bins: bins
+    :return: array with representative values
+    """
+    keys = np.asarray(bins) + MIN_KEY
+
+    return 2 * GAMMA ** keys / (GAMMA + 1)
+
+
+def sketch_quantiles(counts, quantiles):
+    """
+    Determines quantiles from a (merged) sketch
+
+    :param counts: number of values per bin (sum of the sketches to be merged)
+    :param quantiles: quantiles between 0 and 1
+    :return: array with the value per quantile (NaN for empty sketches)
+    """
+    cumulative = np.cumsum(counts)
+    total = cumulative[-1] if len(cumulative) > 0 else 0
+
+    if total == 0:
+        return np.full(len(quantiles), np.nan)
+
+    # bin of the value with rank quantile * (total - 1)
+    ranks = np.floor(np.asarray(quantiles, dtype='float64') * (total - 1))
+    bins = np.searchsorted(cumulative, ranks, side='right')
+
+    return bin_values(bins)
+
+
+def sketch_exceedances(counts, threshold):
+    """
+    Counts the values of a (merged) sketch above a threshold (bins whose representative value exceeds the threshold)
+
+    :param counts: number of values per bin
+    :param threshold: threshold
+    :return: number of values above the threshold
+    """
+    return int(np.asarray(counts)[bin_values(np.arange(NUMBER_OF_BINS)) > threshold].sum())
@@ -0,0 +1,101 @@
+import numpy as np
+
+# radius of the earth in meters
+EARTH_RADIUS = 6371000.0
+
+
+def haversine_distances(lat, lng, lats, lngs):
+    """
+    Haversine function to determine distances between coordinates on earth
+    (arrays are broadcast, e.g. one coordinate and an array of coordinates or a column and a row of coordinates)
+
+    :param lat: latitude(s) of the first coordinate(s)
+    :param lng: longitude(s) of the first coordinate(s)
+    :param lats: latitude(s) of the other coordinate(s)
+    :param lngs: longitude(s) of the other coordinate(s)
+    :return: distance(s) in meters
+    """
+    lat, lng = np.radians(np.asarray(lat, dtype='float64')), np.radians(np.asarray(lng, dtype='float64'))
+    lats, lngs = np.radians(np.asarray(lats, dtype='float64')), np.radians(np.asarray(lngs, dtype='float64'))
+
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lngs - lng) / 2) ** 2
+
+    return EARTH_RADIUS * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+class SpatialIndex:
+    """
+    Grid index of coordinates (e.g. constructions or traffic sensors) for radius queries.
+    The coordinates are sorted by grid cell once, so a query only computes the distances to the coordinates
+    of the few cells around the queried location instead of all coordinates.
+    """
+
+    def __init__(self, lats, lngs, cell_size=500):
+        """
+        :param lats: latitudes (coordinates with missing values are never found)
+        :param lngs: longitudes
+        :param cell_size: edge length of the grid cells in meters (about the radius of the queries)
+        """
+        self.lats = np.asarray(lats, dtype='float64')
+        self.lngs = np.asarray(lngs, dtype='float64')
+
+        valid = ~np.isnan(self.lats) & ~np.isnan(self.lngs)
+
+        # edge length of the cells in degrees (longitude at the mean latitude of the coordinates)
+        mean_lat = np.mean(self.lats[valid]) if valid.any() else 0.0
+        self.cell_lat = np.degrees(cell_size / EARTH_RADIUS)
+        self.cell_lng = self.cell_lat / max(np.cos(np.radians(mean_lat)), 1e-6)
+
+        # positions of the coordinates sorted by cell and first position of every cell
+        positions = np.flatnonzero(valid)
+        rows, columns = self._cells(self.lats[positions], self.lngs[positions])
+        order = np.lexsort((positions, columns, rows))
+
+        self.positions = positions[order]
+        self.cell_rows, self.cell_columns = rows[order], columns[order]
+
+    def __len__(self):
+        return len(self.lats)
+
+    def _cells(self, lats, lngs):
+        """
+        Determines the grid cells (row and column) of coordinates
+
+        :param lats: latitudes
+        :param lngs: longitudes
+        :return: arrays of rows and columns
+        """
+        return np.floor(lats / self.cell_lat).astype('int64'), np.floor(lngs / self.cell_lng).astype('int64')
+
+    def query(self, lat, lng, radius=500):
+        """
+        Finds the coordinates within a radius around a location
+
+        :param lat: latitude of the location
+        :param lng: longitude of the location
+        :param radius: radius in meters
+        :return: positions of the coordinates (ascending) and their distances in meters
+        """
+        if np.isnan(lat) or np.isnan(lng) or len(self.positions) == 0:
+            return np.empty(0, dtype='int64'), np.empty(0)
+
+        # bounding box of the radius in degrees
+        delta_lat = np.degrees(radius / EARTH_RADIUS)
+        delta_lng = delta_lat / max(np.cos(np.radians(min(abs(lat) + delta_lat, 90.0))), 1e-6)
+        first_row, first_column = self._cells(lat - delta_lat, lng - delta_lng)
+        last_row, last_column = self._cells(lat + delta_lat, lng + delta_lng)
+
+        # candidates of the cells within the bounding box (one contiguous range of sorted positions per row)
+        candidates = []
+        for row in range(int(first_row), int(last_row) + 1):
+            low = np.searchsorted(self.cell_rows, row, side='left')
+            high = np.searchsorted(self.cell_rows, row, side='right')
+            low, high = low + np.searchsorted(self.cell_columns[low:high], [first_column, last_column + 1])
+            candidates.append(self.positions[low:high])
+
+        candidates = np.sort(np.concatenate(candidates))
+
+        distances = haversine_distances(lat, lng, self.lats[candidates], self.lngs[candidates])
+        within = distances <= radius
+
+        return candidates[within], distances[within]
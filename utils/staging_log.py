@@ -0,0 +1,204 @@
+from pathlib import Path
+import os
+import h5py
+import numpy as np
+from dateutil import parser
+from datetime import datetime
+
+from utils.hdf5_file_input import merge_time_series_rows
+
+
+def write_segment(staging_directory, subject, run_id, **columns):
+    """
+    Writes crawled records of a subject as one segment (columnar .npz file) of the staging log.
+    The segment is written to a temporary file first and renamed afterwards, so a segment is either
+    complete or doesn't exist at all.
+
+    :param staging_directory: directory of the staging log
+    :param subject: subject (air_quality, traffic, weather)
+    :param run_id: identifier of the crawl run
+    :param columns: columns of the records as arrays of the same length
+    :return: path of the segment
+    """
+    subject_directory = Path(staging_directory) / subject
+    subject_directory.mkdir(parents=True, exist_ok=True)
+
+    segment = subject_directory / f'{run_id}.npz'
+    temporary_segment = subject_directory / f'{run_id}.npz.tmp'
+
+    with open(temporary_segment, 'wb') as segment_file:
+        np.savez(segment_file, **{name: np.asarray(values) for name, values in columns.items()})
+        segment_file.flush()
+        os.fsync(segment_file.fileno())
+
+    os.replace(temporary_segment, segment)
+
+    return segment
+
+
+def stage_air_quality_data(staging_directory, run_id, data):
+    """
+    Writes crawled air quality data to the staging log
+
+    :param staging_directory: directory of the staging log
+    :param run_id: identifier of the crawl run
+    :param data: air quality data (list of entries with datetime, station, component and value)
+    :return: path of the segment
+    """
+    return write_segment(staging_directory, 'air_quality', run_id,
+                         station=np.array([entry['station'] for entry in data], dtype='U'),
+                         component=np.array([entry['component'] for entry in data], dtype='U'),
+                         timestamp=np.array([parser.parse(entry['datetime']).timestamp() for entry in data],
+                                            dtype='float64'),
+                         value=np.array([entry['value'] for entry in data], dtype='float64'))
+
+
+def stage_traffic_data(staging_directory, run_id, sensor_names, timestamps, results):
+    """
+    Writes crawled traffic data of all sensors to the staging log
+
+    :param staging_directory: directory of the staging log
+    :param run_id: identifier of the crawl run
+    :param sensor_names: sensor name/code per record
+    :param timestamps: timestamp per record
+    :param results: result / value per record
+    :return: path of the segment
+    """
+    return write_segment(staging_directory, 'traffic', run_id,
+                         sensor=np.array(sensor_names, dtype='U'),
+                         timestamp=np.array(timestamps, dtype='float64'),
+                         value=np.array(results, dtype='float64'))
+
+
+def stage_weather_data(staging_directory, run_id, temperature, precipitation, wind_speed):
+    """
+    Writes crawled weather data to the staging log (timestamp of the crawl)
+
+    :param staging_directory: directory of the staging log
+    :param run_id: identifier of the crawl run
+    :param temperature: temperature
+    :param precipitation: precipitation
+    :param wind_speed: wind speed
+    :return: path of the segment
+    """
+    return write_segment(staging_directory, 'weather', run_id,
+                         timestamp=np.array([datetime.now().timestamp()]),
+                         temperature=np.array([temperature], dtype='float64'),
+                         precipitation=np.array([precipitation], dtype='float64'),
+                         wind_speed=np.array([wind_speed], dtype='float64'))
+
+
+def segment_dataset_rows(subject, segment):
+    """
+    Determines the dataset path within the HDF5 File and the rows to be added for the records of a segment
+
+    :param subject: subject (air_quality, traffic, weather)
+    :param segment: loaded segment
+    :return: dictionary with dataset path and rows
+    """
+    if subject == 'air_quality':
+        dataset_paths = np.char.add(np.char.add('air_quality/', segment['station']),
+                                    np.char.add('/', segment['component']))
+        rows = np.column_stack([segment['timestamp'], segment['value']])
+    elif subject == 'traffic':
+        dataset_paths = np.char.add('/traffic/', segment['sensor'])
+        rows = np.column_stack([segment['timestamp'], segment['value']])
+    else:
+        dataset_paths = np.full(len(segment['timestamp']), 'weather/weather_data')
+        rows = np.column_stack([segment['timestamp'], segment['temperature'], segment['precipitation'],
+                                segment['wind_speed']])
+
+    # group rows by dataset (stable sort keeps the order of the records)
+    order = np.argsort(dataset_paths, kind='stable')
+    dataset_paths, rows = dataset_paths[order], rows[order]
+    unique_paths, first_rows = np.unique(dataset_paths, return_index=True)
+
+    return {dataset_path: dataset_rows for dataset_path, dataset_rows in zip(unique_paths,
+                                                                            np.split(rows, first_rows[1:]))}
+
+
+def list_segments(staging_directory):
+    """
+    Lists the segments of the staging log per subject (sorted by run)
+
+    :param staging_directory: directory of the staging log
+    :return: dictionary with subject and list of segment paths
+    """
+    segments = {}
+
+    for subject in ['air_quality', 'traffic', 'weather']:
+        subject_directory = Path(staging_directory) / subject
+        if subject_directory.exists():
+            segments[subject] = sorted(subject_directory.glob('*.npz'))
+
+    return segments
+
+
+def compact_staging_log(path_h5, staging_directory, batch_size=100):
+    """
+    Merges the segments of the staging log into the HDF5 File. Segments are combined to batches,
+    so that every dataset is expanded once per batch. The names of the segments of a batch are stored in the
+    HDF5 File (attribute 'compacted_segments') together with their rows and the segments are removed afterwards.
+    Segments left over by an interrupted compaction are removed without being merged again.
+    Rollups and sketches are updated once per dataset and batch, the data version is incremented once per run.
+
+    :param path_h5: path to HDF5 File
+    :param staging_directory: directory of the staging log
+    :param batch_size: maximum number of segments per batch
+    :return: number of compacted segments per subject
+    """
+    if not Path(path_h5).exists():
+        raise FileNotFoundError
+
+    segments = list_segments(staging_directory)
+    compacted_segments = {}
+    version = None
+
+    with h5py.File(path_h5, 'a') as hdf5_file:
+        # segments merged by an earlier compaction which still exist
+        segment_names = {f'{subject}/{segment_path.name}' for subject, subject_segments in segments.items()
+                         for segment_path in subject_segments}
+        journal = [name for name in hdf5_file.attrs.get('compacted_segments', np.array([], dtype='S')).astype('U')
+                   if name in segment_names]
+
+        for subject, subject_segments in segments.items():
+            compacted_segments[subject] = 0
+
+            for segment_path in subject_segments:
+                if f'{subject}/{segment_path.name}' in journal:
+                    os.remove(segment_path)
+
+            subject_segments = [segment_path for segment_path in subject_segments
+                                if f'{subject}/{segment_path.name}' not in journal]
+
+            for start in range(0, len(subject_segments), batch_size):
+                batch = subject_segments[start:start + batch_size]
+                batch_names = [f'{subject}/{segment_path.name}' for segment_path in batch]
+
+                # collect rows of all segments of the batch per dataset
+                batch_rows = {}
+                for segment_path in batch:
+                    with np.load(segment_path) as segment:
+                        for dataset_path, rows in segment_dataset_rows(subject, segment).items():
+                            batch_rows.setdefault(str(dataset_path), []).append(rows)
+
+                # sort rows of every dataset by timestamp
+                dataset_rows = {}
+                for dataset_path, rows in batch_rows.items():
+                    rows = np.concatenate(rows)
+                    dataset_rows[dataset_path] = rows[np.argsort(rows[:, 0], kind='stable')]
+
+                version = merge_time_series_rows(hdf5_file, dataset_rows, version=version)
+
+                # rows and names of the segments are written to disk before the segments are removed
+                hdf5_file.attrs['compacted_segments'] = np.array(journal + batch_names, dtype='S')
+                hdf5_file.flush()
+
+                for segment_path in batch:
+                    os.remove(segment_path)
+
+                compacted_segments[subject] += len(batch)
+
+        hdf5_file.attrs['compacted_segments'] = np.array([], dtype='S')
+
+    return compacted_segments